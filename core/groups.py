@@ -1,21 +1,25 @@
+import logging
+
 from mozilla_django_oidc.auth import OIDCAuthenticationBackend
 from dashboard.models.djangouser import DjangoUser
 
+logger = logging.getLogger(__name__)
+
 class DjangoGroupsAuthenticationBackend(OIDCAuthenticationBackend):
     def create_user(self, claims):
         email = claims.get("email")
         username = self.get_username(claims)
         user = DjangoUser.manager.create_user(username, email=email, password=None)
-        print(f"Creating user: {username} with email: {email}")
+        logger.info("Creating user %s with email %s", username, email)
         roles = claims.get("django/roles", [])
-        print(f"Assigning roles to new user: {roles}")
+        logger.info("Assigning roles to new user %s: %s", username, roles)
         user.roles = roles
         user.save()
         return user
 
     def update_user(self, user, claims):
         roles = claims.get("django/roles", [])
-        print(f"Updating roles for user: {roles}")
+        logger.info("Updating roles for user %s: %s", user, roles)
         user.roles = roles
         user.save()
         return user
@@ -1,16 +1,26 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import find_dotenv, load_dotenv
 
 ENV_FILE = find_dotenv()
 if ENV_FILE:
-    print(f"Loading environment variables from {ENV_FILE}")
     load_dotenv(ENV_FILE)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "dev-secret-key")
-DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
+# "development" (default) or "production": production turns DEBUG off,
+# which drops the development tools, and keeps database connections open
+PROFILE = os.environ.get("DJANGO_PROFILE", "development")
+if PROFILE not in ("development", "production"):
+    raise ImproperlyConfigured(f"Unknown DJANGO_PROFILE {PROFILE!r}")
+PRODUCTION = PROFILE == "production"
+
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "" if PRODUCTION else "dev-secret-key")
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_SECRET_KEY must be set in production")
+DEBUG = os.environ.get("DJANGO_DEBUG", "0" if PRODUCTION else "1") == "1"
 
 USE_X_FORWARDED_HOST = True
 ALLOWED_HOSTS = [ 
@@ -22,36 +32,58 @@ ALLOWED_HOSTS = [
 ALLOWED_HOSTS += os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",")
 
 INSTALLED_APPS = [
-    "django_extensions",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "django_browser_reload",
     "mozilla_django_oidc",
     "dashboard",
     "rules"
 ]
 
+# Development tools, only loaded with DEBUG on and when installed, so
+# production processes neither import them nor need them
+DEV_APPS = [app for app in ("django_extensions", "django_browser_reload") if DEBUG and find_spec(app)]
+INSTALLED_APPS = DEV_APPS + INSTALLED_APPS
+
 MIDDLEWARE = [
+    "dashboard.instrumentation.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "dashboard.claims.ClaimsMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django_browser_reload.middleware.BrowserReloadMiddleware",
+    "dashboard.instrumentation.RequestCountersMiddleware",
+    "dashboard.querybudget.QueryBudgetMiddleware",
 ]
 
+if "django_browser_reload" in DEV_APPS:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.clickjacking.XFrameOptionsMiddleware") + 1,
+        "django_browser_reload.middleware.BrowserReloadMiddleware",
+    )
+
+# Flag views issuing more SQL queries than their @query_budget
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_RAISE = os.environ.get("QUERY_BUDGET_RAISE", "0") == "1"
+
+# Server-Timing headers break every response's time down into SQL,
+# templates, permissions and claims; they show internals to any client
+DASHBOARD_SERVER_TIMING = os.environ.get("DASHBOARD_SERVER_TIMING", "1" if DEBUG else "0") == "1"
+# Bearer token Prometheus scrapes /metrics/ with; admins can always read it
+DASHBOARD_METRICS_TOKEN = os.environ.get("DASHBOARD_METRICS_TOKEN", "")
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "dashboard.instrumentation.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -69,12 +101,155 @@ TEMPLATES = [
 WSGI_APPLICATION = "core.wsgi.application"
 ASGI_APPLICATION = "core.asgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Database: "sqlite" (default) or "postgres" (needs psycopg 3, and
+# psycopg_pool for DJANGO_DB_POOL)
+DB_BACKEND = os.environ.get("DJANGO_DB_BACKEND", "sqlite")
+# Seconds a connection is reused for; production keeps them open, checking
+# they still work before every request that reuses one
+CONN_MAX_AGE = int(os.environ.get("DJANGO_CONN_MAX_AGE", "600" if PRODUCTION else "0"))
+
+if DB_BACKEND == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DJANGO_DB_NAME", "dashboard"),
+            "USER": os.environ.get("DJANGO_DB_USER", ""),
+            "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
+            "HOST": os.environ.get("DJANGO_DB_HOST", ""),
+            "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": PRODUCTION,
+            "OPTIONS": {},
+        }
+    }
+    if os.environ.get("DJANGO_DB_POOL", "1" if PRODUCTION else "0") == "1":
+        # A pool shared by the threads of the process, which also suits
+        # ASGI where persistent connections are per thread; the pool
+        # replaces CONN_MAX_AGE
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DJANGO_DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DJANGO_DB_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.environ.get("DJANGO_DB_POOL_TIMEOUT", "10")),
+        }
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+elif DB_BACKEND == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DJANGO_DB_NAME", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": PRODUCTION,
+            "OPTIONS": {},
+            # A file rather than shared-cache memory, whose table locks fail
+            # at once instead of waiting; the transition race tests need it
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+    if PRODUCTION:
+        DATABASES["default"]["OPTIONS"] = {
+            # Run on every new connection. WAL lets readers proceed while
+            # a write is in progress; synchronous=NORMAL is durable across
+            # application crashes in WAL mode, only a power loss can drop
+            # the last commits. mmap and a 64 MiB page cache save reads.
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                f"PRAGMA mmap_size={int(os.environ.get('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))};"
+                f"PRAGMA cache_size=-{int(os.environ.get('DJANGO_SQLITE_CACHE_KB', 64 * 1024))};"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+            # Wait for the write lock instead of failing at once, and take
+            # it when a transaction starts so it never has to be upgraded
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+        }
+else:
+    raise ImproperlyConfigured(f"Unknown DJANGO_DB_BACKEND {DB_BACKEND!r}")
+
+# Read replicas of the default database: comma separated SQLite files
+# (kept up to date with the sync_replicas command) or Postgres hosts.
+# Read-only views read the trades from them, see dashboard.routers.
+DB_REPLICAS = [replica for replica in os.environ.get("DJANGO_DB_REPLICAS", "").split(",") if replica]
+DASHBOARD_DB_REPLICAS = []
+for number, replica in enumerate(DB_REPLICAS, 1):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME" if DB_BACKEND == "sqlite" else "HOST": replica,
+        "TEST": {"MIRROR": "default"},
+    }
+    DASHBOARD_DB_REPLICAS.append(alias)
+# "round_robin" or "latency" (the replica with the fastest recent queries)
+DASHBOARD_REPLICA_SELECTION = os.environ.get("DASHBOARD_REPLICA_SELECTION", "round_robin")
+# Seconds users read from the primary after a write; longer than the lag
+DASHBOARD_REPLICA_PIN_SECONDS = int(os.environ.get("DASHBOARD_REPLICA_PIN_SECONDS", "5"))
+
+if DASHBOARD_DB_REPLICAS:
+    DATABASE_ROUTERS = ["dashboard.routers.ReplicaRouter"]
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.contrib.auth.middleware.AuthenticationMiddleware") + 1,
+        "dashboard.routers.ReplicaPinningMiddleware",
+    )
+
+# Cache backend: "locmem" (per process, LRU bounded), "file" (shared by
+# the processes of one host) or "redis" (any Redis compatible server, e.g.
+# a local redis-server or valkey; needs the redis package). Production
+# needs a shared one: with locmem, cache invalidation (dashboard.cache)
+# would not reach the other worker processes
+CACHE_BACKEND = os.environ.get("DJANGO_CACHE_BACKEND", "" if PRODUCTION else "locmem")
+if PRODUCTION and CACHE_BACKEND not in ("file", "redis"):
+    raise ImproperlyConfigured("DJANGO_CACHE_BACKEND must be file or redis in production")
+CACHE_TIMEOUT = int(os.environ.get("DJANGO_CACHE_TIMEOUT", "300"))
+CACHE_MAX_ENTRIES = int(os.environ.get("DJANGO_CACHE_MAX_ENTRIES", "10000"))
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("DJANGO_CACHE_URL", "redis://127.0.0.1:6379/0"),
+            "TIMEOUT": CACHE_TIMEOUT,
+            "KEY_PREFIX": "dashboard",
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", str(BASE_DIR / ".cache")),
+            "TIMEOUT": CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "dashboard",
+            "TIMEOUT": CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES, "CULL_FREQUENCY": 4},
+        }
     }
-}
+
+# How long rendered fragments of the trades pages are kept
+DASHBOARD_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_FRAGMENT_CACHE_TIMEOUT", "300"))
+
+# Serve the trades list, trade detail and stats header with their async
+# views. Meant for ASGI (core.asgi); under WSGI every async view costs an
+# extra event loop hop
+DASHBOARD_ASYNC_VIEWS = os.environ.get("DASHBOARD_ASYNC_VIEWS", "0") == "1"
+
+# Pub/sub backend of the live trades feed: "local" delivers within one
+# process, "redis" across every server process (needs the redis package)
+PUBSUB_BACKEND = os.environ.get("DASHBOARD_PUBSUB_BACKEND", "local")
+
+if PUBSUB_BACKEND == "redis":
+    DASHBOARD_PUBSUB_BACKEND = "dashboard.pubsub.RedisBroker"
+    DASHBOARD_PUBSUB_OPTIONS = {
+        "url": os.environ.get("DASHBOARD_PUBSUB_URL", "redis://127.0.0.1:6379/0"),
+    }
+else:
+    DASHBOARD_PUBSUB_BACKEND = "dashboard.pubsub.LocalBroker"
+    DASHBOARD_PUBSUB_OPTIONS = {}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,6 +303,47 @@ AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
 )
 
+LOG_LEVEL = os.environ.get("DJANGO_LOG_LEVEL", "INFO")
+# One INFO line per request with its timings, on the dashboard.timing
+# logger; off unless TIMING_LOG_LEVEL=INFO opts in
+TIMING_LOG_LEVEL = os.environ.get("TIMING_LOG_LEVEL", "WARNING")
+# Permission predicates log at DEBUG on every check, sample them
+PERMISSION_LOG_LEVEL = os.environ.get("PERMISSION_LOG_LEVEL", "INFO")
+PERMISSION_LOG_SAMPLE_RATE = float(os.environ.get("PERMISSION_LOG_SAMPLE_RATE", "0.01"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "structured": {
+            "format": "time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s",
+        },
+    },
+    "filters": {
+        "sampled": {
+            "()": "dashboard.instrumentation.SamplingFilter",
+            "rate": PERMISSION_LOG_SAMPLE_RATE,
+        },
+    },
+    "handlers": {
+        "queue": {
+            "class": "dashboard.instrumentation.QueueListenerHandler",
+            "formatter": "structured",
+        },
+    },
+    "loggers": {
+        "core": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "dashboard": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "dashboard.timing": {"handlers": ["queue"], "level": TIMING_LOG_LEVEL, "propagate": False},
+        "dashboard.policies": {
+            "handlers": ["queue"],
+            "level": PERMISSION_LOG_LEVEL,
+            "filters": ["sampled"],
+            "propagate": False,
+        },
+    },
+}
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SESSION_COOKIE_SECURE = False if DEBUG else True
 CSRF_COOKIE_SECURE = False if DEBUG else True
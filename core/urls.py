@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
@@ -5,11 +6,13 @@ from core.views.logout import LogoutView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('__reload__/', include('django_browser_reload.urls')),
     path('oidc/', include('mozilla_django_oidc.urls')),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('', include('dashboard.urls', namespace='dashboard')),
 ]
 
+if 'django_browser_reload' in settings.INSTALLED_APPS:
+    urlpatterns.insert(1, path('__reload__/', include('django_browser_reload.urls')))
+
 # Custom error handlers
 handler403 = 'core.views.error_handlers.permission_denied_view'
@@ -0,0 +1,295 @@
+"""JSON API over trades with sparse fieldsets, ETags and conditional requests"""
+import hashlib
+import json
+import re
+from datetime import datetime
+from decimal import Decimal
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST
+
+from .forms import normalize_symbol
+from .models import Trade, TradeEvent
+from .pagination import KeysetPaginator
+from .permissions import get_permissions
+from .querybudget import query_budget
+from .routers import replica_reads
+from .workflow import ACTION_PERMISSIONS, TRANSITIONS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the json module is the fallback
+    orjson = None
+
+# API field -> lookup
+FIELDS = {
+    "id": "id",
+    "symbol": "symbol",
+    "trade_type": "trade_type",
+    "quantity": "quantity",
+    "price": "price",
+    "status": "status",
+    "created_by": "created_by__username",
+    "created_at": "created_at",
+    "confirmed_by": "confirmed_by__username",
+    "confirmed_at": "confirmed_at",
+    "approved_by": "approved_by__username",
+    "approved_at": "approved_at",
+    "notes": "notes",
+    "version": "version",
+}
+LIST_FIELDS = [name for name in FIELDS if name != "notes"]
+DETAIL_FIELDS = list(FIELDS)
+
+# Read for every row: pagination, permissions and validators
+INTERNAL_LOOKUPS = ["id", "created_at", "version", "status", "created_by_id"]
+
+STATUSES = {status for status, _ in Trade.STATUSES}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# "<trade id>-<version>-<fields digest>", as sent in a trade's ETag
+TRADE_ETAG = re.compile(r'^(?:W/)?"(\d+)-(\d+)-[0-9a-f]+"$')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(",", ":")).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(encode(data), content_type="application/json", status=status)
+
+
+def api_view(view_func):
+    """JSON errors instead of login redirects and error pages"""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response({"error": "Authentication required"}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as exc:
+            return json_response({"error": str(exc)}, status=exc.status)
+
+    return wrapper
+
+
+def parse_fields(value, default):
+    """The requested sparse fieldset, in request order"""
+    if not value:
+        return default
+    names = []
+    for name in value.split(","):
+        name = name.strip()
+        if name not in FIELDS:
+            raise ApiError(f"Unknown field: {name}")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError(f"Invalid limit: {value}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def _fields_digest(fields):
+    return hashlib.blake2b(",".join(fields).encode(), digest_size=4).hexdigest()
+
+
+def trade_etag(trade_id, version, fields):
+    return f'"{trade_id}-{version}-{_fields_digest(fields)}"'
+
+
+def _last_changed():
+    """When the trade last changed, from its latest event"""
+    return Subquery(
+        TradeEvent.objects.filter(trade=OuterRef("pk")).order_by("-id").values("at")[:1]
+    )
+
+
+def _rows(queryset, fields):
+    """Named rows holding the internal columns, the fields' columns and last_changed"""
+    lookups = list(INTERNAL_LOOKUPS)
+    for name in fields:
+        if FIELDS[name] not in lookups:
+            lookups.append(FIELDS[name])
+    return queryset.annotate(last_changed=_last_changed()).values_list(*lookups, "last_changed", named=True)
+
+
+def _serialize(row, fields):
+    return {name: getattr(row, FIELDS[name]) for name in fields}
+
+
+def _last_modified(rows):
+    stamps = [row.last_changed or row.created_at for row in rows]
+    return max(stamps) if stamps else None
+
+
+def _conditional(request, etag, last_modified, build):
+    """304 if the client's copy is current, else the response `build` returns"""
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # The answer depends on who is asking
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@replica_reads
+@api_view
+@require_GET
+@query_budget(3)
+def trades(request):
+    """A page of the trades the user may list, newest first"""
+    permissions = get_permissions(request)
+    if not permissions.has_perm("trade.view_tradelist"):
+        raise ApiError("You don't have permission to list trades", status=403)
+
+    fields = parse_fields(request.GET.get("fields"), LIST_FIELDS)
+    limit = parse_limit(request.GET.get("limit"))
+    queryset = permissions.filter_permitted("trade.view_tradelist", Trade.objects.all())
+    status = request.GET.get("status")
+    if status:
+        if status not in STATUSES:
+            raise ApiError(f"Invalid status: {status}")
+        queryset = queryset.filter(status=status)
+    if request.GET.get("symbol"):
+        queryset = queryset.filter(symbol=normalize_symbol(request.GET["symbol"]))
+    if request.GET.get("user"):
+        queryset = queryset.filter(created_by__username=request.GET["user"])
+
+    paginator = KeysetPaginator(_rows(queryset, fields), limit, count_limit=None)
+    page = paginator.get_page(after=request.GET.get("after"), before=request.GET.get("before"))
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(fields).encode())
+    for row in page.object_list:
+        digest.update(f"|{row.id}-{row.version}".encode())
+    digest.update(f"|{page.next_cursor}|{page.previous_cursor}".encode())
+
+    return _conditional(
+        request,
+        f'"{digest.hexdigest()}"',
+        _last_modified(page.object_list),
+        lambda: json_response({
+            "results": [_serialize(row, fields) for row in page.object_list],
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        }),
+    )
+
+
+def _get_trade_row(request, trade_id, fields):
+    row = _rows(Trade.objects.filter(pk=trade_id), fields).first()
+    if row is None:
+        raise ApiError("No trade matches the given query.", status=404)
+    if not get_permissions(request).has_perm("trade.view_trade", row):
+        raise ApiError("You don't have permission to view this trade", status=403)
+    return row
+
+
+def _trade_response(request, row, fields, status=200):
+    return _conditional(
+        request,
+        trade_etag(row.id, row.version, fields),
+        row.last_changed or row.created_at,
+        lambda: json_response(_serialize(row, fields), status=status),
+    )
+
+
+@replica_reads
+@api_view
+@require_GET
+@query_budget(3)
+def trade(request, trade_id):
+    """One trade"""
+    fields = parse_fields(request.GET.get("fields"), DETAIL_FIELDS)
+    return _trade_response(request, _get_trade_row(request, trade_id, fields), fields)
+
+
+def _expected_versions(request, trade_id):
+    """Versions of the trade the If-Match header accepts, None for any"""
+    header = request.headers.get("If-Match")
+    if not header or header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        match = TRADE_ETAG.match(tag.strip())
+        if match and int(match.group(1)) == trade_id:
+            versions.add(int(match.group(2)))
+    return versions
+
+
+# The transition writes the event log and projections, creating their
+# rows on first use
+@api_view
+@require_POST
+@query_budget(20)
+def trade_transition(request, trade_id, action):
+    """
+    Apply a workflow action to a trade and return it as it is now. Answers
+    409 if the trade is not in the action's source status or changed while
+    the action was applied.
+    """
+    if action not in TRANSITIONS or action not in ACTION_PERMISSIONS:
+        raise ApiError(f"Unknown action: {action}", status=404)
+    fields = parse_fields(request.GET.get("fields"), DETAIL_FIELDS)
+    trade = (
+        Trade.objects.filter(pk=trade_id)
+        .only("id", "symbol", "trade_type", "quantity", "price", "status", "created_by_id", "version")
+        .first()
+    )
+    if trade is None:
+        raise ApiError("No trade matches the given query.", status=404)
+    permissions = get_permissions(request)
+    if not permissions.has_perm("trade.view_trade", trade):
+        raise ApiError("You don't have permission to view this trade", status=403)
+    if not permissions.has_perm(ACTION_PERMISSIONS[action], trade):
+        raise ApiError(f"You don't have permission to {action} this trade", status=403)
+
+    versions = _expected_versions(request, trade.id)
+    if versions is not None and trade.version not in versions:
+        raise ApiError("The trade has changed since it was read", status=412)
+    if trade.status != TRANSITIONS[action].source:
+        raise ApiError(f"Cannot {action} a trade in {trade.status} status", status=409)
+    if not trade.transition(action, request.user):
+        raise ApiError("The trade was changed by someone else", status=409)
+
+    row = _get_trade_row(request, trade.id, fields)
+    response = json_response(_serialize(row, fields))
+    response["ETag"] = trade_etag(row.id, row.version, fields)
+    return response
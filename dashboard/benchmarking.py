@@ -0,0 +1,239 @@
+"""Helpers shared by the benchmarking and query checking management commands"""
+import asyncio
+import base64
+import io
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.utils import timezone
+
+from .loadtest import LoadResult, percentile
+from .models import DjangoUser, Trade
+from .stats import rebuild_trade_stats
+
+ALL_ROLES = ["admin", "reader", "trader", "confirms", "approver"]
+
+BENCHMARK_USER = "__benchmark__"
+
+
+def fake_id_token(claims):
+    """An unsigned JWT carrying `claims`, good enough for the claims service"""
+
+    def encode(data):
+        raw = json.dumps(data).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    return f"{encode({'alg': 'none'})}.{encode(claims)}.probe"
+
+
+class Probe:
+    def __init__(self, client, user, trade):
+        self.client = client
+        self.user = user
+        self.trade = trade
+
+
+@contextmanager
+def probe_environment(trades=1, roles=ALL_ROLES, superuser=True, host="localhost"):
+    """
+    Yield a Probe whose client is logged in as a throwaway user. Everything
+    created inside the block is rolled back afterwards.
+    """
+    with transaction.atomic():
+        user = DjangoUser.objects.create_user(
+            "__probe__",
+            email="probe@example.invalid",
+            roles=list(roles),
+            is_superuser=superuser,
+        )
+        now = timezone.now()
+        rng = random.Random(0)
+        Trade.objects.bulk_create(
+            Trade(
+                symbol=rng.choice(["AAPL", "MSFT", "GOOGL", "AMZN"]),
+                trade_type=rng.choice(["BUY", "SELL"]),
+                quantity=rng.randint(1, 1000),
+                price=Decimal(rng.randint(100, 50000)) / 100,
+                status=rng.choice(["PENDING", "CONFIRMED", "APPROVED"]),
+                created_by=user,
+                created_at=now - timedelta(seconds=i),
+            )
+            for i in range(max(trades - 1, 0))
+        )
+        # The newest trade is created normally so signals see it
+        trade = Trade.objects.create(
+            symbol="PROBE",
+            trade_type="BUY",
+            quantity=1,
+            price=Decimal("1.00"),
+            status="PENDING",
+            created_by=user,
+        )
+        rebuild_trade_stats()
+
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+        session = client.session
+        session["oidc_id_token"] = fake_id_token(
+            {
+                "sub": "probe",
+                "email": user.email,
+                "picture": "https://example.invalid/probe.png",
+                "django/roles": list(roles),
+            }
+        )
+        session.save()
+        try:
+            yield Probe(client, user, trade)
+        finally:
+            transaction.set_rollback(True)
+
+
+def benchmark_session():
+    """Session cookie value of the committed benchmark user"""
+    user, _ = DjangoUser.objects.get_or_create(
+        username=BENCHMARK_USER,
+        defaults={"email": "benchmark@example.invalid", "roles": ALL_ROLES},
+    )
+    client = Client()
+    client.force_login(user)
+    session = client.session
+    session["oidc_id_token"] = fake_id_token(
+        {"sub": BENCHMARK_USER, "email": user.email, "django/roles": ALL_ROLES}
+    )
+    session.save()
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def time_requests(client, url, iterations, warmup=3, check_status=True):
+    """Wall clock seconds of `iterations` GET requests to url"""
+    for _ in range(warmup):
+        client.get(url)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - start)
+        if check_status and response.status_code >= 400:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+    return samples
+
+
+def _split(url):
+    path, _, query = url.partition("?")
+    return path, query
+
+
+def wsgi_load(application, urls, total, concurrency, headers):
+    """GET `urls` round robin `total` times from `concurrency` threads"""
+    lock = threading.Lock()
+    issued = iter(range(total))
+    latencies = []
+    errors = []
+
+    def client():
+        while True:
+            with lock:
+                index = next(issued, None)
+            if index is None:
+                return
+            path, query = _split(urls[index % len(urls)])
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": query,
+                "wsgi.input": io.BytesIO(),
+                **{f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()},
+            }
+            setup_testing_defaults(environ)
+            status = []
+            start = time.perf_counter()
+            body = application(environ, lambda code, response_headers, exc_info=None: status.append(code))
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not status[0].startswith("200"):
+                    errors.append(f"{path}: {status[0]}")
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return LoadResult(latencies, errors, time.perf_counter() - started)
+
+
+def asgi_load(application, urls, total, concurrency, headers):
+    """GET `urls` round robin `total` times from `concurrency` asyncio tasks"""
+    latencies = []
+    errors = []
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+    async def request(url):
+        path, query = _split(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        received = asyncio.Event()
+        status = []
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Nothing more to send; the client never disconnects early
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await application(scope, receive, send)
+        return status[0]
+
+    async def main():
+        issued = iter(range(total))
+
+        async def client():
+            for index in issued:
+                url = urls[index % len(urls)]
+                start = time.perf_counter()
+                status = await request(url)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(f"{url}: {status}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(main())
+    return LoadResult(latencies, errors, elapsed)
+
@@ -0,0 +1,66 @@
+"""Multi-row INSERTs from tuples of values already in database form"""
+from itertools import chain
+
+from django.db import connection
+
+
+def _insert_sql(model, columns, rows_per_statement):
+    quote = connection.ops.quote_name
+    names = ", ".join(quote(column) for column in columns)
+    values = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return (
+        f"INSERT INTO {quote(model._meta.db_table)} ({names}) "
+        f"VALUES {', '.join([values] * rows_per_statement)}"
+    )
+
+
+def _insert_returning(cursor, model, columns, rows, per_statement):
+    """Insert `rows` and return their primary keys, in the order of `rows`"""
+    pk_column = model._meta.pk.column
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # One row per statement, each reporting its own id
+        pks = []
+        for row in rows:
+            cursor.execute(_insert_sql(model, columns, 1), row)
+            pks.append(connection.ops.last_insert_id(cursor, model._meta.db_table, pk_column))
+        return pks
+
+    # Rows come back in VALUES order, which bulk_create() relies on too
+    returning = f" RETURNING {connection.ops.quote_name(pk_column)}"
+    pks = []
+    for i in range(0, len(rows), per_statement):
+        batch = rows[i:i + per_statement]
+        cursor.execute(_insert_sql(model, columns, len(batch)) + returning, list(chain.from_iterable(batch)))
+        pks.extend(pk for pk, in cursor.fetchall())
+    return pks
+
+
+def insert_tuples(model, field_names, rows, returning=False):
+    """
+    Insert `rows`, tuples ordered as `field_names`, into model's table.
+    With `returning`, return the primary keys of the new rows in the order
+    of `rows`.
+    """
+    if not rows:
+        return [] if returning else None
+    fields = [model._meta.get_field(name) for name in field_names]
+    columns = [field.column for field in fields]
+    per_statement = max(connection.ops.bulk_batch_size(fields, rows), 1)
+    full = len(rows) - len(rows) % per_statement
+
+    with connection.cursor() as cursor:
+        if returning:
+            return _insert_returning(cursor, model, columns, rows, per_statement)
+        if full:
+            cursor.executemany(
+                _insert_sql(model, columns, per_statement),
+                [
+                    list(chain.from_iterable(rows[i:i + per_statement]))
+                    for i in range(0, full, per_statement)
+                ],
+            )
+        if full < len(rows):
+            cursor.execute(
+                _insert_sql(model, columns, len(rows) - full),
+                list(chain.from_iterable(rows[full:])),
+            )
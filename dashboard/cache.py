@@ -0,0 +1,101 @@
+"""Cache keys and generation based invalidation for the dashboard"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models.trade import Trade
+from .positions import positions
+from .routers import pin_seconds, reading_from_replicas
+
+GENERATION_KEY = "dashboard:trades:generation"
+
+
+def fragment_timeout():
+    timeout = getattr(settings, "DASHBOARD_FRAGMENT_CACHE_TIMEOUT", 300)
+    if reading_from_replicas():
+        # A lagging replica can miss changes made after the generation was
+        # bumped, don't keep what it returned for longer than the lag
+        return min(timeout, pin_seconds())
+    return timeout
+
+
+def _fresh_generation():
+    # Seeded from the clock so a counter that was evicted restarts above
+    # every value it may have had before
+    return time.time_ns() // 1000
+
+
+def trades_generation():
+    """Current trade generation, initialising it on first use"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def atrades_generation():
+    """trades_generation() for async code"""
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def invalidate_trades():
+    """Make every trade dependent cache entry stale"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+
+
+def role_cache_key(user):
+    """Identify everything that decides what `user` is allowed to see"""
+    if not user or not user.is_authenticated:
+        return "anonymous"
+    if user.is_active and user.is_superuser:
+        return "superuser"
+    return ",".join(sorted(user.roles or ())) or "none"
+
+
+def get_cached_trade(trade_id):
+    """A trade with its users joined in, cached until trades change"""
+    key = f"dashboard:trade:{trade_id}:{trades_generation()}"
+    trade = cache.get(key)
+    if trade is None:
+        trade = Trade.objects.for_detail().filter(id=trade_id).first()
+        if trade is None:
+            raise Http404("No Trade matches the given query.")
+        cache.set(key, trade, fragment_timeout())
+    return trade
+
+
+async def aget_cached_trade(trade_id):
+    """get_cached_trade() for async views"""
+    key = f"dashboard:trade:{trade_id}:{await atrades_generation()}"
+    trade = await cache.aget(key)
+    if trade is None:
+        trade = await Trade.objects.for_detail().filter(id=trade_id).afirst()
+        if trade is None:
+            raise Http404("No Trade matches the given query.")
+        await cache.aset(key, trade, fragment_timeout())
+    return trade
+
+
+def cached_trade_getter(request, trade_id):
+    """objectgetter replacement for permission_required backed by the cache"""
+    return get_cached_trade(trade_id)
+
+
+def get_cached_positions(by):
+    """positions() of approved trades, cached until trades change"""
+    key = f"dashboard:positions:{by}:{trades_generation()}"
+    result = cache.get(key)
+    if result is None:
+        result = positions(by)
+        cache.set(key, result, fragment_timeout())
+    return result
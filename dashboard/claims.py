@@ -0,0 +1,138 @@
+"""OIDC claims decoded once at login, kept in the session and read lazily"""
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+SESSION_KEY = "oidc_claims"
+CACHE_SIZE = 1024
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def decode_jwt(token: str) -> Dict:
+    """Decode the payload of a JWT without verifying it"""
+    if not token or "." not in token:
+        return {}
+    try:
+        parts = token.split(".")
+        if len(parts) != 3:
+            return {}
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        data = base64.urlsafe_b64decode(payload.encode("utf-8"))
+        return json.loads(data.decode("utf-8"))
+    except Exception:
+        return {}
+
+
+def normalize_roles(claims: Dict):
+    """Roles from the Okta `django/roles` claim as a list of strings"""
+    roles = claims.get("django/roles") or claims.get("django_roles") or []
+    if isinstance(roles, str):
+        if "," in roles:
+            roles = [r.strip() for r in roles.split(",") if r.strip()]
+        else:
+            roles = [roles]
+    if not isinstance(roles, (list, tuple)):
+        roles = []
+    return list(roles)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class OIDCClaims:
+    """Parsed claims of an id_token"""
+
+    def __init__(self, claims=None, roles=None):
+        self.claims = claims or {}
+        self.roles = roles if roles is not None else normalize_roles(self.claims)
+
+    @property
+    def picture(self):
+        return self.claims.get("picture")
+
+    def __bool__(self):
+        return bool(self.claims)
+
+
+EMPTY_CLAIMS = OIDCClaims()
+
+
+def parse_token(token: str) -> OIDCClaims:
+    """Decode a token, reusing earlier results for the same token"""
+    key = token_hash(token)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    parsed = OIDCClaims(decode_jwt(token))
+    with _cache_lock:
+        _cache[key] = parsed
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return parsed
+
+
+def get_id_token(session):
+    return session.get("oidc_id_token") or session.get("OIDC_ID_TOKEN")
+
+
+def store_claims(session, token: str) -> OIDCClaims:
+    """Parse a token and keep the result in the session"""
+    parsed = parse_token(token)
+    session[SESSION_KEY] = {
+        "token_hash": token_hash(token),
+        "claims": parsed.claims,
+        "roles": parsed.roles,
+    }
+    return parsed
+
+
+def load_claims(request) -> OIDCClaims:
+    """Claims of the session's id_token, from the session when possible"""
+    session = getattr(request, "session", None)
+    if session is None:
+        return EMPTY_CLAIMS
+    token = get_id_token(session)
+    if not token:
+        return EMPTY_CLAIMS
+
+    stored = session.get(SESSION_KEY)
+    if stored and stored.get("token_hash") == token_hash(token):
+        return OIDCClaims(stored["claims"], stored["roles"])
+    return store_claims(session, token)
+
+
+def get_claims(request) -> OIDCClaims:
+    """Claims of the current request, parsed at most once per request"""
+    claims = getattr(request, "oidc_claims", None)
+    if claims is None:
+        claims = load_claims(request)
+        request.oidc_claims = claims
+    return claims
+
+
+class ClaimsMiddleware:
+    """Expose the session's OIDC claims lazily as request.oidc_claims"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.oidc_claims = SimpleLazyObject(lambda: load_claims(request))
+        # Returns the coroutine of an async get_response as is
+        return self.get_response(request)
@@ -0,0 +1,29 @@
+"""Running independent database work on worker threads from async views"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+
+def _isolated(func):
+    def run():
+        try:
+            return func()
+        finally:
+            # Worker threads are reused; do not leave connections open in them
+            connections.close_all()
+
+    return run
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+async def run_concurrently(*funcs):
+    """Call the sync `funcs` in parallel worker threads and return their results in order"""
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(
+        *(sync_to_async(_isolated(func), thread_sensitive=False)() for func in funcs)
+    )
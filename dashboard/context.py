@@ -1,40 +1,24 @@
-import base64, json
-from typing import Dict
+from django.utils.functional import SimpleLazyObject
+
+from .claims import get_claims
+from .instrumentation import timed
+
+
+def _lazy_claim(request, attribute):
+    def load():
+        with timed("claims"):
+            return getattr(get_claims(request), attribute)
+
+    return SimpleLazyObject(load)
 
-def _decode_jwt(token: str) -> Dict:
-    if not token or '.' not in token:
-        return {}
-    try:
-        parts = token.split('.')
-        if len(parts) != 3:
-            return {}
-        payload = parts[1] + '=' * (-len(parts[1]) % 4)
-        data = base64.urlsafe_b64decode(payload.encode('utf-8'))
-        return json.loads(data.decode('utf-8'))
-    except Exception:
-        return {}
 
 def user_claims(request):
-    id_token = request.session.get('oidc_id_token') or request.session.get('OIDC_ID_TOKEN')
-    claims = _decode_jwt(id_token) if id_token else {}
-    picture = claims.get('picture')
-    
-    # Extract roles for global access
-    roles = claims.get('django/roles') or claims.get('django_roles') or []
-    if isinstance(roles, str):
-        if ',' in roles:
-            roles = [r.strip() for r in roles.split(',') if r.strip()]
-        else:
-            roles = [roles]
-    if not isinstance(roles, (list, tuple)):
-        roles = []
-    
-    # Store roles in user object for django-rules
-    if request.user.is_authenticated:
-        request.user._oidc_roles = roles
-    
+    """
+    Expose the OIDC claims to templates. Every value is lazy: claims are
+    only loaded when a template actually reads one of them.
+    """
     return {
-        'oidc_id_claims': claims,
-        'oidc_user_picture': picture,
-        'user_roles': roles,
+        'oidc_id_claims': _lazy_claim(request, 'claims'),
+        'oidc_user_picture': _lazy_claim(request, 'picture'),
+        'user_roles': _lazy_claim(request, 'roles'),
     }
@@ -0,0 +1,288 @@
+"""Append-only trade event log and the projections folded from it"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from functools import partial
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .bulk import insert_tuples
+from .feed import publish_events
+from .models import SymbolPosition, TradeEvent, TradeStat, UserActivity
+from .models.tradeevent import STATUS_CODES, STATUS_NAMES
+from .stats import apply_trade_deltas
+
+EVENT_FIELDS = (
+    "trade", "kind", "actor", "at", "from_status", "to_status", "symbol", "quantity", "price",
+)
+
+Event = namedtuple(
+    "Event",
+    ["trade_id", "kind", "actor_id", "at", "from_status", "to_status", "symbol", "quantity", "price"],
+)
+
+# Trade.transition() actions
+ACTION_KINDS = {
+    "confirm": TradeEvent.CONFIRMED,
+    "unconfirm": TradeEvent.UNCONFIRMED,
+    "approve": TradeEvent.APPROVED,
+    "reject": TradeEvent.REJECTED,
+}
+
+APPROVED = STATUS_CODES["APPROVED"]
+
+
+# The fields of a trade the event log records
+SNAPSHOT_FIELDS = ("symbol", "trade_type", "quantity", "price", "status")
+
+
+def snapshot(trade):
+    return tuple(getattr(trade, name) for name in SNAPSHOT_FIELDS)
+
+
+def _kind_for(old_status, new_status):
+    if (old_status, new_status) == ("PENDING", "CONFIRMED"):
+        return TradeEvent.CONFIRMED
+    if (old_status, new_status) == ("CONFIRMED", "PENDING"):
+        return TradeEvent.UNCONFIRMED
+    if new_status == "APPROVED":
+        return TradeEvent.APPROVED
+    if new_status == "REJECTED":
+        return TradeEvent.REJECTED
+    return TradeEvent.AMENDED
+
+
+def make_event(trade_id, kind, actor_id, at, from_status, to_status, trade_snapshot):
+    symbol, trade_type, quantity, price, _ = trade_snapshot
+    return Event(
+        trade_id,
+        kind,
+        actor_id,
+        at,
+        STATUS_CODES[from_status] if from_status else None,
+        STATUS_CODES[to_status] if to_status else None,
+        symbol,
+        quantity if trade_type == "BUY" else -quantity,
+        Decimal(price),
+    )
+
+
+def events_for_change(trade_id, old, new, actor_id, at, kind=None):
+    """
+    Events for a trade going from snapshot `old` to `new`, either of which
+    is None for a creation or deletion.
+    """
+    if old is None:
+        return [make_event(trade_id, TradeEvent.CREATED, actor_id, at, None, new[4], new)]
+    if new is None:
+        return [make_event(trade_id, TradeEvent.DELETED, actor_id, at, old[4], None, old)]
+    if old[:4] == new[:4]:
+        if old[4] == new[4]:
+            return []
+        kind = kind or _kind_for(old[4], new[4])
+        return [make_event(trade_id, kind, actor_id, at, old[4], new[4], new)]
+    return [
+        make_event(trade_id, TradeEvent.AMENDED, actor_id, at, old[4], None, old),
+        make_event(trade_id, TradeEvent.AMENDED, actor_id, at, None, new[4], new),
+    ]
+
+
+def history_events(trade_id, trade_snapshot, created_by_id, created_at,
+                   confirmed_by_id=None, confirmed_at=None, approved_by_id=None, approved_at=None):
+    """
+    The lifecycle of a trade written without going through the log (bulk
+    sample data), reconstructed from its workflow columns.
+    """
+    status = trade_snapshot[4]
+    events = [
+        make_event(trade_id, TradeEvent.CREATED, created_by_id, created_at, None, "PENDING", trade_snapshot)
+    ]
+    if status == "PENDING":
+        return events
+    confirmed_at = confirmed_at or created_at
+    events.append(make_event(
+        trade_id, TradeEvent.CONFIRMED, confirmed_by_id, confirmed_at, "PENDING", "CONFIRMED", trade_snapshot
+    ))
+    if status == "APPROVED":
+        events.append(make_event(
+            trade_id, TradeEvent.APPROVED, approved_by_id, approved_at or confirmed_at,
+            "CONFIRMED", "APPROVED", trade_snapshot,
+        ))
+    elif status == "REJECTED":
+        events.append(make_event(
+            trade_id, TradeEvent.REJECTED, None, confirmed_at, "CONFIRMED", "REJECTED", trade_snapshot
+        ))
+    return events
+
+
+class Projection:
+    """Projection deltas accumulated over a sequence of events"""
+
+    def __init__(self):
+        # (symbol, status code) -> [count, notional]
+        self.stats = defaultdict(lambda: [0, Decimal(0)])
+        # symbol -> [trades, bought, sold, buy notional, sell notional]
+        self.positions = defaultdict(lambda: [0, 0, 0, Decimal(0), Decimal(0)])
+        # (user id, kind) -> [count, latest]
+        self.activity = {}
+
+    def add(self, events):
+        for event in events:
+            notional = abs(event.quantity) * event.price
+            for status, sign in ((event.from_status, -1), (event.to_status, 1)):
+                if status is None:
+                    continue
+                stat = self.stats[(event.symbol, status)]
+                stat[0] += sign
+                stat[1] += sign * notional
+                if status == APPROVED:
+                    position = self.positions[event.symbol]
+                    position[0] += sign
+                    if event.quantity > 0:
+                        position[1] += sign * event.quantity
+                        position[3] += sign * notional
+                    else:
+                        position[2] -= sign * event.quantity
+                        position[4] += sign * notional
+
+            # The outgoing half of an amendment is not a separate action
+            if event.actor_id is None or (event.kind == TradeEvent.AMENDED and event.to_status is None):
+                continue
+            activity = self.activity.get((event.actor_id, event.kind))
+            if activity is None:
+                self.activity[(event.actor_id, event.kind)] = [1, event.at]
+            else:
+                activity[0] += 1
+                if event.at > activity[1]:
+                    activity[1] = event.at
+        return self
+
+    def apply(self):
+        """Add the deltas to the projection tables"""
+        apply_trade_deltas(
+            (symbol, STATUS_NAMES[status], count, notional)
+            for (symbol, status), (count, notional) in self.stats.items()
+        )
+        for symbol, (trades, bought, sold, buy_notional, sell_notional) in self.positions.items():
+            if trades or bought or sold or buy_notional or sell_notional:
+                _add(
+                    SymbolPosition,
+                    {"symbol": symbol},
+                    {
+                        "trades": trades,
+                        "bought": bought,
+                        "sold": sold,
+                        "buy_notional": buy_notional,
+                        "sell_notional": sell_notional,
+                    },
+                )
+        for (user_id, kind), (count, last_at) in self.activity.items():
+            _add(UserActivity, {"user_id": user_id, "kind": kind}, {"count": count}, last_at)
+
+    def save(self):
+        """Write the totals into emptied projection tables"""
+        TradeStat.objects.bulk_create(
+            TradeStat(symbol=symbol, status=STATUS_NAMES[status], count=count, notional=notional)
+            for (symbol, status), (count, notional) in self.stats.items()
+            if count or notional
+        )
+        SymbolPosition.objects.bulk_create(
+            SymbolPosition(
+                symbol=symbol,
+                trades=trades,
+                bought=bought,
+                sold=sold,
+                buy_notional=buy_notional,
+                sell_notional=sell_notional,
+            )
+            for symbol, (trades, bought, sold, buy_notional, sell_notional) in self.positions.items()
+            if trades
+        )
+        UserActivity.objects.bulk_create(
+            UserActivity(user_id=user_id, kind=kind, count=count, last_at=last_at)
+            for (user_id, kind), (count, last_at) in self.activity.items()
+        )
+
+
+def _add(model, lookup, increments, last_at=None):
+    """Add `increments` to the row matching `lookup`, creating it if needed"""
+    updates = {name: F(name) + value for name, value in increments.items()}
+    defaults = dict(increments)
+    if last_at is not None:
+        latest = Value(last_at, output_field=DateTimeField())
+        updates["last_at"] = Greatest(Coalesce(F("last_at"), latest), latest)
+        defaults["last_at"] = last_at
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        # Another writer created the row in the meantime
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_events(events):
+    """Append events to the log and fold them into the projections"""
+    if not events:
+        return
+    ops = connection.ops
+    price_field = TradeEvent._meta.get_field("price")
+    max_digits, decimal_places = price_field.max_digits, price_field.decimal_places
+    stamps = {}
+    rows = []
+    for event in events:
+        at = stamps.get(event.at)
+        if at is None:
+            at = stamps[event.at] = ops.adapt_datetimefield_value(event.at)
+        rows.append((
+            event.trade_id,
+            event.kind,
+            event.actor_id,
+            at,
+            event.from_status,
+            event.to_status,
+            event.symbol,
+            event.quantity,
+            ops.adapt_decimalfield_value(event.price, max_digits, decimal_places),
+        ))
+    with transaction.atomic():
+        insert_tuples(TradeEvent, EVENT_FIELDS, rows)
+        Projection().add(events).apply()
+        # robust: the feed being unavailable must not fail the writer
+        transaction.on_commit(partial(publish_events, events), robust=True)
+
+
+@transaction.atomic
+def replay_events(batch_size=10000):
+    """
+    Rebuild every projection by folding the whole log, `batch_size`
+    events at a time. Returns the number of events replayed.
+    """
+    columns = [TradeEvent._meta.get_field(name).attname for name in EVENT_FIELDS]
+    projection = Projection()
+    replayed = 0
+    last_id = 0
+    while True:
+        rows = list(
+            TradeEvent.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", *columns)[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        replayed += len(rows)
+        projection.add(Event(*row[1:]) for row in rows)
+
+    TradeStat.objects.all().delete()
+    SymbolPosition.objects.all().delete()
+    UserActivity.objects.all().delete()
+    projection.save()
+    return replayed
+
+
+def trade_history(trade_id):
+    """Events of one trade in the order they happened"""
+    return TradeEvent.objects.filter(trade_id=trade_id).order_by("id")
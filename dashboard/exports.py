@@ -0,0 +1,136 @@
+"""Streaming trade exports"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models.trade import Trade
+from .permissions import filter_permitted
+
+STATUSES = {status for status, _ in Trade.STATUSES}
+
+# (column name, lookup)
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("symbol", "symbol"),
+    ("trade_type", "trade_type"),
+    ("quantity", "quantity"),
+    ("price", "price"),
+    ("status", "status"),
+    ("created_by", "created_by__username"),
+    ("created_at", "created_at"),
+    ("confirmed_by", "confirmed_by__username"),
+    ("confirmed_at", "confirmed_at"),
+    ("approved_by", "approved_by__username"),
+    ("approved_at", "approved_at"),
+    ("notes", "notes"),
+]
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_bound(value, end=False):
+    """
+    Parse a date or datetime filter value. Plain dates cover the whole day,
+    so an end bound of 2025-01-31 includes trades made on the 31st.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        raise ExportError(f"Invalid date: {value}")
+    if day:
+        moment = datetime.combine(day, time.min)
+        if end:
+            moment += timedelta(days=1)
+    elif moment is None:
+        raise ExportError(f"Invalid date: {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(user=None, status=None, since=None, until=None, created_by=None):
+    """
+    Trades matching the filters, restricted to what `user` may list when a
+    user is given. `until` is exclusive.
+    """
+    trades = Trade.objects.all()
+    if user is not None:
+        trades = filter_permitted(user, "trade.view_tradelist", trades)
+    if status:
+        if status not in STATUSES:
+            raise ExportError(f"Invalid status: {status}")
+        trades = trades.filter(status=status)
+    if since:
+        trades = trades.filter(created_at__gte=since)
+    if until:
+        trades = trades.filter(created_at__lt=until)
+    if created_by:
+        trades = trades.filter(created_by__username=created_by)
+    return trades.order_by("-created_at", "-id").values_list(
+        *(lookup for _, lookup in EXPORT_COLUMNS)
+    )
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=2000):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for chunk in _chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        yield "".join(writer.writerow(_plain(row)) for row in chunk)
+
+
+def iter_jsonl(queryset, chunk_size=2000):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for chunk in _chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(names, _plain(row))), separators=(",", ":")) + "\n"
+            for row in chunk
+        )
+
+
+def _plain(row):
+    """Render values the way both formats expect them"""
+    return [
+        value.isoformat() if isinstance(value, datetime)
+        else str(value) if value is not None and not isinstance(value, (int, str))
+        else value
+        for value in row
+    ]
+
+
+def iter_export(queryset, fmt, chunk_size=2000):
+    if fmt == "csv":
+        return iter_csv(queryset, chunk_size)
+    if fmt == "jsonl":
+        return iter_jsonl(queryset, chunk_size)
+    raise ExportError(f"Unknown format: {fmt}")
@@ -0,0 +1,155 @@
+"""Live feed of trade changes, streamed to the trades page as server-sent events"""
+import json
+import time
+from collections import namedtuple
+
+from .models import Trade, TradeEvent
+from .models.tradeevent import STATUS_NAMES
+from .pubsub import get_broker
+
+FEED_MAX_TRADE_EVENTS = 200
+
+# Seconds between keep-alive comments, which also notice gone clients
+KEEPALIVE_INTERVAL = 15
+
+# Streams are ended after this many seconds and the browser reconnects,
+# so a WSGI worker thread is not held by one page forever
+MAX_STREAM_AGE = 300
+
+# Milliseconds the browser waits before reconnecting
+RECONNECT_DELAY = 3000
+
+KIND_NAMES = {
+    TradeEvent.CREATED: "created",
+    TradeEvent.CONFIRMED: "confirmed",
+    TradeEvent.UNCONFIRMED: "unconfirmed",
+    TradeEvent.APPROVED: "approved",
+    TradeEvent.REJECTED: "rejected",
+    TradeEvent.AMENDED: "amended",
+    TradeEvent.DELETED: "deleted",
+}
+
+REFRESH = {"type": "refresh"}
+
+# What PermissionEngine needs to know about a trade
+FeedTrade = namedtuple("FeedTrade", ["status", "created_by_id"])
+
+
+def _changes(events):
+    """The events that are a change of their own (not an amendment's old half)"""
+    return [
+        event for event in events
+        if not (event.kind == TradeEvent.AMENDED and event.to_status is None)
+    ]
+
+
+def trade_messages(events):
+    """Feed messages for recorded events, with the trades' creators looked up in one query"""
+    changes = _changes(events)
+    creators = {
+        trade_id: (created_by_id, username, created_at)
+        for trade_id, created_by_id, username, created_at in Trade.objects.filter(
+            id__in={event.trade_id for event in changes}
+        ).values_list("id", "created_by_id", "created_by__username", "created_at")
+    }
+    messages = []
+    for event in changes:
+        created_by_id, username, created_at = creators.get(event.trade_id, (None, None, None))
+        status = STATUS_NAMES.get(event.to_status)
+        messages.append({
+            "type": "trade",
+            "kind": KIND_NAMES[event.kind],
+            "id": event.trade_id,
+            "status": status,
+            "previous_status": STATUS_NAMES.get(event.from_status),
+            "status_color": Trade(status=status).status_color,
+            "symbol": event.symbol,
+            "trade_type": "BUY" if event.quantity > 0 else "SELL",
+            "quantity": abs(event.quantity),
+            "price": str(event.price),
+            "total_value": str(abs(event.quantity) * event.price),
+            "created_by_id": created_by_id,
+            "created_by": username,
+            "created_at": created_at.isoformat() if created_at else None,
+            "at": event.at.isoformat(),
+        })
+    return messages
+
+
+def publish_events(events):
+    """Publish committed trade events to the open feeds"""
+    broker = get_broker()
+    if not broker.has_subscribers():
+        return
+    if len(events) > FEED_MAX_TRADE_EVENTS:
+        broker.publish(REFRESH)
+        return
+    for message in trade_messages(events):
+        broker.publish(message)
+
+
+def for_viewer(permissions, message):
+    """
+    The message as `permissions`' user should see it, or None if they may
+    not see the trade
+    """
+    if message["type"] != "trade":
+        return message
+    trade = FeedTrade(message["status"] or message["previous_status"], message["created_by_id"])
+    if not permissions.has_perm("trade.view_trade", trade):
+        return None
+    return {
+        **message,
+        "can_confirm": message["status"] is not None and permissions.has_perm("trade.confirm_trade", trade),
+        "can_approve": message["status"] is not None and permissions.has_perm("trade.approve_trade", trade),
+    }
+
+
+def format_event(message):
+    """One message in the text/event-stream format"""
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+
+def _stream_start():
+    return f"retry: {RECONNECT_DELAY}\n\n"
+
+
+def _next_chunk(permissions, subscription, message):
+    if subscription.overflowed:
+        # Messages were lost, the page has to reload what it shows
+        subscription.overflowed = False
+        return format_event(REFRESH)
+    if message is None:
+        return ": keepalive\n\n"
+    message = for_viewer(permissions, message)
+    return format_event(message) if message is not None else None
+
+
+def stream(permissions):
+    """The feed of one viewer, for WSGI servers"""
+    subscription = get_broker().subscribe()
+    try:
+        yield _stream_start()
+        deadline = time.monotonic() + MAX_STREAM_AGE
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=KEEPALIVE_INTERVAL)
+            chunk = _next_chunk(permissions, subscription, message)
+            if chunk is not None:
+                yield chunk
+    finally:
+        subscription.close()
+
+
+async def astream(permissions):
+    """The feed of one viewer, served from the event loop under ASGI"""
+    subscription = get_broker().subscribe()
+    try:
+        yield _stream_start()
+        deadline = time.monotonic() + MAX_STREAM_AGE
+        while time.monotonic() < deadline:
+            message = await subscription.aget(timeout=KEEPALIVE_INTERVAL)
+            chunk = _next_chunk(permissions, subscription, message)
+            if chunk is not None:
+                yield chunk
+    finally:
+        subscription.close()
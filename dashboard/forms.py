@@ -1,6 +1,27 @@
 from django import forms
 from .models.trade import Trade
 
+
+# Field rules shared by TradeForm and the bulk importer (dashboard.imports)
+
+def normalize_symbol(symbol):
+    if symbol:
+        return symbol.upper().strip()
+    return symbol
+
+
+def validate_price(price):
+    if price is not None and price <= 0:
+        raise forms.ValidationError("Price must be greater than 0")
+    return price
+
+
+def validate_quantity(quantity):
+    if quantity is not None and quantity <= 0:
+        raise forms.ValidationError("Quantity must be greater than 0")
+    return quantity
+
+
 class TradeForm(forms.ModelForm):
     class Meta:
         model = Trade
@@ -37,19 +58,10 @@ class TradeForm(forms.ModelForm):
             self.data['symbol'] = self.data['symbol'].upper()
     
     def clean_symbol(self):
-        symbol = self.cleaned_data.get('symbol')
-        if symbol:
-            return symbol.upper().strip()
-        return symbol
+        return normalize_symbol(self.cleaned_data.get('symbol'))
     
     def clean_price(self):
-        price = self.cleaned_data.get('price')
-        if price and price <= 0:
-            raise forms.ValidationError("Price must be greater than 0")
-        return price
+        return validate_price(self.cleaned_data.get('price'))
     
     def clean_quantity(self):
-        quantity = self.cleaned_data.get('quantity')
-        if quantity and quantity <= 0:
-            raise forms.ValidationError("Quantity must be greater than 0")
-        return quantity
+        return validate_quantity(self.cleaned_data.get('quantity'))
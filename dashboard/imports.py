@@ -0,0 +1,311 @@
+"""Bulk trade imports, validated and inserted one batch at a time"""
+import csv
+import json
+import time
+from operator import itemgetter
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_trades
+from .forms import normalize_symbol, validate_price, validate_quantity
+from .models.trade import Trade
+from .bulk import insert_tuples
+from .events import make_event, record_events
+from .models.tradeevent import TradeEvent
+from .search import index_trades
+
+FORMATS = ("csv", "jsonl")
+COLUMNS = ("symbol", "trade_type", "quantity", "price", "notes")
+REQUIRED_COLUMNS = ("symbol", "trade_type", "quantity", "price")
+TRADE_TYPES = {trade_type for trade_type, _ in Trade.TRADE_TYPES}
+
+_INVALID = object()
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported"""
+
+
+class RowError:
+    def __init__(self, line, field, message):
+        self.line = line
+        self.field = field
+        self.message = message
+
+    def __str__(self):
+        return f"line {self.line}: {self.field}: {self.message}"
+
+
+class ImportResult:
+    def __init__(self, max_errors):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self.max_errors = max_errors
+
+    def add_error(self, line, field, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(RowError(line, field, message))
+
+    @property
+    def rejected(self):
+        return self.rows - self.created
+
+    @property
+    def rate(self):
+        """Rows processed per second"""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def read_csv(stream):
+    """Yield (line, values, error) with values ordered as COLUMNS"""
+    reader = csv.reader(stream)
+    try:
+        header = [name.strip().lower() for name in next(reader)]
+    except StopIteration:
+        return
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+    width = len(header)
+    # Absent optional columns read the blank cell appended to every row
+    pick = itemgetter(*(header.index(name) if name in header else width for name in COLUMNS))
+    padding = [""]
+    for row in reader:
+        if not row:
+            continue
+        row += padding if len(row) >= width else [""] * (width - len(row) + 1)
+        yield reader.line_num, pick(row), None
+
+
+def read_jsonl(stream):
+    """Yield (line, values, error) with values ordered as COLUMNS"""
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            yield line, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "Expected a JSON object"
+            continue
+        yield line, [record.get(name) for name in COLUMNS], None
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def guess_format(filename):
+    if filename and filename.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def _field_error(field, value):
+    """The message the field's own validators give for a value that fails"""
+    try:
+        for validator in field.validators:
+            validator(value)
+    except ValidationError as exc:
+        return exc
+    return ValidationError(f"Invalid value: {value}")
+
+
+class _Cleaners:
+    """
+    Per column cleaning for one import. The limits enforced by the model
+    field validators are worked out once up front so the common case is a
+    plain comparison; the validators themselves only run to produce the
+    message for a value that is out of bounds.
+    """
+
+    def __init__(self):
+        self.symbol_field = Trade._meta.get_field("symbol")
+        self.quantity_field = Trade._meta.get_field("quantity")
+        self.price_field = Trade._meta.get_field("price")
+        self.quantity_range = connection.ops.integer_field_range(
+            self.quantity_field.get_internal_type()
+        )
+        self.price_limit = Decimal(10) ** (
+            self.price_field.max_digits - self.price_field.decimal_places
+        )
+        self.price_exponent = -self.price_field.decimal_places
+
+    def symbol(self, value):
+        if value is None or value == "":
+            raise ValidationError("This field is required.")
+        symbol = normalize_symbol(str(value).strip())
+        if not symbol:
+            raise ValidationError("This field is required.")
+        if len(symbol) > self.symbol_field.max_length:
+            raise _field_error(self.symbol_field, symbol)
+        return symbol
+
+    def trade_type(self, value):
+        if value is None or value == "":
+            raise ValidationError("This field is required.")
+        trade_type = str(value).strip()
+        if trade_type not in TRADE_TYPES:
+            raise ValidationError(
+                f"Select a valid choice. {trade_type} is not one of the available choices."
+            )
+        return trade_type
+
+    def quantity(self, value):
+        if value is None or value == "":
+            raise ValidationError("This field is required.")
+        if type(value) is not int:
+            if isinstance(value, bool):
+                raise ValidationError("Enter a whole number.")
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            else:
+                try:
+                    value = int(str(value).strip())
+                except ValueError:
+                    raise ValidationError("Enter a whole number.")
+        validate_quantity(value)
+        low, high = self.quantity_range
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise _field_error(self.quantity_field, value)
+        return value
+
+    def price(self, value):
+        if value is None or value == "":
+            raise ValidationError("This field is required.")
+        if isinstance(value, bool):
+            raise ValidationError("Enter a number.")
+        try:
+            price = Decimal(value.strip() if isinstance(value, str) else str(value))
+        except InvalidOperation:
+            raise ValidationError("Enter a number.")
+        if not price.is_finite():
+            raise ValidationError("Enter a number.")
+        validate_price(price)
+        if price >= self.price_limit or price.as_tuple().exponent < self.price_exponent:
+            raise _field_error(self.price_field, price)
+        return price
+
+    def notes(self, value):
+        return "" if value is None else str(value)
+
+
+def validate_batch(batch, result, cleaners=None):
+    """
+    Clean a batch of (line, values) one column at a time and return the
+    rows that passed as (symbol, trade_type, quantity, price, notes).
+    """
+    cleaners = cleaners or _Cleaners()
+    errors = []
+    columns = []
+    for name, values in zip(COLUMNS, zip(*(values for _, values in batch))):
+        clean = getattr(cleaners, name)
+        try:
+            cleaned = [clean(value) for value in values]
+        except ValidationError:
+            # Only columns with a bad value pay for per row error handling
+            cleaned = []
+            for (line, _), value in zip(batch, values):
+                try:
+                    cleaned.append(clean(value))
+                except ValidationError as exc:
+                    cleaned.append(_INVALID)
+                    errors.append((line, COLUMNS.index(name), name, exc.messages[0]))
+        columns.append(cleaned)
+    if not errors:
+        return list(zip(*columns))
+    for line, _, name, message in sorted(errors):
+        result.add_error(line, name, message)
+    return [row for row in zip(*columns) if _INVALID not in row]
+
+
+INSERT_FIELDS = (
+    "symbol", "trade_type", "quantity", "price", "notes", "status", "version", "created_by", "created_at",
+)
+
+
+def insert_rows(rows, created_by, created_at):
+    """Insert validated rows as PENDING trades and record their creation"""
+    ops = connection.ops
+    price_field = Trade._meta.get_field("price")
+    max_digits, decimal_places = price_field.max_digits, price_field.decimal_places
+    stamp = ops.adapt_datetimefield_value(created_at)
+    creator = created_by.pk
+    params = [
+        (
+            symbol,
+            trade_type,
+            quantity,
+            ops.adapt_decimalfield_value(price, max_digits, decimal_places),
+            notes,
+            "PENDING",
+            0,
+            creator,
+            stamp,
+        )
+        for symbol, trade_type, quantity, price, notes in rows
+    ]
+
+    with transaction.atomic():
+        trade_ids = insert_tuples(Trade, INSERT_FIELDS, params, returning=True)
+        record_events([
+            make_event(
+                trade_id, TradeEvent.CREATED, creator, created_at, None, "PENDING",
+                (symbol, trade_type, quantity, price, "PENDING"),
+            )
+            for trade_id, (symbol, trade_type, quantity, price, _) in zip(trade_ids, rows)
+        ])
+        index_trades(((trade_id, row[4]) for trade_id, row in zip(trade_ids, rows)), replace=False)
+
+
+def import_trades(stream, fmt, created_by, batch_size=5000, dry_run=False, max_errors=1000):
+    """
+    Validate and import the trades in `stream` (a text file object) on
+    behalf of `created_by`. Rows with errors are skipped and reported on the
+    returned ImportResult; valid rows are imported whatever the error count.
+    Raises ImportFileError when the file cannot be read at all.
+    """
+    if fmt not in READERS:
+        raise ImportFileError(f"Unknown format: {fmt}")
+    if batch_size < 1:
+        raise ImportFileError("Batch size must be at least 1")
+
+    result = ImportResult(max_errors)
+    cleaners = _Cleaners()
+    created_at = timezone.now()
+    started = time.perf_counter()
+
+    def flush(batch):
+        rows = validate_batch(batch, result, cleaners)
+        if rows and not dry_run:
+            insert_rows(rows, created_by, created_at)
+        result.created += len(rows)
+
+    batch = []
+    try:
+        for line, values, error in READERS[fmt](stream):
+            result.rows += 1
+            if error:
+                result.add_error(line, "row", error)
+                continue
+            batch.append((line, values))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ImportFileError(f"Unreadable file: {exc}")
+    finally:
+        result.elapsed = time.perf_counter() - started
+        if result.created and not dry_run:
+            invalidate_trades()
+    return result
@@ -0,0 +1,405 @@
+"""Logging, request counters and the per-request timing breakdown"""
+import atexit
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("dashboard.timing")
+
+_request_counters: ContextVar = ContextVar("request_counters", default=None)
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+# Time spent in nested timed() blocks, one cell per open block
+_timing_stack: ContextVar = ContextVar("timing_stack", default=())
+
+# Components of a request, as named in Server-Timing and the metrics
+COMPONENTS = {
+    "db": "SQL",
+    "template": "Templates",
+    "perm": "Permissions",
+    "claims": "OIDC claims",
+}
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through a fraction `rate` of records below WARNING. Warnings and
+    errors are never dropped.
+    """
+
+    def __init__(self, rate=1.0, name=""):
+        super().__init__(name)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Queue based handler: callers only enqueue records while a background
+    listener thread writes them to stderr (or the given stream). When the
+    queue is full records are dropped and counted, and a warning with the
+    number dropped is logged once there is room again.
+    """
+
+    # Seconds between two warnings about dropped records
+    drop_report_interval = 10.0
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.dropped = 0
+        self._unreported = 0
+        self._reported_at = None
+        self._drop_lock = threading.Lock()
+        self.listener.start()
+        self._listening = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out the queued records and stop the listener thread"""
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+
+    def setFormatter(self, fmt):
+        # prepare() still merges the message and its arguments on the
+        # calling thread, the listener only applies this format
+        self.target.setFormatter(fmt)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block the request when the writer falls behind
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_drops()
+
+    def _report_drops(self):
+        now = time.monotonic()
+        with self._drop_lock:
+            if not self._unreported or (
+                self._reported_at is not None and now - self._reported_at < self.drop_report_interval
+            ):
+                return
+            unreported, self._unreported = self._unreported, 0
+            self._reported_at = now
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Dropped %d log records, the log writer fell behind", (unreported,), None,
+        )
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported += unreported
+
+
+def count(name, amount=1):
+    """Add to a counter of the current request, if one is being recorded"""
+    counters = _request_counters.get()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def get_counters():
+    """Counters recorded so far for the current request"""
+    return dict(_request_counters.get() or {})
+
+
+class RequestCountersMiddleware:
+    """Record per-request counters and log them once the response is ready"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counters = {}
+        token = _request_counters.set(counters)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_counters.reset(token)
+        self.report(request, counters)
+        return response
+
+    async def __acall__(self, request):
+        counters = {}
+        token = _request_counters.set(counters)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_counters.reset(token)
+        self.report(request, counters)
+        return response
+
+    def report(self, request, counters):
+        request.instrumentation_counters = counters
+        if counters and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "path=%s %s",
+                request.path,
+                " ".join(f"{name}={value}" for name, value in sorted(counters.items())),
+            )
+
+
+class RequestTimings:
+    """Seconds spent and blocks run per component during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.calls = {}
+        # Async views run blocks on several threads at once
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def header(self, total):
+        """Value of the Server-Timing header"""
+        metrics = []
+        for name, description in COMPONENTS.items():
+            if name in self.durations:
+                if name == "db":
+                    description = f"{description} ({self.calls[name]} queries)"
+                metrics.append(f'{name};dur={self.durations[name] * 1000:.2f};desc="{description}"')
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block, minus nested timed blocks, to the current request"""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    nested = [0.0]
+    token = _timing_stack.set(_timing_stack.get() + (nested,))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _timing_stack.reset(token)
+        outer = _timing_stack.get()
+        if outer:
+            outer[-1][0] += elapsed
+        # Nested blocks on other threads can outlast this one
+        timings.add(name, max(elapsed - nested[0], 0.0))
+
+
+def _time_query(execute, sql, params, many, context):
+    if _request_timings.get() is None:
+        return execute(sql, params, many, context)
+    with timed("db"):
+        return execute(sql, params, many, context)
+
+
+def install_query_timing(sender, connection, **kwargs):
+    """connection_created receiver adding the timing execute wrapper"""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(install_query_timing, dispatch_uid="dashboard.instrumentation")
+
+
+class TimedTemplate:
+    """A backend template whose render() is timed"""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return self._template.render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """The Django template backend, timing every top level render"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, observed in zip(BUCKETS, self.buckets):
+            cumulative += observed
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class ViewMetrics:
+    """
+    Latency histograms per view and component since the process started.
+    Views are labelled by URL name, so the number of series stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._components = {}
+        self._responses = {}
+        self._queries = {}
+
+    def observe(self, view, status, total, timings):
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            self._requests.setdefault(view, Histogram()).observe(total)
+            for name in COMPONENTS:
+                self._components.setdefault((view, name), Histogram()).observe(timings.durations.get(name, 0.0))
+            self._responses[(view, status_class)] = self._responses.get((view, status_class), 0) + 1
+            self._queries[view] = self._queries.get(view, 0) + timings.calls.get("db", 0)
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP dashboard_request_duration_seconds Time to produce a response, per view.",
+                "# TYPE dashboard_request_duration_seconds histogram",
+            ]
+            for view, histogram in sorted(self._requests.items()):
+                lines.extend(histogram.lines("dashboard_request_duration_seconds", f'view="{_escape_label(view)}"'))
+            lines += [
+                "# HELP dashboard_request_component_seconds Time spent in a component of a request, per view.",
+                "# TYPE dashboard_request_component_seconds histogram",
+            ]
+            for (view, name), histogram in sorted(self._components.items()):
+                lines.extend(histogram.lines(
+                    "dashboard_request_component_seconds",
+                    f'view="{_escape_label(view)}",component="{name}"',
+                ))
+            lines += [
+                "# HELP dashboard_responses_total Responses sent, per view and status class.",
+                "# TYPE dashboard_responses_total counter",
+            ]
+            for (view, status_class), total in sorted(self._responses.items()):
+                lines.append(f'dashboard_responses_total{{view="{_escape_label(view)}",status="{status_class}"}} {total}')
+            lines += [
+                "# HELP dashboard_sql_queries_total SQL queries issued, per view.",
+                "# TYPE dashboard_sql_queries_total counter",
+            ]
+            for view, total in sorted(self._queries.items()):
+                lines.append(f'dashboard_sql_queries_total{{view="{_escape_label(view)}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+
+VIEW_METRICS = ViewMetrics()
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request by component, then report it as a Server-Timing
+    header, a log line and in VIEW_METRICS. Goes first in MIDDLEWARE so
+    the total covers the other middleware. Streaming responses are timed
+    until their first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.send_header = getattr(settings, "DASHBOARD_SERVER_TIMING", False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    def report(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"
+        VIEW_METRICS.observe(view, response.status_code, total, timings)
+        if self.send_header:
+            response["Server-Timing"] = timings.header(total)
+        if timing_logger.isEnabledFor(logging.INFO):
+            timing_logger.info(
+                "view=%s method=%s status=%d total_ms=%.2f %s queries=%d",
+                view,
+                request.method,
+                response.status_code,
+                total * 1000,
+                " ".join(f"{name}_ms={timings.durations.get(name, 0.0) * 1000:.2f}" for name in COMPONENTS),
+                timings.calls.get("db", 0),
+            )
@@ -0,0 +1,191 @@
+"""HTTP serving and load generation for the benchmark command; must not import Django"""
+import asyncio
+import http.client
+import multiprocessing
+import socketserver
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+def percentile(samples, pct):
+    """Nearest rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoadResult:
+    def __init__(self, latencies, errors, elapsed):
+        self.latencies = latencies
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": len(self.errors),
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "p50": percentile(self.latencies, 50),
+            "p99": percentile(self.latencies, 99),
+        }
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_wsgi(application, host, port, ready):
+    """Serve `application` until the process ends; `ready` gets the bound port"""
+    server = make_server(host, port, application, _ThreadingWSGIServer, _QuietHandler)
+    ready(server.server_port)
+    server.serve_forever()
+
+
+async def _asgi_connection(application, reader, writer, server):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ", 2)
+            headers = []
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            fields = dict(headers)
+            length = int(fields.get(b"content-length", b"0"))
+            body = await reader.readexactly(length) if length else b""
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version.partition("/")[2],
+                "method": method,
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode("latin-1"),
+                "query_string": query.encode("latin-1"),
+                "root_path": "",
+                "headers": headers,
+                "client": writer.get_extra_info("peername")[:2],
+                "server": server,
+            }
+            received = False
+            status = 500
+            response_headers = []
+            chunks = []
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                # Responses are buffered, the client is only gone once they are written
+                await asyncio.Event().wait()
+
+            async def send(message):
+                nonlocal status, response_headers
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    response_headers = [
+                        (name, value) for name, value in message.get("headers", [])
+                        if name.lower() not in (b"content-length", b"transfer-encoding", b"connection")
+                    ]
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await application(scope, receive, send)
+            payload = b"".join(chunks)
+            keep_alive = version == "HTTP/1.1" and fields.get(b"connection", b"").lower() != b"close"
+            lines = [f"HTTP/1.1 {status} {http.client.responses.get(status, '')}".encode("latin-1")]
+            lines += [name + b": " + value for name, value in response_headers]
+            lines.append(b"Content-Length: " + str(len(payload)).encode())
+            lines.append(b"Connection: " + (b"keep-alive" if keep_alive else b"close"))
+            writer.write(b"\r\n".join(lines) + b"\r\n\r\n" + payload)
+            await writer.drain()
+            if not keep_alive:
+                return
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve_asgi(application, host, port, ready):
+    """Serve `application` until the process ends; `ready` gets the bound port"""
+
+    async def main():
+        server = await asyncio.start_server(
+            lambda reader, writer: _asgi_connection(application, reader, writer, (host, bound)),
+            host,
+            port,
+            backlog=128,
+        )
+        bound = server.sockets[0].getsockname()[1]
+        ready(bound)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def _client(host, port, urls, headers, start, step, total):
+    """Requests start, start + step, ... below total, one at a time"""
+    latencies = []
+    errors = []
+    for index in range(start, total, step):
+        url = urls[index % len(urls)]
+        began = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=60)
+            try:
+                connection.request("GET", url, headers={**headers, "Connection": "close"})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            finally:
+                connection.close()
+        except OSError as exc:
+            errors.append(f"{url}: {exc}")
+            continue
+        latencies.append(time.perf_counter() - began)
+        if status != 200:
+            errors.append(f"{url}: {status}")
+    return latencies, errors
+
+
+def http_load(host, port, urls, total, processes, headers):
+    """GET `urls` round robin `total` times from `processes` client processes"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        # Start the workers before the clock does
+        pool.map(time.sleep, [0] * processes)
+        started = time.perf_counter()
+        results = pool.starmap(
+            _client,
+            [(host, port, urls, headers, start, processes, total) for start in range(processes)],
+        )
+        elapsed = time.perf_counter() - started
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    errors = [error for _, client_errors in results for error in client_errors]
+    return LoadResult(latencies, errors, elapsed)
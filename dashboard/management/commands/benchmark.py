@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.benchmarking import BENCHMARK_USER, benchmark_session, percentile
+from dashboard.loadtest import http_load, serve_asgi, serve_wsgi
+from dashboard.models import DjangoUser, Trade
+from dashboard.permissions import PermissionEngine
+from dashboard.policies import COMPILED_PERMISSIONS
+from dashboard.querybudget import count_queries
+
+# (name, url name, kwargs, query string) of every view measured; use
+# '{trade_id}' for the newest trade
+VIEWS = [
+    ('trades_list', 'dashboard:trades', {}, ''),
+    ('trades_pending', 'dashboard:trades', {}, 'status=PENDING'),
+    ('trades_search', 'dashboard:trades', {}, 'q=market'),
+    ('trades_stats', 'dashboard:trades_stats', {}, ''),
+    ('trade_detail', 'dashboard:trade_detail', {'trade_id': '{trade_id}'}, ''),
+    ('profile', 'dashboard:profile', {}, ''),
+    ('api_trades', 'dashboard:api_trades', {}, ''),
+    ('api_trade', 'dashboard:api_trade', {'trade_id': '{trade_id}'}, ''),
+]
+
+# Views the HTTP load is spread over
+LOAD_VIEWS = ['trades_list', 'trades_stats', 'trade_detail', 'api_trades']
+
+# handler -> value of DASHBOARD_ASYNC_VIEWS it is served with
+HANDLERS = {
+    'wsgi': '0',
+    'asgi': '1',
+}
+
+# Metrics compared with the baseline -> whether higher is better. p99 is
+# reported but too noisy to gate on.
+COMPARED = {
+    'throughput': True,
+    'p50': False,
+    'queries': False,
+    'peak_kb': False,
+    'max_rss_kb': False,
+    'checks_per_s': True,
+}
+
+# Trades the permission checks are evaluated against, and trades per
+# request for the memoizing PermissionEngine
+PERMISSION_SAMPLE = 1000
+PERMISSION_PAGE = 50
+
+# Seconds each way of checking permissions is repeated for
+PERMISSION_DURATION = 0.5
+
+
+def _max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def _checks_per_second(check_all, checks):
+    """Rate of `check_all`, which makes `checks` checks, repeated for PERMISSION_DURATION"""
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        check_all()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= PERMISSION_DURATION:
+            return checks * rounds / elapsed
+
+
+def _url(name, kwargs, query, trade_id):
+    url = reverse(name, kwargs={k: v.format(trade_id=trade_id) for k, v in kwargs.items()})
+    return f'{url}?{query}' if query else url
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the dashboard views in process and over HTTP, and the permission '
+        'checks, optionally comparing the results with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trades',
+            type=int,
+            default=10000,
+            help='Trades the database should hold; missing ones are created with create_sample_trades --bulk'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Requests per view through the test client'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=20,
+            help='Requests per view, and times the number of client processes over HTTP, made before measuring'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requests per handler in the HTTP load test'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='Client processes of the HTTP load test'
+        )
+        parser.add_argument(
+            '--handler',
+            action='append',
+            choices=list(HANDLERS),
+            help='Handler to load over HTTP, repeatable (default: all)'
+        )
+        parser.add_argument(
+            '--no-http',
+            action='store_true',
+            help='Skip the HTTP load test'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON file of earlier results to compare with'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write the results to the --baseline file instead of comparing'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Relative change of a timing or memory metric counted as a regression'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the results as JSON to this file'
+        )
+        # Used by the command itself to serve the application in a subprocess
+        parser.add_argument('--serve', choices=list(HANDLERS), help=argparse.SUPPRESS)
+        parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            self.serve(options['serve'], options['port'])
+            return
+        for option in ('trades', 'iterations', 'requests', 'processes'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} must be at least 1')
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline needs --baseline')
+
+        self.seed(options['trades'])
+        trade = Trade.objects.order_by('-created_at', '-id').only('id').first()
+        session = benchmark_session()
+        urls = {name: _url(url_name, kwargs, query, trade.id) for name, url_name, kwargs, query in VIEWS}
+
+        results = {
+            'environment': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'trades': Trade.objects.count(),
+                'cpus': os.cpu_count(),
+            },
+            'views': self.measure_views(urls, session, options['iterations'], options['warmup']),
+            'permissions': self.measure_permissions(),
+        }
+        if not options['no_http']:
+            results['http'] = {
+                handler: self.measure_http(
+                    handler, [urls[name] for name in LOAD_VIEWS], session,
+                    options['requests'], options['processes'], options['warmup'],
+                )
+                for handler in options['handler'] or HANDLERS
+            }
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}'))
+        elif options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {exc}')
+            self.compare(baseline, results, options['tolerance'])
+
+    def seed(self, trades):
+        existing = Trade.objects.count()
+        if existing >= trades:
+            return
+        self.stdout.write(f'Creating {trades - existing} sample trades...')
+        call_command(
+            'create_sample_trades', bulk=True, count=trades - existing, seed=existing,
+            stdout=open(os.devnull, 'w'),
+        )
+
+    def measure_views(self, urls, session, iterations, warmup):
+        client = Client(HTTP_HOST='localhost')
+        client.cookies[settings.SESSION_COOKIE_NAME] = session
+        results = {}
+        for name, url in urls.items():
+            for _ in range(warmup):
+                client.get(url)
+            samples = []
+            queries = 0
+            for _ in range(iterations):
+                with count_queries() as counter:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+                queries = max(queries, len(counter))
+
+            # tracemalloc slows everything down, so memory gets a pass of its own
+            tracemalloc.start()
+            try:
+                for _ in range(min(iterations, 20)):
+                    client.get(url)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            results[name] = {
+                'url': url,
+                'throughput': len(samples) / sum(samples),
+                'p50': percentile(samples, 50),
+                'p99': percentile(samples, 99),
+                'queries': queries,
+                'peak_kb': peak // 1024,
+            }
+        return results
+
+    def measure_permissions(self):
+        """Object permission checks through django-rules and through PermissionEngine"""
+        user = DjangoUser.objects.get(username=BENCHMARK_USER)
+        trades = list(
+            Trade.objects.order_by('-created_at', '-id').only('id', 'status', 'created_by_id')[:PERMISSION_SAMPLE]
+        )
+        perms = list(COMPILED_PERMISSIONS)
+        checks = len(trades) * len(perms)
+
+        def through_rules():
+            for perm in perms:
+                for trade in trades:
+                    user.has_perm(perm, trade)
+
+        def through_engine():
+            for offset in range(0, len(trades), PERMISSION_PAGE):
+                # A fresh engine per page, as every request gets one
+                engine = PermissionEngine(user)
+                for perm in perms:
+                    for trade in trades[offset:offset + PERMISSION_PAGE]:
+                        engine.has_perm(perm, trade)
+
+        return {
+            'rules': {'checks_per_s': _checks_per_second(through_rules, checks)},
+            'engine': {'checks_per_s': _checks_per_second(through_engine, checks)},
+        }
+
+    def measure_http(self, handler, urls, session, requests, processes, warmup):
+        # The URLconf binds the sync or async views at import, so each
+        # handler is served by a fresh process
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'django', 'benchmark', '--serve', handler],
+            env={**os.environ, 'DASHBOARD_ASYNC_VIEWS': HANDLERS[handler]},
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            line = server.stdout.readline()
+            if not line:
+                raise CommandError(f'The {handler} server did not start')
+            port = json.loads(line)['port']
+            headers = {
+                'Host': 'localhost',
+                'Cookie': f'{settings.SESSION_COOKIE_NAME}={session}',
+            }
+            if warmup:
+                http_load('127.0.0.1', port, urls, warmup * processes, processes, headers)
+            result = http_load('127.0.0.1', port, urls, requests, processes, headers)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            output, _ = server.communicate(timeout=30)
+        lines = output.strip().splitlines()
+        usage = json.loads(lines[-1]) if lines else {}
+        for error in result.errors[:5]:
+            self.stderr.write(f'{handler}: {error}')
+        return {**result.as_dict(), 'max_rss_kb': usage.get('max_rss_kb')}
+
+    def serve(self, handler, port):
+        """Serve the project until SIGTERM, then report peak memory; run in a subprocess"""
+        def stop(signum, frame):
+            sys.stdout.write(json.dumps({'max_rss_kb': _max_rss_kb()}) + '\n')
+            sys.stdout.flush()
+            os._exit(0)
+
+        def ready(bound):
+            sys.stdout.write(json.dumps({'port': bound}) + '\n')
+            sys.stdout.flush()
+
+        signal.signal(signal.SIGTERM, stop)
+        if handler == 'wsgi':
+            from core.wsgi import application
+            serve_wsgi(application, '127.0.0.1', port, ready)
+        else:
+            from core.asgi import application
+            serve_asgi(application, '127.0.0.1', port, ready)
+
+    def report(self, results):
+        environment = results['environment']
+        self.stdout.write(
+            f'Python {environment["python"]}, Django {environment["django"]}, '
+            f'{environment["database"]} with {environment["trades"]} trades'
+        )
+        self.stdout.write(f'\n{"view":<16}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"queries":>9}{"peak KiB":>10}')
+        for name, result in results['views'].items():
+            self.stdout.write(
+                f'{name:<16}{result["throughput"]:>10.1f}{result["p50"] * 1000:>10.2f}'
+                f'{result["p99"] * 1000:>10.2f}{result["queries"]:>9}{result["peak_kb"]:>10}'
+            )
+        self.stdout.write(f'\n{"permissions":<16}{"checks/s":>12}')
+        for name, result in results['permissions'].items():
+            self.stdout.write(f'{name:<16}{result["checks_per_s"]:>12.0f}')
+        if 'http' in results:
+            self.stdout.write(f'\n{"handler":<16}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>9}{"RSS KiB":>10}')
+            for name, result in results['http'].items():
+                self.stdout.write(
+                    f'{name:<16}{result["throughput"]:>10.1f}{result["p50"] * 1000:>10.2f}'
+                    f'{result["p99"] * 1000:>10.2f}{result["errors"]:>9}{result["max_rss_kb"] or "-":>10}'
+                )
+
+    def compare(self, baseline, results, tolerance):
+        """Print changes against `baseline` and fail on regressions"""
+        self.stdout.write(f'\nCompared with the baseline of {baseline["environment"]["created_at"]}:')
+        regressions = []
+        for section in ('views', 'permissions', 'http'):
+            for name, result in results.get(section, {}).items():
+                previous = baseline.get(section, {}).get(name)
+                if previous is None:
+                    continue
+                for metric, higher_is_better in COMPARED.items():
+                    old, new = previous.get(metric), result.get(metric)
+                    if old is None or new is None:
+                        continue
+                    change = (new - old) / old if old else 0.0
+                    if metric == 'queries':
+                        # Query counts are exact, any increase is a regression
+                        regressed = new > old
+                    elif higher_is_better:
+                        regressed = change < -tolerance
+                    else:
+                        regressed = change > tolerance
+                    if regressed:
+                        regressions.append(f'{section}/{name} {metric}')
+                    if regressed or abs(change) > tolerance:
+                        line = f'  {section}/{name} {metric}: {old:.6g} -> {new:.6g} ({change:+.0%})'
+                        self.stdout.write(self.style.ERROR(line) if regressed else self.style.SUCCESS(line))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressions: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS(f'  no regressions beyond {tolerance:.0%}'))
@@ -0,0 +1,97 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+
+from dashboard.benchmarking import percentile, probe_environment, time_requests
+from dashboard.claims import get_claims
+
+LAZY = 'dashboard.context.user_claims'
+EAGER = 'dashboard.management.commands.benchmark_context.eager_user_claims'
+
+
+def eager_user_claims(request):
+    """The context processor as it behaved before it became lazy"""
+    claims = get_claims(request)
+    if request.user.is_authenticated:
+        request.user._oidc_roles = claims.roles
+    return {
+        'oidc_id_claims': claims.claims,
+        'oidc_user_picture': claims.picture,
+        'user_roles': claims.roles,
+    }
+
+
+def _templates_with(processor):
+    templates = []
+    for backend in settings.TEMPLATES:
+        backend = {**backend, 'OPTIONS': dict(backend.get('OPTIONS', {}))}
+        processors = backend['OPTIONS'].get('context_processors', [])
+        backend['OPTIONS']['context_processors'] = [
+            processor if p == LAZY else p for p in processors
+        ]
+        templates.append(backend)
+    return templates
+
+
+class Command(BaseCommand):
+    help = 'Compare per-render cost of the eager and lazy user_claims context processor'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Requests per view and mode'
+        )
+        parser.add_argument(
+            '--trades',
+            type=int,
+            default=100,
+            help='Number of trades in the probe dataset'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        with probe_environment(trades=options['trades']) as probe:
+            views = [
+                ('home', reverse('dashboard:home'), True),
+                ('trades_list', reverse('dashboard:trades'), True),
+                ('trade_detail', reverse('dashboard:trade_detail', args=[probe.trade.id]), True),
+                ('403', reverse('dashboard:admin'), False),
+            ]
+            # The admin panel needs dashboard.admin_access, which the probe
+            # only gets as a superuser; drop it so the 403 page is measured.
+            probe.user.is_superuser = False
+            probe.user.save(update_fields=['is_superuser'])
+
+            # Expected 403s would otherwise log a traceback per request
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.ERROR)
+            results = {}
+            try:
+                for name, url, check_status in views:
+                    for mode, processor in (('eager', EAGER), ('lazy', LAZY)):
+                        with override_settings(TEMPLATES=_templates_with(processor)):
+                            results[(name, mode)] = time_requests(
+                                probe.client, url, iterations, check_status=check_status
+                            )
+            finally:
+                request_logger.setLevel(level)
+
+        self.stdout.write(f'{"view":<14}{"eager ms":>10}{"lazy ms":>10}{"p99 eager":>11}{"p99 lazy":>10}{"change":>9}')
+        for name, _, _ in views:
+            eager = results[(name, 'eager')]
+            lazy = results[(name, 'lazy')]
+            eager_mean = sum(eager) / len(eager) * 1000
+            lazy_mean = sum(lazy) / len(lazy) * 1000
+            change = (lazy_mean - eager_mean) / eager_mean * 100 if eager_mean else 0
+            self.stdout.write(
+                f'{name:<14}{eager_mean:>10.3f}{lazy_mean:>10.3f}'
+                f'{percentile(eager, 99) * 1000:>11.3f}{percentile(lazy, 99) * 1000:>10.3f}'
+                f'{change:>8.1f}%'
+            )
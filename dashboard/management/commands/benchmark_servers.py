@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from dashboard.benchmarking import asgi_load, benchmark_session, wsgi_load
+from dashboard.models import Trade
+
+# handler -> value of DASHBOARD_ASYNC_VIEWS it is measured with
+HANDLERS = {
+    'wsgi': '0',
+    'asgi': '1',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and latency of the WSGI (sync views) and ASGI (async views) handlers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Concurrent clients'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requests per handler, spread over the trades list, stats header and a trade detail'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=50,
+            help='Requests made before measuring'
+        )
+        # Used by the command itself to measure one handler per process
+        parser.add_argument('--handler', choices=list(HANDLERS), help=argparse.SUPPRESS)
+        parser.add_argument('--url', action='append', default=[], help=argparse.SUPPRESS)
+        parser.add_argument('--session', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be positive')
+        if options['handler']:
+            self.measure(options)
+            return
+
+        trade = Trade.objects.order_by('-created_at', '-id').first()
+        if trade is None:
+            raise CommandError('No trades to load; run create_sample_trades first')
+        urls = [
+            reverse('dashboard:trades'),
+            reverse('dashboard:trades_stats'),
+            reverse('dashboard:trade_detail', args=[trade.id]),
+            reverse('dashboard:trades') + '?status=PENDING',
+        ]
+        session = benchmark_session()
+
+        results = {}
+        for handler, async_views in HANDLERS.items():
+            # The URLconf binds the sync or async views at import, so each
+            # handler is measured in a fresh process
+            command = [
+                sys.executable, '-m', 'django', 'benchmark_servers',
+                '--handler', handler,
+                '--concurrency', str(options['concurrency']),
+                '--requests', str(options['requests']),
+                '--warmup', str(options['warmup']),
+                '--session', session,
+            ]
+            for url in urls:
+                command += ['--url', url]
+            process = subprocess.run(
+                command,
+                env={**os.environ, 'DASHBOARD_ASYNC_VIEWS': async_views},
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode:
+                raise CommandError(f'{handler} run failed:\n{process.stderr}')
+            results[handler] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(
+            f'{options["requests"]} requests from {options["concurrency"]} clients over: {", ".join(urls)}'
+        )
+        self.stdout.write(f'{"handler":<9}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for handler, result in results.items():
+            self.stdout.write(
+                f'{handler:<9}{result["throughput"]:>10.1f}{result["p50"] * 1000:>10.2f}'
+                f'{result["p99"] * 1000:>10.2f}{result["errors"]:>8}'
+            )
+        for handler, result in results.items():
+            for error in result['error_samples']:
+                self.stderr.write(f'{handler}: {error}')
+
+    def measure(self, options):
+        headers = {
+            'Host': 'localhost',
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={options["session"]}',
+        }
+        if options['handler'] == 'wsgi':
+            from django.core.wsgi import get_wsgi_application
+            application, load = get_wsgi_application(), wsgi_load
+        else:
+            from django.core.asgi import get_asgi_application
+            application, load = get_asgi_application(), asgi_load
+
+        urls = options['url']
+        if options['warmup']:
+            load(application, urls, options['warmup'], options['concurrency'], headers)
+        result = load(application, urls, options['requests'], options['concurrency'], headers)
+        self.stdout.write(
+            json.dumps({**result.as_dict(), 'error_samples': result.errors[:5]})
+        )
@@ -0,0 +1,236 @@
+import json
+import logging
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import reverse
+
+from dashboard.benchmarking import probe_environment
+from dashboard.models import Trade
+from dashboard.pagination import encode_cursor
+from dashboard.policies import ALL_ROLES
+
+# (url name, kwargs, query string) for every view whose queries are checked.
+# Use '{trade_id}' / '{cursor}' / '{symbol}' placeholders for values of the
+# probe trade, '{confirmed_id}' for a confirmed trade and '{username}' for
+# the probe user.
+VIEWS = [
+    ('dashboard:home', {}, ''),
+    ('dashboard:profile', {}, ''),
+    ('dashboard:trades', {}, ''),
+    ('dashboard:trades', {}, 'status=PENDING'),
+    ('dashboard:trades', {}, 'status=CONFIRMED'),
+    ('dashboard:trades', {}, 'status=APPROVED'),
+    ('dashboard:trades', {}, 'status=REJECTED'),
+    ('dashboard:trades', {}, 'after={cursor}'),
+    ('dashboard:trades', {}, 'before={cursor}'),
+    ('dashboard:trades', {}, 'status=PENDING&after={cursor}'),
+    ('dashboard:trades', {}, 'q=market'),
+    ('dashboard:trades', {}, 'q=stop+loss&status=PENDING'),
+    ('dashboard:trades', {}, 'symbol={symbol}'),
+    ('dashboard:trades', {}, 'symbol=A&status=APPROVED'),
+    ('dashboard:trades', {}, 'user={username}'),
+    ('dashboard:trades', {}, 'user={username}&status=PENDING'),
+    ('dashboard:trades', {}, 'q=rebalanc&symbol={symbol}&user={username}'),
+    ('dashboard:trades_stats', {}, ''),
+    ('dashboard:trades_export', {}, ''),
+    ('dashboard:trades_export', {}, 'format=jsonl&status=CONFIRMED&from=2000-01-01&to=2100-01-01'),
+    ('dashboard:positions', {}, ''),
+    ('dashboard:positions', {}, 'by=trader'),
+    ('dashboard:trade_detail', {'trade_id': '{trade_id}'}, ''),
+    ('dashboard:trade_confirm', {'trade_id': '{trade_id}'}, ''),
+    ('dashboard:trade_approve', {'trade_id': '{confirmed_id}'}, ''),
+    ('dashboard:api_trades', {}, ''),
+    ('dashboard:api_trades', {}, 'status=PENDING&after={cursor}'),
+    ('dashboard:api_trades', {}, 'symbol={symbol}'),
+    ('dashboard:api_trades', {}, 'user={username}&status=PENDING'),
+    ('dashboard:api_trades', {}, 'before={cursor}&fields=id,symbol,notes'),
+    ('dashboard:api_trade', {'trade_id': '{trade_id}'}, ''),
+]
+
+# (url name, form data) of views that only take POSTs, run after VIEWS.
+# They may change the probe trades, which are rolled back with the rest.
+POST_VIEWS = [
+    ('dashboard:trades_bulk', {'action': 'approve', 'trade_ids': ['{confirmed_id}', '{trade_id}']}),
+    ('dashboard:trades_bulk', {'action': 'confirm', 'trade_ids': ['{trade_id}']}),
+]
+
+# Probed as a superuser and then as a user holding each single role, so
+# the querysets rule conditions narrow for one role get checked too.
+PROBE_ROLES = [None, *sorted(ALL_ROLES)]
+
+# Searches may sort their matches: either at most RANK_LIMIT full-text
+# matches, or a prefix range they only pick under SCAN_THRESHOLD estimated
+# matches (see dashboard.search). Every other query must read trades in
+# the order of an index.
+SEARCH_PARAMS = {'q', 'symbol', 'user'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run every dashboard view, EXPLAIN each query it issues against the '
+        'trade table and fail if any of them needs a full table scan or sorts '
+        'trades outside a search'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print the plan of every checked query'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        table = Trade._meta.db_table
+        captured = []
+        # Whether the request being run is a search
+        searching = [False]
+
+        def capture(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith('SELECT') and table in sql:
+                captured.append((sql, params, searching[0]))
+            return execute(sql, params, many, context)
+
+        # Roles refused a view are expected, don't log a warning for each
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for role in PROBE_ROLES:
+                self._probe(role, capture, searching)
+        finally:
+            request_logger.setLevel(level)
+
+        failures = []
+        seen = set()
+        # SET LOCAL in _explain() needs a transaction on Postgres
+        with transaction.atomic():
+            for sql, params, search in captured:
+                key = (sql, repr(params))
+                if key in seen:
+                    continue
+                seen.add(key)
+                plan, full_scan, sorts = self._explain(sql, params, table)
+                if options['show_plans']:
+                    self.stdout.write(f'{sql}\n  {plan}\n')
+                if full_scan:
+                    failures.append((f'Full table scan on {table}', sql, plan))
+                elif sorts and not search:
+                    failures.append((f'Sort of {table} rows no index provides', sql, plan))
+
+        for problem, sql, plan in failures:
+            self.stdout.write(self.style.ERROR(f'{problem}:\n  {sql}\n  {plan}'))
+        if failures:
+            raise CommandError(
+                f'{len(failures)} of {len(seen)} queries scan the whole {table} table or sort it'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(seen)} queries, none scan the whole {table} table or sort it'
+        ))
+
+    def _probe(self, role, capture, searching):
+        """
+        Request every view as a user with `role`, or as a superuser for
+        None, with `capture` wrapping the queries of the requests and
+        `searching` set while a request is a search. Views the role may not
+        use answer 403, which is expected. The probe user, trades and
+        sessions are rolled back at the end.
+        """
+        options = {} if role is None else {'roles': [role], 'superuser': False}
+        with probe_environment(**options) as probe:
+            trade = probe.trade
+            confirmed = Trade.objects.create(
+                symbol=trade.symbol,
+                trade_type='SELL',
+                quantity=1,
+                price=trade.price,
+                status='CONFIRMED',
+                created_by=probe.user,
+            )
+            placeholders = {
+                'trade_id': trade.id,
+                'confirmed_id': confirmed.id,
+                'cursor': encode_cursor(trade.created_at, trade.id),
+                'symbol': trade.symbol,
+                'username': probe.user.username,
+            }
+
+            requests = [
+                (name, kwargs, query, None) for name, kwargs, query in VIEWS
+            ] + [
+                (name, {}, '', data) for name, data in POST_VIEWS
+            ]
+            with connection.execute_wrapper(capture):
+                for name, kwargs, query, data in requests:
+                    kwargs = {k: v.format(**placeholders) for k, v in kwargs.items()}
+                    url = reverse(name, kwargs=kwargs)
+                    if query:
+                        url = f'{url}?{query.format(**placeholders)}'
+                    searching[0] = bool(SEARCH_PARAMS & parse_qs(query).keys())
+                    if data is None:
+                        response = probe.client.get(url)
+                    else:
+                        data = {
+                            key: [v.format(**placeholders) for v in value] if isinstance(value, list)
+                            else value.format(**placeholders)
+                            for key, value in data.items()
+                        }
+                        response = probe.client.post(url, data)
+                    if response.streaming:
+                        # Streamed rows are only read while the body is consumed
+                        b''.join(response.streaming_content)
+                    if response.status_code == 403 and role is not None:
+                        continue
+                    if response.status_code >= 400:
+                        raise CommandError(f'{url} returned {response.status_code} as {role or "superuser"}')
+
+    def _explain(self, sql, params, table):
+        """
+        Return (plan text, whether the plan scans the whole table, whether
+        it sorts the rows for ORDER BY instead of reading them in index order)
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[-1] for row in cursor.fetchall()]
+                full_scan = any(
+                    detail.split()[:2] == ['SCAN', table] and 'INDEX' not in detail
+                    for detail in details
+                )
+                sorts = any(detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in details)
+                return ' | '.join(details), full_scan, sorts
+
+            # Postgres happily seq scans tiny tables, so ask whether an
+            # index path exists at all by disabling seq scans for the check.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            cursor.execute('SET LOCAL enable_seqscan = on')
+
+        def nodes(node, parent=None):
+            yield node, parent
+            for child in node.get('Plans', []):
+                yield from nodes(child, node)
+
+        def reads_table(node):
+            return any(child.get('Relation Name') == table for child, _ in nodes(node))
+
+        root = plan[0]['Plan']
+        full_scan = any(
+            node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') == table
+            for node, _ in nodes(root)
+        )
+        # Sorts feeding a GROUP BY are not about the order of the result
+        sorts = any(
+            node.get('Node Type') in ('Sort', 'Incremental Sort')
+            and (parent or {}).get('Node Type') != 'Aggregate'
+            and reads_table(node)
+            for node, parent in nodes(root)
+        )
+        return root.get('Node Type', ''), full_scan, sorts
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.positions import GROUPINGS, compute_positions, positions
+
+
+class Command(BaseCommand):
+    help = 'Recompute positions from the approved trades and compare them with the live aggregation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--by',
+            choices=list(GROUPINGS),
+            default='symbol',
+            help='Group positions by symbol or by trader'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100000,
+            help='Trades read per query'
+        )
+        parser.add_argument(
+            '--show',
+            action='store_true',
+            help='Print every position'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.perf_counter()
+        computed = compute_positions(options['by'], batch_size=options['batch_size'])
+        batch_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        live = positions(options['by'])
+        live_elapsed = time.perf_counter() - started
+
+        if options['show']:
+            for position in computed:
+                self.stdout.write(
+                    f'{position.key:<12} net {position.net_quantity:>12,} '
+                    f'gross ${position.gross_notional:>18,.2f} '
+                    f'vwap {position.vwap or 0:>10.4f} pnl ${position.realized_pnl:>16,.2f}'
+                )
+        self.stdout.write(
+            f'batch: {batch_elapsed * 1000:.0f}ms, '
+            f'live: {live_elapsed * 1000:.0f}ms'
+        )
+
+        if computed != live:
+            differing = {p.key for p in computed} ^ {p.key for p in live} or {
+                a.key for a, b in zip(computed, live) if a != b
+            }
+            raise CommandError(f'Positions differ for: {", ".join(sorted(map(str, differing)))}')
+        self.stdout.write(
+            self.style.SUCCESS(f'{len(computed)} positions by {options["by"]} match the live aggregation')
+        )
@@ -1,7 +1,95 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from dashboard.cache import invalidate_trades
 from dashboard.models import Trade, DjangoUser
+from dashboard.events import history_events, record_events, snapshot
+from dashboard.search import index_trades
+from dashboard.stats import get_trade_stats
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from multiprocessing import Pool
 import random
+import time
+
+# Sample data
+SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX', 'AMD', 'INTC']
+TRADE_TYPES = ['BUY', 'SELL']
+NOTES_OPTIONS = [
+    'Regular market order',
+    'Limit order execution',
+    'Stop loss trigger',
+    'Quarterly rebalancing',
+    'Portfolio diversification',
+    'Market timing strategy',
+    '',  # Some trades without notes
+]
+
+# Bulk mode: status mix and the roles handed out to synthetic users in turn
+STATUS_WEIGHTS = [('PENDING', 30), ('CONFIRMED', 25), ('APPROVED', 40), ('REJECTED', 5)]
+ROLE_PROFILES = [
+    ['trader'],
+    ['trader'],
+    ['trader'],
+    ['confirms'],
+    ['approver'],
+    ['reader'],
+    ['trader', 'confirms'],
+    ['admin'],
+]
+
+# First day of the created_at spread for seeded runs without --start, so a
+# seed alone reproduces the same dataset on any day
+SEEDED_START = date(2025, 1, 1)
+
+
+def _business_time(rng, start, days):
+    """A timestamp within `days` after `start`, weighted towards weekday trading hours"""
+    while True:
+        day = start + timedelta(days=rng.randrange(days))
+        if day.weekday() < 5 or rng.random() < 0.05:
+            break
+    hours = rng.triangular(8, 20, 13)
+    return day.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(
+        hours=hours, microseconds=rng.randrange(1_000_000)
+    )
+
+
+def generate_batch(args):
+    """
+    Build one batch of trade rows as plain tuples. Runs in worker processes
+    and is seeded per batch so output does not depend on the worker count.
+    """
+    seed, index, size, start, days, traders, confirmers, approvers = args
+    rng = random.Random(f'{seed}:{index}')
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    rows = []
+    for _ in range(size):
+        created_at = _business_time(rng, start, days)
+        status = rng.choices(statuses, weights)[0]
+        confirmed_by = confirmed_at = approved_by = approved_at = None
+        if status in ('CONFIRMED', 'APPROVED', 'REJECTED'):
+            confirmed_by = rng.choice(confirmers)
+            confirmed_at = created_at + timedelta(minutes=rng.expovariate(1 / 30))
+        if status == 'APPROVED':
+            approved_by = rng.choice(approvers)
+            approved_at = confirmed_at + timedelta(minutes=rng.expovariate(1 / 60))
+        rows.append((
+            rng.choice(SYMBOLS),
+            rng.choice(TRADE_TYPES),
+            rng.randint(10, 1000),
+            Decimal(rng.randint(5000, 50000)) / 100,
+            status,
+            rng.choice(NOTES_OPTIONS),
+            rng.choice(traders),
+            created_at,
+            confirmed_by,
+            confirmed_at,
+            approved_by,
+            approved_at,
+        ))
+    return rows
+
 
 class Command(BaseCommand):
     help = 'Create sample trades for testing'
@@ -13,10 +101,54 @@ class Command(BaseCommand):
             default=10,
             help='Number of trades to create'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Insert with batched bulk_create and synthetic users, for large datasets'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Trades per bulk_create batch and transaction (bulk mode)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Number of synthetic users with varied roles (bulk mode)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Spread created_at over this many past days (bulk mode)'
+        )
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            default=None,
+            help=(
+                'First day (YYYY-MM-DD) of the created_at spread (bulk mode). Defaults to '
+                f'--days before today, or to {SEEDED_START} when --seed is given'
+            )
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed for reproducible datasets'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes generating rows in parallel (bulk mode)'
+        )
 
     def handle(self, *args, **options):
         count = options['count']
-        
+
         # Create or get a default user
         user, created = DjangoUser.objects.get_or_create(
             username='admin',
@@ -31,65 +163,157 @@ class Command(BaseCommand):
             user.save()
             self.stdout.write(self.style.SUCCESS(f'Created admin user: admin/admin123'))
 
-        # Sample data
-        symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX', 'AMD', 'INTC']
-        trade_types = ['BUY', 'SELL']
+        if options['bulk']:
+            created_trades = self._create_bulk(count, options)
+        else:
+            created_trades = self._create_one_by_one(count, user, options['seed'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully created {created_trades} sample trades'
+            )
+        )
+
+        # Display summary
+        stats = get_trade_stats()
+
+        self.stdout.write(f'Trade Summary:')
+        self.stdout.write(f'  Total: {stats["total"]}')
+        self.stdout.write(f'  Pending: {stats["by_status"]["PENDING"]["count"]}')
+        self.stdout.write(f'  Confirmed: {stats["by_status"]["CONFIRMED"]["count"]}')
+        self.stdout.write(f'  Approved: {stats["by_status"]["APPROVED"]["count"]}')
+        self.stdout.write(f'  Notional: ${stats["notional"]:,.2f}')
+
+    def _create_one_by_one(self, count, user, seed):
+        rng = random.Random(seed)
         statuses = ['PENDING', 'CONFIRMED', 'APPROVED']
-        notes_options = [
-            'Regular market order',
-            'Limit order execution',
-            'Stop loss trigger',
-            'Quarterly rebalancing',
-            'Portfolio diversification',
-            'Market timing strategy',
-            '',  # Some trades without notes
-        ]
 
         created_trades = 0
         for i in range(count):
-            symbol = random.choice(symbols)
-            trade_type = random.choice(trade_types)
-            quantity = random.randint(10, 1000)
-            price = Decimal(str(round(random.uniform(50.0, 500.0), 2)))
-            status = random.choice(statuses)
-            notes = random.choice(notes_options)
-            
-            trade = Trade.objects.create(
-                symbol=symbol,
-                trade_type=trade_type,
-                quantity=quantity,
-                price=price,
+            status = rng.choice(statuses)
+            trade = Trade(
+                symbol=rng.choice(SYMBOLS),
+                trade_type=rng.choice(TRADE_TYPES),
+                quantity=rng.randint(10, 1000),
+                price=Decimal(str(round(rng.uniform(50.0, 500.0), 2))),
                 status=status,
-                notes=notes,
+                notes=rng.choice(NOTES_OPTIONS),
                 created_by=user,
             )
-            
+
             # If confirmed or approved, set the appropriate fields
             if status in ['CONFIRMED', 'APPROVED']:
                 trade.confirmed_by = user
                 trade.confirmed_at = trade.created_at
-                
+
             if status == 'APPROVED':
                 trade.approved_by = user
                 trade.approved_at = trade.created_at
-                
+
             trade.save()
             created_trades += 1
+        return created_trades
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Successfully created {created_trades} sample trades'
+    def _synthetic_users(self, count):
+        """Create (or reuse) sample users, cycling through ROLE_PROFILES"""
+        users = [
+            DjangoUser(
+                username=f'sample_user_{i:03d}',
+                email=f'sample_user_{i:03d}@example.com',
+                roles=ROLE_PROFILES[i % len(ROLE_PROFILES)],
             )
+            for i in range(count)
+        ]
+        for sample_user in users:
+            sample_user.set_unusable_password()
+        DjangoUser.objects.bulk_create(users, ignore_conflicts=True)
+        return list(
+            DjangoUser.objects.filter(username__in=[sample_user.username for sample_user in users])
+            .order_by('username')
+            .values_list('id', 'roles')
         )
-        
-        # Display summary
-        total_trades = Trade.objects.count()
-        pending = Trade.objects.filter(status='PENDING').count()
-        confirmed = Trade.objects.filter(status='CONFIRMED').count()
-        approved = Trade.objects.filter(status='APPROVED').count()
 
-        self.stdout.write(f'Trade Summary:')
-        self.stdout.write(f'  Total: {total_trades}')
-        self.stdout.write(f'  Pending: {pending}')
-        self.stdout.write(f'  Confirmed: {confirmed}')
-        self.stdout.write(f'  Approved: {approved}')
+    def _create_bulk(self, count, options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if batch_size < 1 or workers < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        users = self._synthetic_users(max(options['users'], 1))
+
+        def with_role(*roles):
+            ids = [pk for pk, user_roles in users if set(roles) & set(user_roles)]
+            return ids or [pk for pk, _ in users]
+
+        traders = with_role('trader', 'admin')
+        confirmers = with_role('confirms', 'admin')
+        approvers = with_role('approver', 'admin')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2**32)
+        days = max(options['days'], 1)
+        first_day = options['start']
+        if first_day is None:
+            first_day = SEEDED_START if options['seed'] is not None else timezone.localdate() - timedelta(days=days)
+        start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+        jobs = [
+            (seed, index, min(batch_size, count - offset), start, days, traders, confirmers, approvers)
+            for index, offset in enumerate(range(0, count, batch_size))
+        ]
+        self.stdout.write(
+            f'Generating {count} trades in {len(jobs)} batches '
+            f'for {len(users)} users from {first_day} (seed {seed}, {workers} worker(s))'
+        )
+
+        started = time.perf_counter()
+        created_trades = 0
+        pool = Pool(workers) if workers > 1 else None
+        try:
+            batches = pool.imap(generate_batch, jobs) if pool else map(generate_batch, jobs)
+            for rows in batches:
+                with transaction.atomic():
+                    trades = Trade.objects.bulk_create([
+                        Trade(
+                            symbol=symbol,
+                            trade_type=trade_type,
+                            quantity=quantity,
+                            price=price,
+                            status=status,
+                            notes=notes,
+                            created_by_id=created_by,
+                            created_at=created_at,
+                            confirmed_by_id=confirmed_by,
+                            confirmed_at=confirmed_at,
+                            approved_by_id=approved_by,
+                            approved_at=approved_at,
+                        )
+                        for (symbol, trade_type, quantity, price, status, notes, created_by,
+                             created_at, confirmed_by, confirmed_at, approved_by, approved_at) in rows
+                    ])
+                    # bulk_create bypasses the signals writing the event log
+                    # and the search index
+                    index_trades(((trade.pk, trade.notes) for trade in trades), replace=False)
+                    record_events([
+                        event
+                        for trade in trades
+                        for event in history_events(
+                            trade.pk, snapshot(trade), trade.created_by_id, trade.created_at,
+                            trade.confirmed_by_id, trade.confirmed_at,
+                            trade.approved_by_id, trade.approved_at,
+                        )
+                    ])
+                created_trades += len(rows)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {created_trades}/{count}')
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Inserted {created_trades} trades in {elapsed:.1f}s '
+            f'({created_trades / elapsed if elapsed else 0:,.0f} trades/s)'
+        )
+
+        invalidate_trades()
+        return created_trades
@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.exports import ExportError, export_queryset, iter_export, parse_bound
+from dashboard.models import DjangoUser
+
+
+class Command(BaseCommand):
+    help = 'Stream trades as CSV or JSON Lines with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            default='csv',
+            help='Output format'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (defaults to stdout)'
+        )
+        parser.add_argument('--status', help='Only trades in this status')
+        parser.add_argument('--from', dest='since', help='Created on or after this date/datetime')
+        parser.add_argument('--to', dest='until', help='Created up to this date (inclusive) or datetime')
+        parser.add_argument('--user', help='Only trades created by this username')
+        parser.add_argument(
+            '--as-user',
+            help='Apply the trade.view_tradelist rule of this username'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched from the database per round trip'
+        )
+
+    def handle(self, *args, **options):
+        viewer = None
+        if options['as_user']:
+            try:
+                viewer = DjangoUser.objects.get(username=options['as_user'])
+            except DjangoUser.DoesNotExist:
+                raise CommandError(f'No user named {options["as_user"]}')
+
+        try:
+            queryset = export_queryset(
+                user=viewer,
+                status=options['status'],
+                since=parse_bound(options['since']),
+                until=parse_bound(options['until'], end=True),
+                created_by=options['user'],
+            )
+        except ExportError as exc:
+            raise CommandError(str(exc))
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in iter_export(queryset, options['format'], options['chunk_size']):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
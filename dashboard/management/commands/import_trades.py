@@ -0,0 +1,81 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.imports import FORMATS, ImportFileError, guess_format, import_trades
+from dashboard.models import DjangoUser
+
+
+class Command(BaseCommand):
+    help = 'Import trades from a CSV or JSON Lines file as PENDING trades'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import, or - for stdin'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format (default: guessed from the file extension)'
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Username recorded as the creator of the imported trades'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows validated and inserted per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate only, insert nothing'
+        )
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=50,
+            help='Row errors to print (all are counted)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = DjangoUser.objects.get(username=options['user'])
+        except DjangoUser.DoesNotExist:
+            raise CommandError(f'Unknown user: {options["user"]}')
+
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = import_trades(
+                stream,
+                fmt,
+                user,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                max_errors=max(options['max_errors'], 0),
+            )
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(str(error))
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... {result.error_count - len(result.errors)} more error(s)')
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {result.created} of {result.rows} rows '
+                f'({result.rejected} rejected) in {result.elapsed:.2f}s '
+                f'({result.rate:,.0f} rows/s)'
+            )
+        )
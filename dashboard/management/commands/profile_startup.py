@@ -0,0 +1,121 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HANDLERS = ['wsgi', 'asgi']
+
+
+def _probe(handler, importtime=False):
+    """Run dashboard.startup in a fresh interpreter; returns (timings, process seconds, stderr)"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-m', 'dashboard.startup', handler]
+    started = time.perf_counter()
+    process = subprocess.run(
+        command,
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': ''},
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if process.returncode:
+        raise CommandError(f'The {handler} probe failed:\n{process.stderr}')
+    return json.loads(process.stdout), elapsed, process.stderr
+
+
+def _import_costs(report):
+    """(module, self seconds) from the output of python -X importtime"""
+    costs = []
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, module = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            costs.append((module.strip(), int(self_us) / 1e6))
+    return costs
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the cold start of core.wsgi / core.asgi in fresh interpreters: import time, '
+        'first request and the slowest imports; fail when over --budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--handler',
+            action='append',
+            choices=HANDLERS,
+            help='Application to measure, repeatable (default: both)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Fresh interpreters per handler; medians are reported'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Slowest packages and modules to list'
+        )
+        parser.add_argument(
+            '--budget',
+            type=float,
+            help='Seconds the median import plus first request may take'
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        # Compile everything once so the runs measure imports, not compilation
+        _probe(HANDLERS[0])
+
+        over_budget = []
+        self.stdout.write(
+            f'{"handler":<9}{"import ms":>11}{"request ms":>12}{"ready ms":>10}{"process ms":>12}'
+            f'   (median of {options["runs"]}, DEBUG={settings.DEBUG})'
+        )
+        for handler in options['handler'] or HANDLERS:
+            runs = [_probe(handler) for _ in range(options['runs'])]
+            imported = statistics.median(timings['import'] for timings, _, _ in runs)
+            first_request = statistics.median(timings['first_request'] for timings, _, _ in runs)
+            ready = statistics.median(timings['import'] + timings['first_request'] for timings, _, _ in runs)
+            process = statistics.median(elapsed for _, elapsed, _ in runs)
+            self.stdout.write(
+                f'{handler:<9}{imported * 1000:>11.0f}{first_request * 1000:>12.0f}'
+                f'{ready * 1000:>10.0f}{process * 1000:>12.0f}'
+            )
+            if options['budget'] is not None and ready > options['budget']:
+                over_budget.append(f'{handler} took {ready:.3f}s')
+
+        if options['top']:
+            self.report_imports(options['top'])
+        if over_budget:
+            raise CommandError(f'Cold start over the {options["budget"]}s budget: {", ".join(over_budget)}')
+        if options['budget'] is not None:
+            self.stdout.write(self.style.SUCCESS(f'Cold start within the {options["budget"]}s budget'))
+
+    def report_imports(self, top):
+        """Where the import time of core.wsgi goes, from python -X importtime"""
+        _, _, report = _probe('wsgi', importtime=True)
+        costs = _import_costs(report)
+        packages = {}
+        for module, seconds in costs:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0.0) + seconds
+        self.stdout.write('\nSlowest packages to import (self time, all modules of the package):')
+        for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {seconds * 1000:>8.1f} ms  {package}')
+        self.stdout.write('Slowest modules:')
+        for module, seconds in sorted(costs, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {seconds * 1000:>8.1f} ms  {module}')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of trade notes from the trades'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('This database has no search index; notes are searched without one')
+        started = time.perf_counter()
+        with transaction.atomic():
+            indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Indexed the notes of {indexed} trades in {time.perf_counter() - started:.1f}s'
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from dashboard.stats import get_trade_stats, rebuild_trade_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trade statistics summary table from the trades'
+
+    def handle(self, *args, **options):
+        rebuild_trade_stats()
+        stats = get_trade_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt trade stats: {stats["total"]} trades '
+                f'across {len(stats["by_symbol"])} symbols'
+            )
+        )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.events import replay_events
+from dashboard.stats import compute_trade_stats, get_trade_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trade stats, symbol positions and user activity by replaying the trade event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Events read per query'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if the replayed trade stats differ from the trades table'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.perf_counter()
+        replayed = replay_events(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        if options['check'] and compute_trade_stats() != get_trade_stats():
+            raise CommandError('Replayed trade stats differ from the trades table')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Replayed {replayed} events in {elapsed:.1f}s '
+                f'({replayed / elapsed if elapsed else 0:.0f} events/s)'
+            )
+        )
@@ -0,0 +1,170 @@
+import multiprocessing
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.stats import compute_trade_stats, get_trade_stats
+
+STRESS_USER = '__stress__'
+
+# Competing actions per round and the status the trade starts in
+ROUNDS = [
+    (['confirm'], 'PENDING'),
+    (['approve', 'reject'], 'CONFIRMED'),
+    (['unconfirm', 'approve'], 'CONFIRMED'),
+]
+
+
+def attempt(trade_id, user_id, action, barrier):
+    """Load the trade, wait for every competitor, then try the transition"""
+    try:
+        trade = Trade.objects.get(pk=trade_id)
+        user = DjangoUser.objects.get(pk=user_id)
+        barrier.wait()
+        return getattr(trade, action)(user)
+    finally:
+        connection.close()
+
+
+def _run(*args):
+    # Errors (e.g. "database is locked") are reported, not raised, so one
+    # failing worker cannot leave the others waiting
+    try:
+        return attempt(*args)
+    except Exception as exc:
+        return f'{type(exc).__name__}: {exc}'
+
+
+def _thread_worker(results, index, *args):
+    results[index] = _run(*args)
+
+
+def _process_worker(queue, index, *args):
+    queue.put((index, _run(*args)))
+
+
+class Command(BaseCommand):
+    help = 'Race concurrent workflow transitions on one trade and check that exactly one wins'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Competing threads or processes per round'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=20,
+            help='Number of races to run'
+        )
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Race separate processes instead of threads'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 2 or options['rounds'] < 1:
+            raise CommandError('--workers must be at least 2 and --rounds at least 1')
+
+        # Workers use their own connections, so the trade has to be
+        # committed rather than created in a rolled back transaction
+        user, _ = DjangoUser.objects.get_or_create(
+            username=STRESS_USER,
+            defaults={'email': 'stress@example.invalid', 'roles': ['admin']},
+        )
+        trade = Trade.objects.create(
+            symbol='STRESS',
+            trade_type='BUY',
+            quantity=1,
+            price=Decimal('1.00'),
+            created_by=user,
+        )
+        failures = 0
+        started = time.perf_counter()
+        try:
+            for round_number in range(options['rounds']):
+                actions, start_status = ROUNDS[round_number % len(ROUNDS)]
+                # A regular save, so the stats signals see the reset
+                trade.refresh_from_db()
+                trade.status = start_status
+                trade.save()
+                competitors = [actions[i % len(actions)] for i in range(workers)]
+                if options['processes']:
+                    wins = self._race_processes(trade.pk, user.pk, competitors)
+                else:
+                    wins = self._race_threads(trade.pk, user.pk, competitors)
+
+                winners = [action for action, won in zip(competitors, wins) if won is True]
+                errors = [won for won in wins if isinstance(won, str)]
+                final = Trade.objects.get(pk=trade.pk)
+                ok = len(winners) == 1 and not errors
+                failures += not ok
+                self.stdout.write(
+                    f'round {round_number + 1}: {"/".join(actions)} from {start_status}: '
+                    f'{len(winners)} winner(s) {winners}, now {final.status} v{final.version}'
+                    + ('' if ok else '  <-- FAILED')
+                )
+                for error in errors:
+                    self.stderr.write(f'  {error}')
+        finally:
+            # Deleted through a queryset so post_delete sees the stored status
+            Trade.objects.filter(pk=trade.pk).delete()
+
+        elapsed = time.perf_counter() - started
+        if compute_trade_stats() != get_trade_stats():
+            raise CommandError('Trade stats drifted from the trades table')
+        if failures:
+            raise CommandError(f'{failures} round(s) did not have exactly one winner')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{options["rounds"]} rounds with {workers} '
+                f'{"processes" if options["processes"] else "threads"}: '
+                f'exactly one winner each ({elapsed:.1f}s)'
+            )
+        )
+
+    def _race_threads(self, trade_id, user_id, actions):
+        barrier = threading.Barrier(len(actions))
+        results = [None] * len(actions)
+        threads = [
+            threading.Thread(
+                target=_thread_worker,
+                args=(results, i, trade_id, user_id, action, barrier),
+            )
+            for i, action in enumerate(actions)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _race_processes(self, trade_id, user_id, actions):
+        # Children must not share the parent's database connection
+        connections.close_all()
+        barrier = multiprocessing.Barrier(len(actions))
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_process_worker,
+                args=(queue, i, trade_id, user_id, action, barrier),
+            )
+            for i, action in enumerate(actions)
+        ]
+        for process in processes:
+            process.start()
+        results = [None] * len(actions)
+        for _ in processes:
+            index, result = queue.get()
+            results[index] = result
+        for process in processes:
+            process.join()
+        return results
@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default SQLite database to the SQLite files standing in for read '
+        'replicas (DJANGO_DB_REPLICAS), once or repeatedly to simulate replication lag'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep copying, waiting this many seconds between copies'
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.DASHBOARD_DB_REPLICAS
+        if not replicas:
+            raise CommandError('No replicas configured; set DJANGO_DB_REPLICAS')
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(
+                    f'{alias} is not SQLite; real replicas are kept up to date by the database'
+                )
+
+        while True:
+            started = time.perf_counter()
+            for alias in replicas:
+                self.copy(alias)
+            self.stdout.write(
+                f'Copied {connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]} to '
+                f'{len(replicas)} replicas in {(time.perf_counter() - started) * 1000:.0f}ms'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, alias):
+        # The backup API copies a consistent snapshot page by page while
+        # the source stays writable
+        connections[alias].close()
+        source = sqlite3.connect(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
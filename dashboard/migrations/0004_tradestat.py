@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+def backfill_tradestats(apps, schema_editor):
+    Trade = apps.get_model('dashboard', 'Trade')
+    TradeStat = apps.get_model('dashboard', 'TradeStat')
+    notional = models.ExpressionWrapper(
+        models.F('quantity') * models.F('price'),
+        output_field=models.DecimalField(max_digits=24, decimal_places=2),
+    )
+    rows = (
+        Trade.objects.order_by()
+        .values_list('symbol', 'status')
+        .annotate(count=models.Count('id'), notional=models.Sum(notional))
+    )
+    TradeStat.objects.bulk_create(
+        TradeStat(symbol=symbol, status=status, count=count, notional=total or 0)
+        for symbol, status, count, total in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_djangouser_groups_djangouser_user_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('status', models.CharField(max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('notional', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'status'), name='tradestat_symbol_status_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_tradestats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_tradestat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='created_trades', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['-created_at', '-id'], name='trade_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='trade_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['created_by', 'status', '-created_at'], name='trade_creator_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_trade_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
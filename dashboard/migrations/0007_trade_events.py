@@ -0,0 +1,136 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+STATUS_CODES = {'PENDING': 1, 'CONFIRMED': 2, 'APPROVED': 3, 'REJECTED': 4}
+CREATED, CONFIRMED, APPROVED, REJECTED = 1, 2, 4, 5
+
+
+def backfill_trade_events(apps, schema_editor):
+    """Seed the log with each existing trade's lifecycle, as its columns tell it"""
+    Trade = apps.get_model('dashboard', 'Trade')
+    TradeEvent = apps.get_model('dashboard', 'TradeEvent')
+    SymbolPosition = apps.get_model('dashboard', 'SymbolPosition')
+    UserActivity = apps.get_model('dashboard', 'UserActivity')
+
+    last_id = 0
+    while True:
+        trades = list(Trade.objects.filter(id__gt=last_id).order_by('id')[:5000])
+        if not trades:
+            break
+        last_id = trades[-1].id
+        events = []
+        for trade in trades:
+            snapshot = dict(
+                trade_id=trade.id,
+                symbol=trade.symbol,
+                quantity=trade.quantity if trade.trade_type == 'BUY' else -trade.quantity,
+                price=trade.price,
+            )
+            events.append(TradeEvent(
+                kind=CREATED, actor_id=trade.created_by_id, at=trade.created_at,
+                to_status=STATUS_CODES['PENDING'], **snapshot
+            ))
+            if trade.status == 'PENDING':
+                continue
+            confirmed_at = trade.confirmed_at or trade.created_at
+            events.append(TradeEvent(
+                kind=CONFIRMED, actor_id=trade.confirmed_by_id, at=confirmed_at,
+                from_status=STATUS_CODES['PENDING'], to_status=STATUS_CODES['CONFIRMED'], **snapshot
+            ))
+            if trade.status in ('APPROVED', 'REJECTED'):
+                approved = trade.status == 'APPROVED'
+                events.append(TradeEvent(
+                    kind=APPROVED if approved else REJECTED,
+                    actor_id=trade.approved_by_id if approved else None,
+                    at=(trade.approved_at if approved else None) or confirmed_at,
+                    from_status=STATUS_CODES['CONFIRMED'],
+                    to_status=STATUS_CODES[trade.status],
+                    **snapshot
+                ))
+        TradeEvent.objects.bulk_create(events)
+
+    notional = models.ExpressionWrapper(
+        models.F('quantity') * models.F('price'),
+        output_field=models.DecimalField(max_digits=24, decimal_places=2),
+    )
+    positions = {}
+    rows = (
+        Trade.objects.filter(status='APPROVED').order_by()
+        .values_list('symbol', 'trade_type')
+        .annotate(n=models.Count('id'), total=models.Sum('quantity'), total_notional=models.Sum(notional))
+    )
+    for symbol, trade_type, trades, quantity, total in rows:
+        position = positions.setdefault(symbol, SymbolPosition(symbol=symbol))
+        position.trades += trades
+        if trade_type == 'BUY':
+            position.bought, position.buy_notional = quantity, total or 0
+        else:
+            position.sold, position.sell_notional = quantity, total or 0
+    SymbolPosition.objects.bulk_create(positions.values())
+
+    activity = (
+        TradeEvent.objects.filter(actor__isnull=False).order_by()
+        .values_list('actor_id', 'kind')
+        .annotate(n=models.Count('id'), latest=models.Max('at'))
+    )
+    UserActivity.objects.bulk_create(
+        UserActivity(user_id=actor_id, kind=kind, count=count, last_at=last_at)
+        for actor_id, kind, count, last_at in activity
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_trade_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10, unique=True)),
+                ('trades', models.BigIntegerField(default=0)),
+                ('bought', models.BigIntegerField(default=0)),
+                ('sold', models.BigIntegerField(default=0)),
+                ('buy_notional', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('sell_notional', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TradeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Created'), (2, 'Confirmed'), (3, 'Moved back to pending'), (4, 'Approved'), (5, 'Rejected'), (6, 'Amended'), (7, 'Deleted')])),
+                ('at', models.DateTimeField()),
+                ('from_status', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'PENDING'), (2, 'CONFIRMED'), (3, 'APPROVED'), (4, 'REJECTED')], null=True)),
+                ('to_status', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'PENDING'), (2, 'CONFIRMED'), (3, 'APPROVED'), (4, 'REJECTED')], null=True)),
+                ('symbol', models.CharField(max_length=10)),
+                ('quantity', models.IntegerField(help_text='Positive for buys, negative for sells')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('trade', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='dashboard.trade')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trade', 'id'], name='trade_event_trade_idx'), models.Index(fields=['actor', 'at'], name='trade_event_actor_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('last_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind'), name='useractivity_user_kind_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_trade_events, migrations.RunPython.noop),
+    ]
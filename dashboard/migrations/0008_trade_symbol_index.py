@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_trade_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', '-created_at', '-id'], name='trade_symbol_created_idx'),
+        ),
+    ]
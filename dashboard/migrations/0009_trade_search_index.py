@@ -0,0 +1,38 @@
+from django.db import migrations
+
+FTS_TABLE = 'dashboard_trade_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 index of trade notes; other backends search without one"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"notes, tokenize = 'porter unicode61', prefix = '2 3')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, notes) "
+            f"SELECT id, notes FROM dashboard_trade WHERE notes != ''"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_trade_symbol_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:48
+
+import dashboard.models.tradesearch
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_trade_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeSearchEntry',
+            fields=[
+                ('trade', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='dashboard.trade')),
+                ('notes', dashboard.models.tradesearch.SearchField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'dashboard_trade_fts',
+                'managed': False,
+            },
+        ),
+    ]
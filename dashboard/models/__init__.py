@@ -1,2 +1,6 @@
 from .trade import Trade
+from .tradestat import TradeStat
+from .tradeevent import TradeEvent
+from .projections import SymbolPosition, UserActivity
 from .djangouser import DjangoUser
+from .tradesearch import TradeSearchEntry
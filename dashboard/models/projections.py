@@ -0,0 +1,53 @@
+from django.db import models
+
+from dashboard.models.djangouser import DjangoUser
+
+
+class SymbolPosition(models.Model):
+    """
+    Position per symbol built from approved trades.
+
+    A projection of the trade event log maintained by dashboard.events;
+    rebuild it with `manage.py replay_trade_events`.
+    """
+
+    symbol = models.CharField(max_length=10, unique=True)
+    trades = models.BigIntegerField(default=0)
+    bought = models.BigIntegerField(default=0)
+    sold = models.BigIntegerField(default=0)
+    buy_notional = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    sell_notional = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.symbol}: {self.net_quantity:+d}"
+
+    @property
+    def net_quantity(self):
+        return self.bought - self.sold
+
+    @property
+    def net_notional(self):
+        return self.buy_notional - self.sell_notional
+
+
+class UserActivity(models.Model):
+    """
+    Number of trade events per (user, event kind) and the latest one.
+
+    A projection of the trade event log maintained by dashboard.events.
+    """
+
+    user = models.ForeignKey(
+        DjangoUser, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    kind = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+    last_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='useractivity_user_kind_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}/{self.kind}: {self.count}"
@@ -1,5 +1,7 @@
 from django.conf import settings
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import F
+from django.dispatch import Signal
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
@@ -7,6 +9,67 @@ from django.contrib.auth import get_user_model
 
 from dashboard.models.djangouser import DjangoUser
 
+# Trade columns rendered by the list and detail templates
+LIST_FIELDS = [
+    'id', 'symbol', 'trade_type', 'quantity', 'price', 'status',
+    'created_at', 'created_by', 'created_by__username',
+]
+DETAIL_FIELDS = LIST_FIELDS + [
+    'confirmed_at', 'approved_at', 'notes', 'version',
+    'confirmed_by', 'confirmed_by__username',
+    'approved_by', 'approved_by__username',
+]
+
+
+# Sent after a transition() wins, with trade, action, user, source and
+# target. Transitions are queryset updates, so the regular save signals do
+# not fire for them.
+trade_transitioned = Signal()
+
+
+class TradeTransition:
+    """A workflow step moving a trade from `source` to `target` status"""
+
+    def __init__(self, source, target, changes):
+        self.source = source
+        self.target = target
+        self.changes = changes
+
+    def values(self, user, now):
+        """Column values written by the transition"""
+        return {'status': self.target, **self.changes(user, now)}
+
+
+TRANSITIONS = {
+    'confirm': TradeTransition(
+        'PENDING', 'CONFIRMED',
+        lambda user, now: {'confirmed_by': user, 'confirmed_at': now},
+    ),
+    'unconfirm': TradeTransition(
+        'CONFIRMED', 'PENDING',
+        lambda user, now: {'confirmed_by': None, 'confirmed_at': None},
+    ),
+    'approve': TradeTransition(
+        'CONFIRMED', 'APPROVED',
+        lambda user, now: {'approved_by': user, 'approved_at': now},
+    ),
+    'reject': TradeTransition(
+        'CONFIRMED', 'REJECTED',
+        lambda user, now: {},
+    ),
+}
+
+
+class TradeQuerySet(models.QuerySet):
+    def for_list(self):
+        """Rows for trade tables: creators joined in, notes left behind"""
+        return self.select_related('created_by').only(*LIST_FIELDS)
+
+    def for_detail(self):
+        """A single trade with every user it references joined in"""
+        return self.select_related('created_by', 'confirmed_by', 'approved_by').only(*DETAIL_FIELDS)
+
+
 class Trade(models.Model):
     TRADE_TYPES = [
         ('BUY', 'Buy'),
@@ -30,7 +93,8 @@ class Trade(models.Model):
     status = models.CharField(max_length=10, choices=STATUSES, default='PENDING')
     
 
-    created_by = models.ForeignKey(DjangoUser, on_delete=models.CASCADE, related_name='created_trades')
+    # Indexed through trade_creator_status_idx below
+    created_by = models.ForeignKey(DjangoUser, on_delete=models.CASCADE, related_name='created_trades', db_index=False)
     confirmed_by = models.ForeignKey(DjangoUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='confirmed_trades')
     approved_by = models.ForeignKey(DjangoUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_trades')
 
@@ -41,9 +105,24 @@ class Trade(models.Model):
     
     # Additional fields
     notes = models.TextField(blank=True, help_text="Additional notes about the trade")
+
+    # Bumped on every write, transitions only apply to the version they read
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TradeQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the full blotter
+            models.Index(fields=['-created_at', '-id'], name='trade_created_idx'),
+            # Status filtered lists ordered by recency
+            models.Index(fields=['status', '-created_at', '-id'], name='trade_status_created_idx'),
+            # Trades of one symbol ordered by recency (API symbol filter)
+            models.Index(fields=['symbol', '-created_at', '-id'], name='trade_symbol_created_idx'),
+            # Per-user views, optionally filtered by status
+            models.Index(fields=['created_by', 'status', '-created_at'], name='trade_creator_status_idx'),
+        ]
         permissions = [
             ('confirm_trade', 'Can confirm trades'),
             ('approve_trade', 'Can approve trades'),
@@ -53,6 +132,100 @@ class Trade(models.Model):
         
     def __str__(self):
         return f"{self.trade_type} {self.quantity} {self.symbol} @ ${self.price}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Replicas may lag, only rows read from the primary are known to
+        # be what a save overwrites
+        if db == DEFAULT_DB_ALIAS:
+            instance._stored_values = dict(zip(field_names, values))
+        return instance
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # A cached copy may be older than the row
+        state.pop('_stored_values', None)
+        return state
+
+    def stored_values(self, names):
+        """
+        The values of fields `names` as the row held them when this
+        instance was loaded or last saved, None if any is unknown
+        """
+        stored = self.__dict__.get('_stored_values', {})
+        attnames = [self._meta.get_field(name).attname for name in names]
+        if not all(attname in stored for attname in attnames):
+            return None
+        return tuple(stored[attname] for attname in attnames)
+
+    def _remember_stored(self, names, known=True):
+        stored = self.__dict__.setdefault('_stored_values', {})
+        for name in names:
+            field = self._meta.get_field(name)
+            if not field.concrete:
+                continue
+            attname = field.attname
+            if known:
+                stored[attname] = getattr(self, attname)
+            else:
+                stored.pop(attname, None)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [field.name for field in self._meta.concrete_fields]
+        self._remember_stored(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None:
+            deferred = self.get_deferred_fields()
+            fields = [field.attname for field in self._meta.concrete_fields if field.attname not in deferred]
+        self._remember_stored(fields, known=self._state.db == DEFAULT_DB_ALIAS)
+
+    def transition(self, action, user=None):
+        """Compare-and-set on status and version; returns True if this call won"""
+        step = TRANSITIONS[action]
+        if self.status != step.source:
+            return False
+        values = step.values(user, timezone.now())
+        with transaction.atomic():
+            won = Trade.objects.filter(
+                pk=self.pk, status=step.source, version=self.version
+            ).update(version=F('version') + 1, **values)
+            if won:
+                for field, value in values.items():
+                    setattr(self, field, value)
+                self.version += 1
+                self._remember_stored([*values, 'version'])
+                trade_transitioned.send(
+                    sender=Trade,
+                    trade=self,
+                    action=action,
+                    user=user,
+                    source=step.source,
+                    target=step.target,
+                )
+        return bool(won)
+
+    def confirm(self, user):
+        return self.transition('confirm', user)
+
+    def unconfirm(self, user=None):
+        return self.transition('unconfirm', user)
+
+    def approve(self, user):
+        return self.transition('approve', user)
+
+    def reject(self, user=None):
+        return self.transition('reject', user)
     
     @property
     def total_value(self):
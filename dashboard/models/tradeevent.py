@@ -0,0 +1,66 @@
+from django.db import models
+
+from dashboard.models.djangouser import DjangoUser
+from dashboard.models.trade import Trade
+
+# Statuses are stored as small integers in the event log
+STATUS_CODES = {status: code for code, (status, _) in enumerate(Trade.STATUSES, start=1)}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+
+class TradeEvent(models.Model):
+    """One entry of the append-only trade event log, standing on its own without the trade"""
+
+    CREATED = 1
+    CONFIRMED = 2
+    UNCONFIRMED = 3
+    APPROVED = 4
+    REJECTED = 5
+    AMENDED = 6
+    DELETED = 7
+
+    KINDS = [
+        (CREATED, 'Created'),
+        (CONFIRMED, 'Confirmed'),
+        (UNCONFIRMED, 'Moved back to pending'),
+        (APPROVED, 'Approved'),
+        (REJECTED, 'Rejected'),
+        (AMENDED, 'Amended'),
+        (DELETED, 'Deleted'),
+    ]
+    STATUS_CHOICES = [(code, status) for status, code in STATUS_CODES.items()]
+
+    # No database constraints: the log outlives the trades and users it names
+    trade = models.ForeignKey(
+        Trade, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='events'
+    )
+    kind = models.PositiveSmallIntegerField(choices=KINDS)
+    actor = models.ForeignKey(
+        DjangoUser, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, blank=True, related_name='+'
+    )
+    at = models.DateTimeField()
+    from_status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+    to_status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, null=True, blank=True)
+    symbol = models.CharField(max_length=10)
+    quantity = models.IntegerField(help_text="Positive for buys, negative for sells")
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            # History of one trade in log order
+            models.Index(fields=['trade', 'id'], name='trade_event_trade_idx'),
+            # Activity of one user over time
+            models.Index(fields=['actor', 'at'], name='trade_event_actor_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.trade_id} {self.get_kind_display()} at {self.at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Trade events are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Trade events are append-only")
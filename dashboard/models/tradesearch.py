@@ -0,0 +1,36 @@
+from django.db import models
+
+from dashboard.models.trade import Trade
+
+
+class SearchField(models.TextField):
+    """A column of an FTS5 table, searchable with the `match` lookup"""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class TradeSearchEntry(models.Model):
+    """Read-only row of the dashboard_trade_fts notes index (SQLite only), keyed by trade id"""
+
+    trade = models.OneToOneField(
+        Trade,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry",
+    )
+    notes = SearchField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "dashboard_trade_fts"
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class TradeStat(models.Model):
+    """Running totals of trades per (symbol, status), projected from the event log"""
+
+    symbol = models.CharField(max_length=10)
+    status = models.CharField(max_length=10)
+    count = models.BigIntegerField(default=0)
+    notional = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'status'], name='tradestat_symbol_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.status}: {self.count} trades, ${self.notional}"
@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe token"""
+    raw = json.dumps([created_at.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Decode a token produced by encode_cursor back into (created_at, id)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(pk)
+    except Exception as exc:
+        raise InvalidCursor(token) from exc
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, navigated with opaque cursors"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, approximate_count, count_is_capped):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = approximate_count
+        self.count_is_capped = count_is_capped
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """Cursor based paginator ordered by (-created_at, -id); counts stop at count_limit"""
+
+    def __init__(self, queryset, per_page, count_limit=1000):
+        self.queryset = queryset.order_by("-created_at", "-id")
+        self.per_page = per_page
+        self.count_limit = count_limit
+
+    def approximate_count(self):
+        """Count matching rows, giving up after count_limit"""
+        count = self.queryset.order_by()[: self.count_limit + 1].count()
+        return min(count, self.count_limit), count > self.count_limit
+
+    def get_page(self, after=None, before=None):
+        """
+        Return the page following the `after` cursor or preceding the
+        `before` cursor. Invalid cursors fall back to the first page.
+        """
+        try:
+            if before:
+                return self._page_before(*decode_cursor(before))
+            if after:
+                return self._page_after(*decode_cursor(after))
+        except InvalidCursor:
+            pass
+        return self._page_after(None, None)
+
+    def _page_after(self, created_at, pk):
+        queryset = self.queryset
+        if created_at is not None:
+            # The redundant range bound lets the database seek the index
+            # instead of walking it from the top
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at),
+                Q(created_at__lt=created_at) | Q(id__lt=pk),
+            )
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        return self._build_page(
+            rows,
+            has_next=has_more,
+            has_previous=created_at is not None,
+        )
+
+    def _page_before(self, created_at, pk):
+        queryset = self.queryset.filter(
+            Q(created_at__gte=created_at),
+            Q(created_at__gt=created_at) | Q(id__gt=pk),
+        ).order_by("created_at", "id")
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._build_page(rows, has_next=True, has_previous=has_more)
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(rows[0].created_at, rows[0].id)
+        if self.count_limit is None:
+            count, capped = None, False
+        else:
+            count, capped = self.approximate_count()
+        return KeysetPage(rows, next_cursor, previous_cursor, count, capped)
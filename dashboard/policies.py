@@ -1,20 +1,25 @@
 # Python 3.10 not happy with these operators
 # type: ignore
+import logging
+
 import rules
 from rules.predicates import predicate
+from .instrumentation import count
 from .models.djangouser import DjangoUser
+from .permissions import Rule, compile_rules
+
+logger = logging.getLogger(__name__)
 
 def get_user_roles(user: DjangoUser):
     """Extract roles from user's OIDC session"""
-    print(f"Getting roles for user: {user}")
     if not user or not user.is_authenticated:
-        print("User is not authenticated or does not exist.")
+        logger.debug("User %s is not authenticated or does not exist", user)
         return []
 
     # Try to get roles from session - this requires accessing the request
     # For now, we'll add them as user attributes when they log in
     roles = user.roles
-    print(f"Extracted roles: {roles}")
+    logger.debug("Extracted roles for user %s: %s", user, roles)
     return roles
 
 
@@ -22,7 +27,8 @@ def get_user_roles(user: DjangoUser):
 @predicate
 def is_admin(user: DjangoUser):
     """Check if user has admin role"""
-    print(f"Checking if user {user.username} is admin")
+    count("permission_predicates")
+    logger.debug("Checking if user %s is admin", user.username)
     roles = get_user_roles(user)
     return "admin" in roles
 
@@ -30,7 +36,8 @@ def is_admin(user: DjangoUser):
 @predicate
 def is_reader(user: DjangoUser):
     """Check if user has reader role"""
-    print(f"Checking if user {user.username} is reader")
+    count("permission_predicates")
+    logger.debug("Checking if user %s is reader", user.username)
     roles = get_user_roles(user)
     return "reader" in roles
 
@@ -38,7 +45,8 @@ def is_reader(user: DjangoUser):
 @predicate
 def is_trader(user: DjangoUser):
     """Check if user has trader role"""
-    print(f"Checking if user {user.username} is trader")
+    count("permission_predicates")
+    logger.debug("Checking if user %s is trader", user.username)
     roles = get_user_roles(user)
     return "trader" in roles
 
@@ -46,16 +54,17 @@ def is_trader(user: DjangoUser):
 @predicate
 def is_confirmer(user: DjangoUser):
     """Check if user has confirm role"""
-    print(f"Checking if user {user.username} is confirmer")
+    count("permission_predicates")
+    logger.debug("Checking if user %s is confirmer", user.username)
     roles = get_user_roles(user)
-    print(f"Roles for user {user.username}: {roles}")
     return "confirms" in roles
 
 
 @predicate
 def is_approver(user: DjangoUser):
     """Check if user has approver role"""
-    print(f"Checking if user {user.username} is approver")
+    count("permission_predicates")
+    logger.debug("Checking if user %s is approver", user.username)
     roles = get_user_roles(user)
     return "approver" in roles
 
@@ -63,65 +72,109 @@ def is_approver(user: DjangoUser):
 @predicate
 def is_trade_creator(user: DjangoUser, trade):
     """Check if user created the trade"""
-    print(f"Checking if user {user.username} is creator of trade {trade}")
-    return trade and trade.created_by == user
+    count("permission_predicates")
+    logger.debug("Checking if user %s is creator of trade %s", user.username, trade)
+    return trade and trade.created_by_id == user.pk
 
 
 @predicate
 def is_trade_pending(user: DjangoUser, trade):
     """Check if trade is in pending status"""
+    count("permission_predicates")
     return trade and trade.status == "PENDING"
 
 
 @predicate
 def is_trade_confirmed(user: DjangoUser, trade):
     """Check if trade is in confirmed status"""
+    count("permission_predicates")
     return trade and trade.status == "CONFIRMED"
 
 
 @predicate
 def is_trade_not_confirmed(user: DjangoUser, trade):
     """Check if trade is not yet confirmed"""
+    count("permission_predicates")
     return trade and trade.status in ["PENDING"]
 
-# View permissions
-rules.permissions.add_perm("trade.view_trade", is_admin | is_reader | is_trader | is_confirmer | is_approver)
-
-# List permissions
-rules.permissions.add_perm(
-    "trade.view_tradelist",
-    is_admin | is_reader | is_trader | is_confirmer | is_approver,
-)
-
-# Create permissions
-rules.permissions.add_perm("trade.create_trade", is_admin | is_trader)
-
-# Delete permissions - traders can delete their own trades if not confirmed
-rules.permissions.add_perm(
-    "trade.delete_trade",
-    is_admin | (is_trader & is_trade_creator & is_trade_not_confirmed),
-)
-
-# Change permissions - only admin for now
-rules.permissions.add_perm("trade.change_trade", is_admin)
-
-# Confirm permissions - confirmers can confirm pending trades or move confirmed back to pending
-rules.permissions.add_perm(
-    "trade.confirm_trade",
-    is_admin | (is_confirmer & (is_trade_pending | is_trade_confirmed)),
-)
-
-# Approve permissions - approvers can approve confirmed trades
-rules.permissions.add_perm(
-    "trade.approve_trade", is_admin | (is_approver & is_trade_confirmed)
-)
-
-# Reject permissions - approvers can reject confirmed trades
-rules.permissions.add_perm(
-    "trade.reject_trade", is_admin | (is_approver & is_trade_confirmed)
-)
-
-# Move back to pending - confirmers can move confirmed trades back to pending
-rules.permissions.add_perm(
-    "trade.unconfirm_trade", is_admin | (is_confirmer & is_trade_confirmed)
-)
+ROLE_PREDICATES = {
+    "admin": is_admin,
+    "reader": is_reader,
+    "trader": is_trader,
+    "confirms": is_confirmer,
+    "approver": is_approver,
+}
+
+ALL_ROLES = {"admin", "reader", "trader", "confirms", "approver"}
+
+# Each permission is granted by any one of its rules. This table is the
+# single source for both the django-rules predicates registered below and
+# the compiled evaluators used by dashboard.permissions.
+TRADE_PERMISSIONS = {
+    # View permissions
+    "trade.view_trade": [Rule(ALL_ROLES)],
+    # List permissions
+    "trade.view_tradelist": [Rule(ALL_ROLES)],
+    # Create permissions
+    "trade.create_trade": [Rule({"admin", "trader"})],
+    # Delete permissions - traders can delete their own trades if not confirmed
+    "trade.delete_trade": [
+        Rule({"admin"}),
+        Rule({"trader"}, statuses={"PENDING"}, creator=True),
+    ],
+    # Change permissions - only admin for now
+    "trade.change_trade": [Rule({"admin"})],
+    # Confirm permissions - confirmers can confirm pending trades or move confirmed back to pending
+    "trade.confirm_trade": [
+        Rule({"admin"}),
+        Rule({"confirms"}, statuses={"PENDING", "CONFIRMED"}),
+    ],
+    # Approve permissions - approvers can approve confirmed trades
+    "trade.approve_trade": [
+        Rule({"admin"}),
+        Rule({"approver"}, statuses={"CONFIRMED"}),
+    ],
+    # Reject permissions - approvers can reject confirmed trades
+    "trade.reject_trade": [
+        Rule({"admin"}),
+        Rule({"approver"}, statuses={"CONFIRMED"}),
+    ],
+    # Move back to pending - confirmers can move confirmed trades back to pending
+    "trade.unconfirm_trade": [
+        Rule({"admin"}),
+        Rule({"confirms"}, statuses={"CONFIRMED"}),
+    ],
+}
+
+
+def _trade_status_in(statuses):
+    @predicate(f"is_trade_{'_or_'.join(sorted(statuses)).lower()}")
+    def check(user: DjangoUser, trade):
+        count("permission_predicates")
+        return trade and trade.status in statuses
+
+    return check
+
+
+def _rule_predicate(rule: Rule):
+    """Build the django-rules predicate equivalent to a Rule"""
+    roles = [ROLE_PREDICATES[role] for role in sorted(rule.roles)]
+    combined = roles[0]
+    for role in roles[1:]:
+        combined = combined | role
+    if rule.statuses is not None:
+        combined = combined & _trade_status_in(rule.statuses)
+    if rule.creator:
+        combined = combined & is_trade_creator
+    return combined
+
+
+for _perm, _rules in TRADE_PERMISSIONS.items():
+    _combined = _rule_predicate(_rules[0])
+    for _rule in _rules[1:]:
+        _combined = _combined | _rule_predicate(_rule)
+    rules.permissions.add_perm(_perm, _combined)
+
+COMPILED_PERMISSIONS = {
+    perm: compile_rules(perm_rules) for perm, perm_rules in TRADE_PERMISSIONS.items()
+}
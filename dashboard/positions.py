@@ -0,0 +1,187 @@
+"""Positions and P&L of approved trades, per symbol or per trader"""
+from decimal import Decimal
+
+from django.db.models import Count, F, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Round
+
+from .models import SymbolPosition, Trade
+from .stats import CENT, NOTIONAL
+
+GROUPINGS = {
+    "symbol": "symbol",
+    "trader": "created_by__username",
+}
+
+# Price in whole cents, computed by the database so rows come back as plain
+# integers instead of Decimals
+PRICE_CENTS = Cast(Round(F("price") * 100), IntegerField())
+
+
+class Position:
+    """Bought and sold totals of one symbol or trader"""
+
+    def __init__(self, key, trades=0, bought=0, sold=0, buy_notional=Decimal(0), sell_notional=Decimal(0)):
+        self.key = key
+        self.trades = trades
+        self.bought = bought
+        self.sold = sold
+        self.buy_notional = buy_notional
+        self.sell_notional = sell_notional
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"<Position {self.key}: {self.net_quantity:+d} @ {self.vwap}>"
+
+    @property
+    def net_quantity(self):
+        return self.bought - self.sold
+
+    @property
+    def gross_notional(self):
+        return self.buy_notional + self.sell_notional
+
+    @property
+    def net_notional(self):
+        """Cash paid for purchases less cash received from sales"""
+        return self.buy_notional - self.sell_notional
+
+    @property
+    def buy_vwap(self):
+        return _vwap(self.buy_notional, self.bought)
+
+    @property
+    def sell_vwap(self):
+        return _vwap(self.sell_notional, self.sold)
+
+    @property
+    def vwap(self):
+        return _vwap(self.gross_notional, self.bought + self.sold)
+
+    @property
+    def realized_pnl(self):
+        """P&L of the quantity both bought and sold, at average prices"""
+        matched = min(self.bought, self.sold)
+        if not matched:
+            return Decimal(0)
+        return ((self.sell_vwap - self.buy_vwap) * matched).quantize(CENT)
+
+    def as_dict(self):
+        return {
+            "key": self.key,
+            "trades": self.trades,
+            "bought": self.bought,
+            "sold": self.sold,
+            "net_quantity": self.net_quantity,
+            "buy_notional": str(self.buy_notional),
+            "sell_notional": str(self.sell_notional),
+            "gross_notional": str(self.gross_notional),
+            "net_notional": str(self.net_notional),
+            "buy_vwap": _str(self.buy_vwap),
+            "sell_vwap": _str(self.sell_vwap),
+            "vwap": _str(self.vwap),
+            "realized_pnl": str(self.realized_pnl),
+        }
+
+
+def _vwap(notional, quantity):
+    if not quantity:
+        return None
+    return (notional / quantity).quantize(Decimal("0.0001"))
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _cents(value):
+    return Decimal(value or 0).quantize(CENT)
+
+
+def _from_cents(cents):
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def _approved(queryset=None):
+    if queryset is None:
+        queryset = Trade.objects.all()
+    return queryset.filter(status="APPROVED")
+
+
+def positions(by="symbol", queryset=None):
+    """
+    Positions from database side aggregation, sorted by key. A queryset
+    narrows the trades considered (e.g. a date range); without one, per
+    symbol positions come straight from the SymbolPosition projection.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping: {by}")
+    if by == "symbol" and queryset is None:
+        return [
+            Position(row.symbol, row.trades, row.bought, row.sold, row.buy_notional, row.sell_notional)
+            for row in SymbolPosition.objects.filter(trades__gt=0).order_by("symbol")
+        ]
+
+    buy, sell = Q(trade_type="BUY"), Q(trade_type="SELL")
+    rows = (
+        _approved(queryset)
+        .order_by()
+        .values_list(GROUPINGS[by])
+        .annotate(
+            trades=Count("id"),
+            bought=Sum("quantity", filter=buy),
+            sold=Sum("quantity", filter=sell),
+            buy_notional=Sum(NOTIONAL, filter=buy),
+            sell_notional=Sum(NOTIONAL, filter=sell),
+        )
+        .order_by(GROUPINGS[by])
+    )
+    return [
+        Position(key, trades, bought or 0, sold or 0, _cents(buy_notional), _cents(sell_notional))
+        for key, trades, bought, sold, buy_notional, sell_notional in rows
+    ]
+
+
+def compute_positions(by="symbol", queryset=None, batch_size=100000):
+    """
+    Positions summed in the process from the approved trades, read
+    `batch_size` rows at a time
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping: {by}")
+
+    # key -> [trades, bought, sold, buy cents, sell cents]
+    totals = {}
+    trades = _approved(queryset).order_by("id")
+    last_id = 0
+    while True:
+        rows = list(
+            trades.filter(id__gt=last_id).values_list(
+                "id", GROUPINGS[by], "trade_type", "quantity", PRICE_CENTS
+            )[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        _add_batch(totals, rows)
+
+    return [
+        Position(key, trades, bought, sold, _from_cents(buy), _from_cents(sell))
+        for key, (trades, bought, sold, buy, sell) in sorted(totals.items())
+    ]
+
+
+def _add_batch(totals, rows):
+    for _, key, trade_type, quantity, price in rows:
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = [0, 0, 0, 0, 0]
+        cents = quantity * price
+        total[0] += 1
+        if trade_type == "BUY":
+            total[1] += quantity
+            total[3] += cents
+        else:
+            total[2] += quantity
+            total[4] += cents
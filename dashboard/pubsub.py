@@ -0,0 +1,194 @@
+"""Publish/subscribe of JSON messages between the parts of the dashboard"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "dashboard.pubsub.LocalBroker"
+
+
+class Subscription:
+    """Messages delivered to one reader, oldest first"""
+
+    def __init__(self, broker, maxsize):
+        self.broker = broker
+        self.overflowed = False
+        self._messages = deque(maxlen=maxsize)
+        self._lock = threading.Condition()
+        # Readers in an event loop are woken through it
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+            self._ready = None
+        else:
+            self._ready = asyncio.Event()
+
+    def deliver(self, message):
+        """Queue a message, from any thread"""
+        with self._lock:
+            if len(self._messages) == self._messages.maxlen:
+                self.overflowed = True
+            self._messages.append(message)
+            self._lock.notify()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # The reader's loop is closed; it will unsubscribe
+                pass
+
+    def _pop(self):
+        with self._lock:
+            return self._messages.popleft() if self._messages else None
+
+    def get(self, timeout=None):
+        """The next message, or None if none arrived within `timeout` seconds"""
+        with self._lock:
+            if not self._messages:
+                self._lock.wait(timeout)
+            return self._messages.popleft() if self._messages else None
+
+    async def aget(self, timeout=None):
+        """get() for readers in the event loop the subscription was opened in"""
+        # Cleared before looking, so a message delivered in between sets it again
+        self._ready.clear()
+        message = self._pop()
+        if message is not None:
+            return message
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._pop()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker(ABC):
+    """Interface of the pub/sub backends"""
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+
+    @abstractmethod
+    def publish(self, message):
+        """Deliver `message` to every open Subscription"""
+
+    @abstractmethod
+    def subscribe(self):
+        """Open a Subscription receiving every message published from now on"""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """Stop delivering to `subscription`"""
+
+    def has_subscribers(self):
+        """Whether publishing can reach anyone; lets publishers skip building messages"""
+        return True
+
+
+class LocalBroker(Broker):
+    """Delivers messages to the subscriptions of the current process"""
+
+    def __init__(self, queue_size=1000):
+        super().__init__(queue_size)
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        with self._lock:
+            subscriptions = tuple(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self):
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes to a Redis channel; a listener thread per process hands what
+    arrives on it to the local subscriptions.
+    """
+
+    def __init__(self, queue_size=1000, url=None, channel="dashboard:events"):
+        super().__init__(queue_size)
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBroker needs the redis package")
+        self.channel = channel
+        self._client = redis.Redis.from_url(url or "redis://127.0.0.1:6379/0")
+        self._listener = None
+
+    def publish(self, message):
+        self._client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self):
+        self._listen()
+        return super().subscribe()
+
+    def has_subscribers(self):
+        # Other processes may be listening
+        return True
+
+    def _listen(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._relay, name="pubsub-redis", daemon=True)
+            self._listener.start()
+
+    def _relay(self):
+        from redis.exceptions import RedisError
+
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for item in pubsub.listen():
+                    try:
+                        message = json.loads(item["data"])
+                    except (TypeError, ValueError):
+                        logger.warning("Ignoring malformed message on %s", self.channel)
+                        continue
+                    LocalBroker.publish(self, message)
+            except RedisError:
+                logger.exception("Lost the subscription to %s, reconnecting", self.channel)
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process wide broker configured by DASHBOARD_PUBSUB_BACKEND"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = import_string(getattr(settings, "DASHBOARD_PUBSUB_BACKEND", DEFAULT_BACKEND))
+                _broker = backend(**getattr(settings, "DASHBOARD_PUBSUB_OPTIONS", {}))
+    return _broker
@@ -0,0 +1,129 @@
+"""Per-view SQL query budgets"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of SQL queries a view may issue"""
+
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+
+    return decorator
+
+
+_active_counters: ContextVar = ContextVar("query_counters", default=())
+
+
+class QueryCounter:
+    """Statements run while the counter was active"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def _count_query(execute, sql, params, many, context):
+    for counter in _active_counters.get():
+        counter.queries.append(sql)
+    return execute(sql, params, many, context)
+
+
+def install_query_counting(sender, connection, **kwargs):
+    """connection_created receiver adding the counting execute wrapper"""
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+connection_created.connect(install_query_counting, dispatch_uid="dashboard.querybudget")
+
+
+@contextmanager
+def count_queries():
+    """Count the queries issued on every database, from any thread"""
+    counter = QueryCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """Fail with the offending SQL if the block issues more than max_queries"""
+    with count_queries() as counter:
+        yield counter
+    if len(counter) > max_queries:
+        statements = "\n".join(f"  {sql}" for sql in counter.queries)
+        raise AssertionError(
+            f"{len(counter)} queries executed, budget is {max_queries}:\n{statements}"
+        )
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL queries each request issues and flag views that exceed
+    the budget declared with @query_budget. Views without a budget fall
+    back to QUERY_BUDGET_DEFAULT when it is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.default_budget = getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+        self.raise_on_exceeded = getattr(settings, "QUERY_BUDGET_RAISE", False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._query_budget = self.default_budget
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        request._query_budget = self.default_budget
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        budget = request._query_budget
+        if budget is not None and len(counter) > budget:
+            view_name = getattr(request.resolver_match, "view_name", request.path)
+            logger.warning(
+                "%s issued %d SQL queries, budget is %d",
+                view_name,
+                len(counter),
+                budget,
+            )
+            if self.raise_on_exceeded:
+                raise QueryBudgetExceeded(
+                    f"{view_name} issued {len(counter)} SQL queries, budget is {budget}"
+                )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, "query_budget", None)
+        if budget is not None:
+            request._query_budget = budget
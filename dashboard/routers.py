@@ -0,0 +1,216 @@
+"""Read replica routing and pinning to the primary after writes"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+PIN_COOKIE = "dashboard_primary"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+# Weight of the latest query in a replica's latency average
+LATENCY_WEIGHT = 0.1
+
+# Every this many requests the latency selection goes round robin
+EXPLORE_EVERY = 10
+
+_routing: ContextVar = ContextVar("replica_routing", default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, "DASHBOARD_DB_REPLICAS", []))
+
+
+def pin_seconds():
+    return getattr(settings, "DASHBOARD_REPLICA_PIN_SECONDS", 5)
+
+
+class RoutingState:
+    """How the current request's queries are routed; shared with its worker threads"""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaSelector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turns = itertools.count()
+        self.latencies = {}
+
+    def select(self, aliases, strategy):
+        with self._lock:
+            turn = next(self._turns)
+            if strategy != "latency":
+                return aliases[turn % len(aliases)]
+            if turn % EXPLORE_EVERY == 0:
+                return aliases[turn // EXPLORE_EVERY % len(aliases)]
+            unmeasured = [alias for alias in aliases if alias not in self.latencies]
+            if unmeasured:
+                return unmeasured[0]
+            return min(aliases, key=self.latencies.__getitem__)
+
+    def observe(self, alias, seconds):
+        with self._lock:
+            previous = self.latencies.get(alias)
+            self.latencies[alias] = (
+                seconds if previous is None else previous + LATENCY_WEIGHT * (seconds - previous)
+            )
+
+
+SELECTOR = ReplicaSelector()
+
+
+def _measure_replica(alias):
+    def execute_wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            SELECTOR.observe(alias, time.perf_counter() - start)
+
+    return execute_wrapper
+
+
+def install_latency_measurement(sender, connection, **kwargs):
+    """connection_created receiver timing the queries of replica connections"""
+    if connection.alias in replica_aliases() and not getattr(connection, "_replica_measured", False):
+        connection.execute_wrappers.append(_measure_replica(connection.alias))
+        connection._replica_measured = True
+
+
+connection_created.connect(install_latency_measurement, dispatch_uid="dashboard.routers")
+
+
+def reading_from_replicas():
+    """Whether the current request may read from a replica"""
+    state = _routing.get()
+    return state is not None and state.replica_reads and not state.pinned and bool(replica_aliases())
+
+
+@contextmanager
+def _replica_reads(request):
+    state = _routing.get()
+    if state is None or request.method not in SAFE_METHODS:
+        yield
+        return
+    state.replica_reads = True
+    try:
+        yield
+    finally:
+        state.replica_reads = False
+
+
+def replica_reads(view_func):
+    """Let a read-only view read from the replicas"""
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            with _replica_reads(request):
+                return await view_func(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with _replica_reads(request):
+                return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Send the reads of @replica_reads views to a replica, everything else to the primary"""
+
+    def _replicated(self, model):
+        return model._meta.app_label == "dashboard" and model._meta.label != settings.AUTH_USER_MODEL
+
+    def db_for_read(self, model, **hints):
+        if not reading_from_replicas() or not self._replicated(model):
+            return None
+        # Reads inside a transaction on the primary must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        state = _routing.get()
+        if state.replica is None:
+            state.replica = SELECTOR.select(
+                replica_aliases(), getattr(settings, "DASHBOARD_REPLICA_SELECTION", "round_robin")
+            )
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keep users on the primary for a while after they wrote. Goes after
+    the session and authentication middleware, so their own writes are not
+    counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=pin_seconds(),
+                httponly=True,
+                samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
@@ -0,0 +1,188 @@
+"""Trade search by symbol and creator prefix, status and full text over notes"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import F, Q, Sum
+
+from .models import DjangoUser, Trade, TradeEvent, TradeStat, UserActivity
+
+FTS_TABLE = "dashboard_trade_fts"
+
+SEARCH_LIMIT = 50
+
+# Notes searches matching more trades than this are not ranked
+RANK_LIMIT = 10000
+
+# Prefixes matching more trades than this are found by walking the newest
+# trades instead of through their index
+SCAN_THRESHOLD = 20000
+
+STATUSES = {status for status, _ in Trade.STATUSES}
+
+WORD = re.compile(r"\w+")
+
+# Aliases of the databases known to have the FTS table
+_fts_databases = set()
+
+
+def fts_available(using=DEFAULT_DB_ALIAS):
+    """Whether the notes can be searched through the FTS table"""
+    if using in _fts_databases:
+        return True
+    database = connections[using]
+    if database.vendor != "sqlite":
+        return False
+    with database.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        found = cursor.fetchone() is not None
+    if found:
+        _fts_databases.add(using)
+    return found
+
+
+def prefix_range(field, prefix):
+    """Q matching values of `field` starting with `prefix`, as an index friendly range"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": upper})
+
+
+def match_expression(text):
+    """FTS5 query for `text`: every word, the last one as a prefix"""
+    words = WORD.findall(text)
+    if not words:
+        return None
+    phrases = [f'"{word}"' for word in words]
+    phrases[-1] += "*"
+    return " ".join(phrases)
+
+
+class TradeSearch:
+    """The search criteria of a request; empty ones are ignored"""
+
+    def __init__(self, text="", symbol="", user="", status=None):
+        self.text = text.strip()
+        self.symbol = symbol.strip().upper()
+        self.user = user.strip()
+        self.status = status if status in STATUSES else None
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(
+            params.get("q", ""),
+            params.get("symbol", ""),
+            params.get("user", ""),
+            params.get("status"),
+        )
+
+    def __bool__(self):
+        return bool(self.text or self.symbol or self.user)
+
+    def cache_key(self):
+        return f"{self.text}\x00{self.symbol}\x00{self.user}"
+
+    def filter(self, queryset):
+        """Apply the criteria other than the notes text"""
+        if self.status:
+            queryset = queryset.filter(status=self.status)
+        if self.symbol:
+            matches = TradeStat.objects.filter(prefix_range("symbol", self.symbol)).aggregate(
+                trades=Sum("count")
+            )["trades"]
+            if (matches or 0) > SCAN_THRESHOLD:
+                queryset = queryset.filter(symbol__startswith=self.symbol)
+            else:
+                queryset = queryset.filter(prefix_range("symbol", self.symbol))
+        if self.user:
+            # The users table is small enough to match without an index
+            creators = DjangoUser.objects.filter(username__istartswith=self.user).values("id")
+            matches = UserActivity.objects.filter(user__in=creators, kind=TradeEvent.CREATED).aggregate(
+                trades=Sum("count")
+            )["trades"]
+            if (matches or 0) > SCAN_THRESHOLD:
+                queryset = queryset.filter(created_by__username__istartswith=self.user)
+            else:
+                queryset = queryset.filter(created_by__in=creators)
+        return queryset
+
+
+def search_trades(search, queryset=None, limit=SEARCH_LIMIT):
+    """
+    Up to `limit` trades of `queryset` matching `search`: best matches
+    first when searching the notes, newest first otherwise
+    """
+    if queryset is None:
+        queryset = Trade.objects.all()
+    queryset = search.filter(queryset)
+    expression = match_expression(search.text) if search.text else None
+
+    # Read replicas answer searches too
+    using = queryset.db
+    if expression and fts_available(using):
+        # Joined through TradeSearchEntry, so the FTS table drives the query
+        queryset = queryset.filter(search_entry__notes__match=expression)
+        if _count_matches(expression, RANK_LIMIT + 1, using) <= RANK_LIMIT:
+            queryset = queryset.annotate(search_rank=F("search_entry__rank")).order_by("search_rank", "-id")
+        else:
+            # The FTS table can be read backwards by rowid, stopping once
+            # enough trades passed the other criteria
+            queryset = queryset.order_by("-search_entry__trade_id")
+    else:
+        for word in WORD.findall(search.text):
+            queryset = queryset.filter(notes__icontains=word)
+        queryset = queryset.order_by("-created_at", "-id")
+    return list(queryset[:limit])
+
+
+def _count_matches(expression, limit, using):
+    """Number of trades matching `expression`, counting no further than `limit`"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+            [expression, limit],
+        )
+        return cursor.fetchone()[0]
+
+
+def _execute(sql, params=None, many=False):
+    with connection.cursor() as cursor:
+        if many:
+            cursor.executemany(sql, params)
+        else:
+            cursor.execute(sql, params)
+
+
+def remove_trades(trade_ids):
+    """Drop trades from the index"""
+    trade_ids = list(trade_ids)
+    if trade_ids and fts_available():
+        _execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(trade_id,) for trade_id in trade_ids], many=True)
+
+
+def index_trades(rows, replace=True):
+    """
+    Index (trade id, notes) pairs. With `replace`, entries the trades
+    already have are removed first; new trades can skip that.
+    """
+    if not fts_available():
+        return
+    rows = list(rows)
+    if replace:
+        remove_trades(trade_id for trade_id, _ in rows)
+    rows = [(trade_id, notes) for trade_id, notes in rows if notes]
+    if rows:
+        _execute(f"INSERT INTO {FTS_TABLE} (rowid, notes) VALUES (%s, %s)", rows, many=True)
+
+
+def rebuild_index():
+    """Refill the index from the trades table; returns the number of trades indexed"""
+    if not fts_available():
+        return 0
+    _execute(f"DELETE FROM {FTS_TABLE}")
+    _execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, notes) "
+        f"SELECT id, notes FROM {Trade._meta.db_table} WHERE notes != ''"
+    )
+    _execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
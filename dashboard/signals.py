@@ -0,0 +1,92 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import claims, events, search
+from .cache import invalidate_trades
+from .models.trade import Trade, trade_transitioned
+
+
+@receiver(pre_save, sender=Trade)
+def remember_previous_trade_state(sender, instance, raw, using, **kwargs):
+    """Capture the stored state of a trade before it is overwritten"""
+    instance._event_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    previous = instance.stored_values(events.SNAPSHOT_FIELDS)
+    if previous is None:
+        # Not loaded from the primary (cached, built by hand or deferred)
+        previous = (
+            Trade.objects.using(using).filter(pk=instance.pk)
+            .values_list(*events.SNAPSHOT_FIELDS)
+            .first()
+        )
+    instance._event_previous = previous
+
+
+@receiver(post_save, sender=Trade)
+def record_event_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        trade_events = events.events_for_change(
+            instance.pk, None, events.snapshot(instance), instance.created_by_id, instance.created_at
+        )
+    else:
+        trade_events = events.events_for_change(
+            instance.pk,
+            getattr(instance, "_event_previous", None),
+            events.snapshot(instance),
+            None,
+            timezone.now(),
+        )
+    events.record_events(trade_events)
+    transaction.on_commit(invalidate_trades)
+
+
+@receiver(post_delete, sender=Trade)
+def record_event_on_delete(sender, instance, **kwargs):
+    events.record_events(
+        events.events_for_change(instance.pk, events.snapshot(instance), None, None, timezone.now())
+    )
+    transaction.on_commit(invalidate_trades)
+
+
+@receiver(post_save, sender=Trade)
+def index_trade_on_save(sender, instance, created, raw, update_fields, **kwargs):
+    if raw or (update_fields is not None and "notes" not in update_fields):
+        return
+    search.index_trades([(instance.pk, instance.notes)], replace=not created)
+
+
+@receiver(post_delete, sender=Trade)
+def unindex_trade_on_delete(sender, instance, **kwargs):
+    search.remove_trades([instance.pk])
+
+
+@receiver(trade_transitioned, sender=Trade)
+def record_event_on_transition(sender, trade, action, user, source, target, **kwargs):
+    trade_snapshot = events.snapshot(trade)
+    events.record_events([
+        events.make_event(
+            trade.pk,
+            events.ACTION_KINDS[action],
+            user.pk if user is not None else None,
+            timezone.now(),
+            source,
+            target,
+            trade_snapshot,
+        )
+    ])
+    transaction.on_commit(invalidate_trades)
+
+
+@receiver(user_logged_in)
+def parse_claims_at_login(sender, request, user, **kwargs):
+    """Decode the id_token once, when the session is created"""
+    session = getattr(request, "session", None)
+    token = claims.get_id_token(session) if session is not None else None
+    if token:
+        claims.store_claims(session, token)
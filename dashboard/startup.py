@@ -0,0 +1,75 @@
+"""Cold start probe run by profile_startup: python -m dashboard.startup wsgi|asgi"""
+import asyncio
+import importlib
+import io
+import json
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+PATH = "/"
+
+
+def wsgi_request(application, path):
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO()}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b"".join(body)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return int(statuses[0].split()[0])
+
+
+def asgi_request(application, path):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    statuses = []
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    finished = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Django listens for a disconnect while it handles the request
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+        elif not message.get("more_body"):
+            finished.set()
+
+    asyncio.run(application(scope, receive, send))
+    return statuses[0]
+
+
+def main(handler):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    started = time.perf_counter()
+    application = importlib.import_module(f"core.{handler}").application
+    imported = time.perf_counter()
+    request = wsgi_request if handler == "wsgi" else asgi_request
+    status = request(application, PATH)
+    served = time.perf_counter()
+    json.dump({"import": imported - started, "first_request": served - imported, "status": status}, sys.stdout)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
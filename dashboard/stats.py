@@ -0,0 +1,144 @@
+"""Trade statistics read from the TradeStat projection"""
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from .models.trade import Trade
+from .models.tradestat import TradeStat
+
+CENT = Decimal("0.01")
+
+NOTIONAL = ExpressionWrapper(
+    F("quantity") * F("price"),
+    output_field=DecimalField(max_digits=24, decimal_places=2),
+)
+
+
+def _empty_stats():
+    return {
+        "total": 0,
+        "notional": Decimal("0"),
+        "by_status": {
+            status: {"count": 0, "notional": Decimal("0")}
+            for status, _ in Trade.STATUSES
+        },
+        "by_symbol": {},
+    }
+
+
+def _summarize(rows):
+    """Fold (symbol, status, count, notional) rows into the stats structure"""
+    stats = _empty_stats()
+    for symbol, status, count, notional in rows:
+        if not count:
+            continue
+        # SQLite sums decimal products as floats; round to cents like the
+        # summary table stores them
+        notional = Decimal(notional or 0).quantize(CENT)
+        stats["total"] += count
+        stats["notional"] += notional
+        by_status = stats["by_status"].setdefault(
+            status, {"count": 0, "notional": Decimal("0")}
+        )
+        by_status["count"] += count
+        by_status["notional"] += notional
+        by_symbol = stats["by_symbol"].setdefault(
+            symbol, {"count": 0, "notional": Decimal("0"), "by_status": {}}
+        )
+        by_symbol["count"] += count
+        by_symbol["notional"] += notional
+        by_symbol["by_status"][status] = count
+    return stats
+
+
+def compute_trade_stats(queryset=None):
+    """
+    Compute stats straight from the trade table in a single grouped
+    aggregate. Used to (re)build the summary table and for filtered
+    querysets the summary cannot answer.
+    """
+    if queryset is None:
+        queryset = Trade.objects.all()
+    rows = (
+        queryset.order_by()
+        .values_list("symbol", "status")
+        .annotate(count=Count("id"), notional=Sum(NOTIONAL))
+    )
+    return _summarize(rows)
+
+
+def get_trade_stats():
+    """Read the precomputed stats from the summary table"""
+    rows = TradeStat.objects.filter(count__gt=0).values_list(
+        "symbol", "status", "count", "notional"
+    )
+    return _summarize(rows)
+
+
+@transaction.atomic
+def rebuild_trade_stats():
+    """Recompute the summary table from scratch"""
+    TradeStat.objects.all().delete()
+    rows = (
+        Trade.objects.order_by()
+        .values_list("symbol", "status")
+        .annotate(count=Count("id"), notional=Sum(NOTIONAL))
+    )
+    TradeStat.objects.bulk_create(
+        TradeStat(symbol=symbol, status=status, count=count, notional=notional or 0)
+        for symbol, status, count, notional in rows
+    )
+
+
+def apply_trade_delta(symbol, status, count, notional):
+    """Add count/notional to the (symbol, status) summary row"""
+    if not count and not notional:
+        return
+    updated = TradeStat.objects.filter(symbol=symbol, status=status).update(
+        count=F("count") + count, notional=F("notional") + notional
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            TradeStat.objects.create(
+                symbol=symbol, status=status, count=count, notional=notional
+            )
+    except IntegrityError:
+        # Another writer created the row in the meantime
+        TradeStat.objects.filter(symbol=symbol, status=status).update(
+            count=F("count") + count, notional=F("notional") + notional
+        )
+
+
+def apply_trade_deltas(deltas):
+    """
+    Add (symbol, status, count, notional) deltas to the summary table with
+    one INSERT ... ON CONFLICT DO UPDATE per chunk of rows, rather than an
+    UPDATE per (symbol, status) as apply_trade_delta() issues.
+    """
+    deltas = [delta for delta in deltas if delta[2] or delta[3]]
+    if not deltas:
+        return
+    if not connection.features.supports_update_conflicts_with_target:
+        for delta in deltas:
+            apply_trade_delta(*delta)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(TradeStat._meta.db_table)
+    count, notional = quote("count"), quote("notional")
+    fields = [TradeStat._meta.get_field(name) for name in ("symbol", "status", "count", "notional")]
+    per_statement = max(connection.ops.bulk_batch_size(fields, deltas), 1)
+    with connection.cursor() as cursor:
+        for i in range(0, len(deltas), per_statement):
+            chunk = deltas[i:i + per_statement]
+            cursor.execute(
+                f"INSERT INTO {table} ({quote('symbol')}, {quote('status')}, {count}, {notional}) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))} "
+                f"ON CONFLICT ({quote('symbol')}, {quote('status')}) DO UPDATE SET "
+                f"{count} = {table}.{count} + EXCLUDED.{count}, "
+                f"{notional} = {table}.{notional} + EXCLUDED.{notional}",
+                [value for delta in chunk for value in delta],
+            )
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import F
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from dashboard.models import DjangoUser, Trade
+
+
+def make_user(username, roles):
+    return DjangoUser.objects.create(username=username, email=f"{username}@example.invalid", roles=roles)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.trader = make_user("trader", ["trader"])
+        cls.confirmer = make_user("confirmer", ["confirms"])
+        cls.admin = make_user("admin", ["admin"])
+        cls.trades = [
+            Trade.objects.create(
+                symbol=symbol, trade_type="BUY", quantity=10, price=Decimal("1.50"), notes="note", created_by=cls.trader
+            )
+            for symbol in ("AAA", "BBB", "CCC")
+        ]
+
+    def client_for(self, user):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(user)
+        return client
+
+    def transition(self, client, trade, action, **headers):
+        return client.post(reverse("dashboard:api_trade_transition", args=[trade.pk, action]), headers=headers)
+
+    def test_login_is_required(self):
+        response = Client(HTTP_HOST="localhost").get(reverse("dashboard:api_trades"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_pages_newest_first(self):
+        client = self.client_for(self.trader)
+        first = client.get(reverse("dashboard:api_trades"), {"limit": 2}).json()
+        self.assertEqual([row["symbol"] for row in first["results"]], ["CCC", "BBB"])
+        self.assertNotIn("notes", first["results"][0])
+        second = client.get(reverse("dashboard:api_trades"), {"limit": 2, "after": first["next"]}).json()
+        self.assertEqual([row["symbol"] for row in second["results"]], ["AAA"])
+        self.assertIsNone(second["next"])
+
+    def test_sparse_fieldsets(self):
+        client = self.client_for(self.trader)
+        response = client.get(reverse("dashboard:api_trade", args=[self.trades[0].pk]), {"fields": "price,symbol,price"})
+        self.assertEqual(response.json(), {"price": "1.50", "symbol": "AAA"})
+        listed = client.get(reverse("dashboard:api_trades"), {"fields": "notes"}).json()
+        self.assertEqual(listed["results"][0], {"notes": "note"})
+        # Other fieldsets are other representations
+        other = client.get(reverse("dashboard:api_trade", args=[self.trades[0].pk]), {"fields": "symbol"})
+        self.assertNotEqual(response["ETag"], other["ETag"])
+
+        response = client.get(reverse("dashboard:api_trades"), {"fields": "symbol,password"})
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "Unknown field: password"}))
+
+    def test_matching_etag_is_not_modified(self):
+        client = self.client_for(self.trader)
+        for url in (reverse("dashboard:api_trades"), reverse("dashboard:api_trade", args=[self.trades[0].pk])):
+            with self.subTest(url=url):
+                etag = client.get(url)["ETag"]
+                response = client.get(url, headers={"if-none-match": etag})
+                self.assertEqual((response.status_code, response.content), (304, b""))
+
+        # A change makes a new ETag
+        self.trades[0].confirm(self.confirmer)
+        response = client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_transition(self):
+        response = self.transition(self.client_for(self.confirmer), self.trades[0], "confirm")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["status"], response.json()["confirmed_by"]), ("CONFIRMED", "confirmer"))
+        self.assertEqual(response["ETag"], self.client_for(self.confirmer).get(
+            reverse("dashboard:api_trade", args=[self.trades[0].pk])
+        )["ETag"])
+
+    def test_stale_if_match_is_a_failed_precondition(self):
+        client = self.client_for(self.confirmer)
+        etag = client.get(reverse("dashboard:api_trade", args=[self.trades[0].pk]))["ETag"]
+        Trade.objects.filter(pk=self.trades[0].pk).update(version=F("version") + 1)
+
+        response = self.transition(client, self.trades[0], "confirm", if_match=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Trade.objects.get(pk=self.trades[0].pk).status, "PENDING")
+
+        etag = client.get(reverse("dashboard:api_trade", args=[self.trades[0].pk]))["ETag"]
+        self.assertEqual(self.transition(client, self.trades[0], "confirm", if_match=etag).status_code, 200)
+
+    def test_wrong_status_is_a_conflict(self):
+        response = self.transition(self.client_for(self.admin), self.trades[0], "approve")
+        self.assertEqual(response.status_code, 409)
+
+    def test_raced_transition_is_a_conflict(self):
+        transition = Trade.transition
+
+        def lose_the_race(trade, action, user=None):
+            # Another request changes the trade between the read and the write
+            Trade.objects.filter(pk=trade.pk).update(version=F("version") + 1)
+            return transition(trade, action, user)
+
+        with mock.patch.object(Trade, "transition", lose_the_race):
+            response = self.transition(self.client_for(self.confirmer), self.trades[0], "confirm")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {"error": "The trade was changed by someone else"})
+
+    def test_forbidden_and_unknown(self):
+        self.assertEqual(self.transition(self.client_for(self.trader), self.trades[0], "confirm").status_code, 403)
+        self.assertEqual(self.transition(self.client_for(self.admin), self.trades[0], "delete").status_code, 404)
+        response = self.client_for(self.trader).get(reverse("dashboard:api_trade", args=[999999]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,127 @@
+import threading
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+
+from core.urls import handler403, urlpatterns as core_urlpatterns
+from dashboard import urls as dashboard_urls, views
+from dashboard.concurrency import run_concurrently
+from dashboard.models import DjangoUser, Trade
+from dashboard.permissions import PermissionEngine
+from dashboard.querybudget import count_queries
+
+# The dashboard URLs with DASHBOARD_ASYNC_VIEWS on
+ASYNC_VIEWS = {
+    "trades": views.trades_list_async,
+    "trades_stats": views.trades_stats_async,
+    "trade_detail": views.trade_detail_async,
+}
+urlpatterns = [
+    pattern for pattern in core_urlpatterns if getattr(pattern, "namespace", None) != "dashboard"
+] + [
+    path("", include((
+        [
+            path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+            for pattern in dashboard_urls.urlpatterns
+        ],
+        "dashboard",
+    ))),
+]
+
+
+def make_user(username, roles):
+    return DjangoUser.objects.create(username=username, email=f"{username}@example.invalid", roles=roles)
+
+
+def make_trade(user):
+    return Trade.objects.create(
+        symbol="ASYNC", trade_type="BUY", quantity=3, price=Decimal("7.00"), created_by=user
+    )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_user("reader", ["reader"])
+        cls.nobody = make_user("nobody", [])
+        cls.trade = make_trade(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient(headers={"host": "localhost"})
+
+    async def get(self, user, name, *args):
+        await self.client.aforce_login(user)
+        return await self.client.get(reverse(f"dashboard:{name}", args=args))
+
+    async def test_views_resolve_to_the_async_variants(self):
+        response = await self.get(self.reader, "trades")
+        self.assertIs(response.resolver_match.func, views.trades_list_async)
+
+    async def test_allowed(self):
+        for name, args in (("trades", ()), ("trades_stats", ()), ("trade_detail", (self.trade.pk,))):
+            with self.subTest(view=name):
+                response = await self.get(self.reader, name, *args)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "ASYNC" if name != "trades_stats" else "Total Trades")
+
+    async def test_forbidden(self):
+        for name, args in (("trades", ()), ("trades_stats", ()), ("trade_detail", (self.trade.pk,))):
+            with self.subTest(view=name):
+                response = await self.get(self.nobody, name, *args)
+                self.assertEqual(response.status_code, 403)
+
+    async def test_missing_trade_is_not_found(self):
+        response = await self.get(self.reader, "trade_detail", 999999)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_uncompiled_permissions_fall_back_to_the_auth_backends(self):
+        # trade.add_trade has no compiled rule; the backends query the
+        # database, which must happen off the event loop
+        expected = await sync_to_async(PermissionEngine(self.reader).has_perm)("trade.add_trade")
+        engine = PermissionEngine(self.reader)
+        self.assertIs(await engine.ahas_perm("trade.add_trade"), expected)
+        self.assertTrue(await engine.ahas_perm("trade.view_tradelist"))
+        self.assertFalse(await engine.ahas_perm("trade.approve_trade", self.trade))
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ConcurrentQueryTests(TransactionTestCase):
+    """Outside a transaction run_concurrently() uses connections of its own"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("reader", ["reader"])
+        make_trade(self.user)
+
+    async def test_worker_thread_queries_are_counted(self):
+        threads = set()
+        # Both callables have to be running at once to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def query(model):
+            threads.add(threading.get_ident())
+            barrier.wait()
+            return model.objects.count()
+
+        with count_queries() as counter:
+            results = await run_concurrently(lambda: query(Trade), lambda: query(DjangoUser))
+        self.assertEqual(results, [1, 1])
+        self.assertEqual(len(threads), 2)
+        self.assertEqual(len(counter), 2)
+
+    async def test_trades_list_stays_within_budget(self):
+        client = AsyncClient(headers={"host": "localhost"})
+        await client.aforce_login(self.user)
+        with count_queries() as counter:
+            response = await client.get(reverse("dashboard:trades"))
+        self.assertEqual(response.status_code, 200)
+        # The page and the stats were read on worker threads and still counted
+        tables = " ".join(counter.queries)
+        self.assertIn('FROM "dashboard_trade"', tables)
+        self.assertIn('FROM "dashboard_tradestat"', tables)
+        self.assertLessEqual(len(counter), views.trades_list_async.query_budget)
@@ -0,0 +1,66 @@
+import copy
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from dashboard.management.commands.benchmark import VIEWS, Command
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, "baseline.json")
+
+    def benchmark(self, **options):
+        call_command(
+            "benchmark", trades=200, iterations=3, warmup=1, no_http=True,
+            baseline=self.baseline, stdout=StringIO(), **options,
+        )
+
+    def test_baseline_round_trip(self):
+        self.benchmark(save_baseline=True)
+        with open(self.baseline) as file:
+            results = json.load(file)
+
+        self.assertEqual(set(results["views"]), {name for name, *_ in VIEWS})
+        for name, view in results["views"].items():
+            with self.subTest(view=name):
+                self.assertGreater(view["throughput"], 0)
+                self.assertGreater(view["queries"], 0)
+        permissions = results["permissions"]
+        self.assertGreater(permissions["engine"]["checks_per_s"], permissions["rules"]["checks_per_s"])
+
+        # Timings vary between runs, query counts must not
+        self.benchmark(tolerance=100)
+
+    def test_more_queries_fail_the_comparison(self):
+        baseline = {
+            "environment": {"created_at": "2026-01-01T00:00:00"},
+            "views": {"trades_list": {"throughput": 100.0, "p50": 0.01, "queries": 6}},
+        }
+        results = copy.deepcopy(baseline)
+        results["views"]["trades_list"]["queries"] = 7
+
+        command = Command(stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "views/trades_list queries"):
+            command.compare(baseline, results, tolerance=0.25)
+
+    def test_slower_views_fail_beyond_the_tolerance(self):
+        baseline = {
+            "environment": {"created_at": "2026-01-01T00:00:00"},
+            "views": {"trades_list": {"throughput": 100.0, "p50": 0.010, "queries": 6}},
+        }
+        slightly_slower = copy.deepcopy(baseline)
+        slightly_slower["views"]["trades_list"].update(throughput=90.0, p50=0.011)
+        much_slower = copy.deepcopy(baseline)
+        much_slower["views"]["trades_list"].update(throughput=50.0, p50=0.020)
+
+        command = Command(stdout=StringIO())
+        command.compare(baseline, slightly_slower, tolerance=0.25)
+        with self.assertRaisesMessage(CommandError, "2 regressions"):
+            command.compare(baseline, much_slower, tolerance=0.25)
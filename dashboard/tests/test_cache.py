@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from dashboard.cache import get_cached_trade, invalidate_trades, role_cache_key, trades_generation
+from dashboard.models import DjangoUser, Trade
+from dashboard.workflow import bulk_transition
+
+
+class CacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="admin", email="admin@example.invalid", roles=["admin"])
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Trade.objects.create(
+                symbol="CACHE", trade_type="BUY", quantity=1, price=Decimal("1.00"), created_by=self.user
+            )
+
+    def assertBumps(self, write):
+        before = trades_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertGreater(trades_generation(), before)
+
+    def test_writes_bump_the_generation(self):
+        trade = self.create()
+        self.assertBumps(lambda: trade.confirm(self.user))
+        self.assertBumps(lambda: bulk_transition(self.user, "approve", [trade.pk]))
+        self.assertBumps(lambda: Trade.objects.get(pk=trade.pk).save())
+        self.assertBumps(trade.delete)
+
+    def test_evicted_generation_restarts_higher(self):
+        before = trades_generation()
+        cache.clear()
+        invalidate_trades()
+        self.assertGreater(trades_generation(), before)
+
+    def test_cached_trade_is_replaced_after_a_change(self):
+        trade = self.create()
+        self.assertEqual(get_cached_trade(trade.pk).status, "PENDING")
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.confirm(self.user)
+        self.assertEqual(get_cached_trade(trade.pk).status, "CONFIRMED")
+
+    def test_role_cache_key(self):
+        self.user.roles = ["trader", "admin"]
+        self.assertEqual(role_cache_key(self.user), "admin,trader")
+        self.user.roles = []
+        self.assertEqual(role_cache_key(self.user), "none")
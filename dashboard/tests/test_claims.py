@@ -0,0 +1,87 @@
+import base64
+import json
+from unittest import mock
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from dashboard import claims
+from dashboard.claims import ClaimsMiddleware, OIDCClaims, decode_jwt, get_claims, load_claims, normalize_roles
+from dashboard.models import DjangoUser
+
+
+def make_token(payload):
+    encode = lambda data: base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'none'})}.{encode(payload)}.signature"
+
+
+TOKEN = make_token({"sub": "42", "picture": "https://example.invalid/me.png", "django/roles": "trader, reader"})
+
+
+class ParsingTests(SimpleTestCase):
+    def test_decode_jwt(self):
+        self.assertEqual(decode_jwt(TOKEN)["sub"], "42")
+        for token in ("", "abc", "a.b", "a.!!!.c"):
+            with self.subTest(token=token):
+                self.assertEqual(decode_jwt(token), {})
+
+    def test_normalize_roles(self):
+        self.assertEqual(normalize_roles({"django/roles": "trader, reader"}), ["trader", "reader"])
+        self.assertEqual(normalize_roles({"django_roles": "admin"}), ["admin"])
+        self.assertEqual(normalize_roles({"django/roles": ["a", "b"]}), ["a", "b"])
+        self.assertEqual(normalize_roles({"django/roles": 3}), [])
+
+    def test_tokens_are_decoded_once(self):
+        token = make_token({"sub": "once"})
+        with mock.patch.object(claims, "decode_jwt", wraps=decode_jwt) as decode:
+            first, second = claims.parse_token(token), claims.parse_token(token)
+        self.assertIs(first, second)
+        self.assertEqual(decode.call_count, 1)
+
+
+class SessionClaimsTests(TestCase):
+    def request(self, **session):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        request.session.update(session)
+        return request
+
+    def test_claims_are_kept_in_the_session(self):
+        request = self.request(oidc_id_token=TOKEN)
+        parsed = load_claims(request)
+        self.assertEqual((parsed.roles, parsed.picture), (["trader", "reader"], "https://example.invalid/me.png"))
+        self.assertEqual(request.session[claims.SESSION_KEY]["roles"], ["trader", "reader"])
+
+        # Later requests read them back without decoding the token
+        with mock.patch.object(claims, "decode_jwt") as decode:
+            self.assertEqual(load_claims(request).roles, ["trader", "reader"])
+        decode.assert_not_called()
+
+    def test_new_token_replaces_stored_claims(self):
+        request = self.request(oidc_id_token=TOKEN)
+        load_claims(request)
+        request.session["oidc_id_token"] = make_token({"django/roles": ["admin"]})
+        self.assertEqual(load_claims(request).roles, ["admin"])
+
+    def test_no_token_no_claims(self):
+        self.assertFalse(load_claims(self.request()))
+        self.assertFalse(load_claims(RequestFactory().get("/")))
+
+    def test_login_stores_the_claims(self):
+        user = DjangoUser.objects.create(username="oidc", email="oidc@example.invalid")
+        session = SessionStore()
+        session["oidc_id_token"] = TOKEN
+        session.save()
+        self.client.cookies["sessionid"] = session.session_key
+        self.client.force_login(user)
+        self.assertEqual(self.client.session[claims.SESSION_KEY]["token_hash"], claims.token_hash(TOKEN))
+
+    def test_middleware_loads_claims_on_first_use(self):
+        request = self.request(oidc_id_token=TOKEN)
+        with mock.patch.object(claims, "load_claims", wraps=load_claims) as load:
+            ClaimsMiddleware(lambda request: None)(request)
+            load.assert_not_called()
+            self.assertEqual(get_claims(request).roles, ["trader", "reader"])
+            self.assertEqual(get_claims(request).picture, "https://example.invalid/me.png")
+        self.assertEqual(load.call_count, 1)
+        self.assertIsInstance(get_claims(self.request()), OIDCClaims)
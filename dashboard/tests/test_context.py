@@ -0,0 +1,21 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from dashboard import context
+from dashboard.claims import OIDCClaims
+
+
+class UserClaimsTests(SimpleTestCase):
+    def test_claims_load_when_a_value_is_read(self):
+        # No request.user: the processor must not touch it
+        request = RequestFactory().get("/")
+        parsed = OIDCClaims({"picture": "me.png", "django/roles": ["trader"]})
+        with mock.patch.object(context, "get_claims", return_value=parsed) as get_claims:
+            values = context.user_claims(request)
+            get_claims.assert_not_called()
+
+            self.assertIn("trader", values["user_roles"])
+            self.assertEqual(str(values["oidc_user_picture"]), "me.png")
+            self.assertEqual(values["oidc_id_claims"]["picture"], "me.png")
+        get_claims.assert_called_with(request)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.exports import ExportError, parse_bound
+from dashboard.models import DjangoUser, Trade
+
+
+class ParseBoundTests(TestCase):
+    def test_date_end_bound_is_the_next_midnight(self):
+        self.assertEqual(parse_bound("2025-01-31", end=True), timezone.make_aware(datetime(2025, 2, 1)))
+        self.assertEqual(parse_bound("2025-01-31"), timezone.make_aware(datetime(2025, 1, 31)))
+
+    def test_datetime_is_kept(self):
+        self.assertEqual(parse_bound("2025-01-31T10:30", end=True), timezone.make_aware(datetime(2025, 1, 31, 10, 30)))
+
+    def test_impossible_dates_are_export_errors(self):
+        for value in ("2025-02-30", "2025-02-30T10:00", "yesterday"):
+            with self.subTest(value=value), self.assertRaisesMessage(ExportError, value):
+                parse_bound(value)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="exporter", email="exporter@example.invalid", roles=["admin"])
+        for day in (30, 31):
+            trade = Trade.objects.create(
+                symbol=f"D{day}", trade_type="BUY", quantity=1, price=Decimal("1.00"), created_by=cls.user
+            )
+            created_at = timezone.make_aware(datetime(2025, 1, day, 23, 59))
+            Trade.objects.filter(pk=trade.pk).update(created_at=created_at)
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST="localhost")
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse("dashboard:trades_export"), {"format": "jsonl", **params})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_date_to_includes_its_last_day(self):
+        self.assertIn('"symbol":"D31"', self.export(to="2025-01-31"))
+        body = self.export(**{"from": "2025-01-31", "to": "2025-01-31"})
+        self.assertEqual(body.count("\n"), 1)
+        self.assertNotIn('"symbol":"D31"', self.export(to="2025-01-30"))
+
+    def test_impossible_date_is_a_bad_request(self):
+        response = self.client.get(reverse("dashboard:trades_export"), {"to": "2025-02-30"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_reports_impossible_dates(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date: 2025-02-30"):
+            call_command("export_trades", "--to", "2025-02-30", stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trades.jsonl")
+            call_command("export_trades", "--format", "jsonl", "--to", "2025-01-31", "--output", path)
+            with open(path) as file:
+                self.assertEqual(len(file.readlines()), 2)
@@ -0,0 +1,114 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from dashboard import feed
+from dashboard.models import DjangoUser, Trade
+from dashboard.permissions import PermissionEngine
+from dashboard.pubsub import Broker, LocalBroker, get_broker
+
+
+def make_user(username, roles):
+    return DjangoUser.objects.create(username=username, email=f"{username}@example.invalid", roles=roles)
+
+
+def parse_event(chunk):
+    """(event name, data) of one text/event-stream message"""
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+class BrokerTests(TestCase):
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Broker()
+
+    def test_messages_reach_open_subscriptions(self):
+        broker = LocalBroker(queue_size=2)
+        first, second = broker.subscribe(), broker.subscribe()
+        broker.publish({"n": 1})
+        second.close()
+        broker.publish({"n": 2})
+
+        self.assertEqual([first.get(0), first.get(0), first.get(0)], [{"n": 1}, {"n": 2}, None])
+        self.assertEqual([second.get(0), second.get(0)], [{"n": 1}, None])
+
+    def test_slow_readers_lose_the_oldest_messages(self):
+        broker = LocalBroker(queue_size=2)
+        subscription = broker.subscribe()
+        for n in range(3):
+            broker.publish({"n": n})
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual([subscription.get(0), subscription.get(0)], [{"n": 1}, {"n": 2}])
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.trader = make_user("trader", ["trader"])
+        cls.approver = make_user("approver", ["approver"])
+        cls.nobody = make_user("nobody", [])
+
+    def setUp(self):
+        self.subscription = get_broker().subscribe()
+        self.addCleanup(self.subscription.close)
+
+    def create_trade(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Trade.objects.create(
+                symbol="FEED", trade_type="SELL", quantity=4, price=Decimal("2.50"), created_by=self.trader
+            )
+
+    def test_committed_changes_are_published(self):
+        trade = self.create_trade()
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.confirm(self.approver)
+
+        created, confirmed = self.subscription.get(0), self.subscription.get(0)
+        self.assertEqual(
+            (created["kind"], created["id"], created["status"], created["trade_type"], created["quantity"]),
+            ("created", trade.pk, "PENDING", "SELL", 4),
+        )
+        self.assertEqual((confirmed["kind"], confirmed["previous_status"]), ("confirmed", "PENDING"))
+        self.assertEqual(confirmed["created_by"], "trader")
+
+    def test_large_commits_ask_for_a_refresh(self):
+        events = [object()] * (feed.FEED_MAX_TRADE_EVENTS + 1)
+        feed.publish_events(events)
+        self.assertEqual(self.subscription.get(0), feed.REFRESH)
+
+    def test_viewers_only_get_what_they_may_see(self):
+        self.create_trade()
+        self.subscription.get(0)
+        trade = Trade.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.confirm(self.approver)
+        message = self.subscription.get(0)
+
+        self.assertIsNone(feed.for_viewer(PermissionEngine(self.nobody), message))
+        seen = feed.for_viewer(PermissionEngine(self.approver), message)
+        self.assertEqual((seen["can_confirm"], seen["can_approve"]), (False, True))
+
+    @mock.patch.object(feed, "MAX_STREAM_AGE", 0.2)
+    @mock.patch.object(feed, "KEEPALIVE_INTERVAL", 0.05)
+    def test_feed_view_streams_events(self):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.approver)
+        response = client.get(reverse("dashboard:trades_feed"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = iter(response.streaming_content)
+
+        self.assertEqual(next(chunks), f"retry: {feed.RECONNECT_DELAY}\n\n".encode())
+        trade = self.create_trade()
+        name, data = parse_event(next(chunks).decode())
+        self.assertEqual((name, data["id"], data["can_approve"]), ("trade", trade.pk, False))
+        # Keep-alives until the stream reaches its age and ends
+        self.assertEqual(set(chunks), {b": keepalive\n\n"})
+
+    def test_feed_view_is_forbidden_without_a_role(self):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.nobody)
+        self.assertEqual(client.get(reverse("dashboard:trades_feed")).status_code, 403)
@@ -0,0 +1,90 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.test import TestCase
+
+from dashboard.exports import export_queryset, iter_export
+from dashboard.imports import import_trades
+from dashboard.models import DjangoUser, Trade, TradeEvent, TradeStat
+from dashboard.search import TradeSearch, search_trades
+from dashboard.stats import apply_trade_deltas, compute_trade_stats, get_trade_stats
+
+CSV = """symbol,trade_type,quantity,price,notes
+aapl,BUY,100,189.50,quarterly rebalance
+MSFT,SELL,25,410.10,
+GOOG,HOLD,5,140.00,not a trade type
+TSLA,BUY,-3,240.00,negative quantity
+NVDA,SELL,7,880.25,trim after earnings
+"""
+
+
+def trade_values(trades):
+    return sorted(trades.values_list("symbol", "trade_type", "quantity", "price", "notes"))
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="importer", email="importer@example.invalid", roles=["trader"])
+
+    def test_import_creates_pending_trades(self):
+        result = import_trades(StringIO(CSV), "csv", self.user, batch_size=2)
+
+        self.assertEqual((result.rows, result.created, result.error_count), (5, 3, 2))
+        self.assertEqual(
+            sorted((error.line, error.field) for error in result.errors), [(4, "trade_type"), (5, "quantity")]
+        )
+        self.assertEqual(
+            trade_values(Trade.objects.all()),
+            [
+                ("AAPL", "BUY", 100, Decimal("189.50"), "quarterly rebalance"),
+                ("MSFT", "SELL", 25, Decimal("410.10"), ""),
+                ("NVDA", "SELL", 7, Decimal("880.25"), "trim after earnings"),
+            ],
+        )
+        self.assertEqual(set(Trade.objects.values_list("status", "version")), {("PENDING", 0)})
+        self.assertEqual(compute_trade_stats(), get_trade_stats())
+
+    def test_events_and_search_index_follow_the_trades(self):
+        import_trades(StringIO(CSV), "csv", self.user, batch_size=2)
+
+        for trade in Trade.objects.all():
+            event = TradeEvent.objects.get(trade_id=trade.pk)
+            # Sells are logged with negative quantities
+            signed = trade.quantity if trade.trade_type == "BUY" else -trade.quantity
+            self.assertEqual((event.kind, event.symbol, event.quantity), (TradeEvent.CREATED, trade.symbol, signed))
+        found = search_trades(TradeSearch(text="earnings"))
+        self.assertEqual([trade.symbol for trade in found], ["NVDA"])
+
+    def test_dry_run_writes_nothing(self):
+        result = import_trades(StringIO(CSV), "csv", self.user, dry_run=True)
+
+        self.assertEqual(result.created, 3)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_export_import_round_trip(self):
+        import_trades(StringIO(CSV), "csv", self.user)
+        original = trade_values(Trade.objects.all())
+
+        for fmt in ("csv", "jsonl"):
+            with self.subTest(fmt=fmt):
+                exported = "".join(iter_export(export_queryset(created_by=self.user.username), fmt))
+                copier = DjangoUser.objects.create(
+                    username=f"copier-{fmt}", email=f"copier-{fmt}@example.invalid", roles=["trader"]
+                )
+                result = import_trades(StringIO(exported), fmt, copier)
+
+                self.assertEqual((result.created, result.error_count), (3, 0))
+                self.assertEqual(trade_values(Trade.objects.filter(created_by=copier)), original)
+        self.assertEqual(compute_trade_stats(), get_trade_stats())
+
+
+class TradeDeltaTests(TestCase):
+    def test_deltas_add_to_existing_rows_and_create_missing_ones(self):
+        apply_trade_deltas([("AAPL", "PENDING", 2, Decimal("10.50")), ("MSFT", "PENDING", 0, Decimal("0"))])
+        apply_trade_deltas([("AAPL", "PENDING", 1, Decimal("4.25")), ("AAPL", "APPROVED", 1, Decimal("3.00"))])
+
+        self.assertEqual(
+            sorted(TradeStat.objects.values_list("symbol", "status", "count", "notional")),
+            [("AAPL", "APPROVED", 1, Decimal("3.00")), ("AAPL", "PENDING", 3, Decimal("14.75"))],
+        )
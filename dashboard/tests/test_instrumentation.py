@@ -0,0 +1,118 @@
+import logging
+from io import StringIO
+from unittest import mock
+
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from dashboard import instrumentation
+from dashboard.instrumentation import QueueListenerHandler, RequestTimings, SamplingFilter, timed
+from dashboard.models import DjangoUser
+
+
+def make_record(message, level=logging.INFO, args=None):
+    return logging.LogRecord("dashboard", level, __file__, 0, message, args, None)
+
+
+class QueueListenerHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.handler = QueueListenerHandler(self.stream, maxsize=2)
+        self.addCleanup(self.handler.stop)
+        self.handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+    def test_records_are_written_by_the_listener(self):
+        self.handler.handle(make_record("hello %s", args=("world",)))
+        self.handler.stop()
+        self.assertEqual(self.stream.getvalue(), "INFO hello world\n")
+
+    def test_full_queue_drops_and_reports(self):
+        self.handler.stop()
+        for i in range(5):
+            self.handler.handle(make_record(f"record {i}"))
+        self.assertEqual(self.handler.dropped, 3)
+
+        # Room again: the next record is followed by the drop warning
+        self.handler.queue.get_nowait()
+        self.handler.queue.get_nowait()
+        self.handler.handle(make_record("after"))
+        self.assertEqual(self.handler.queue.get_nowait().getMessage(), "after")
+        warning = self.handler.queue.get_nowait()
+        self.assertEqual(warning.levelno, logging.WARNING)
+        self.assertEqual(warning.getMessage(), "Dropped 3 log records, the log writer fell behind")
+
+        # Later drops wait for the next report interval
+        self.handler.handle(make_record("fills"))
+        self.handler.handle(make_record("fills"))
+        self.handler.handle(make_record("dropped"))
+        self.handler.queue.get_nowait()
+        self.handler.handle(make_record("kept"))
+        self.assertEqual(self.handler.dropped, 4)
+        self.assertEqual(self.handler.queue.qsize(), 2)
+        self.handler.queue.queue.clear()
+
+
+class SamplingFilterTests(SimpleTestCase):
+    def test_warnings_always_pass(self):
+        self.assertTrue(SamplingFilter(0).filter(make_record("x", logging.WARNING)))
+
+    def test_lower_levels_are_sampled(self):
+        sampler = SamplingFilter(0.25)
+        with mock.patch("dashboard.instrumentation.random.random", side_effect=[0.1, 0.3]):
+            self.assertTrue(sampler.filter(make_record("x", logging.DEBUG)))
+            self.assertFalse(sampler.filter(make_record("x", logging.DEBUG)))
+
+
+class TimedTests(SimpleTestCase):
+    def test_nested_blocks_count_only_toward_the_innermost(self):
+        timings = RequestTimings()
+        token = instrumentation._request_timings.set(timings)
+        clock = iter([0.0, 1.0, 3.0, 10.0])
+        try:
+            with mock.patch.object(instrumentation.time, "perf_counter", lambda: next(clock)):
+                with timed("template"):
+                    with timed("db"):
+                        pass
+        finally:
+            instrumentation._request_timings.reset(token)
+        self.assertEqual(timings.durations, {"db": 2.0, "template": 8.0})
+        self.assertEqual(
+            timings.header(10.0),
+            'db;dur=2000.00;desc="SQL (1 queries)", template;dur=8000.00;desc="Templates", total;dur=10000.00',
+        )
+
+    def test_outside_a_request_nothing_is_recorded(self):
+        with timed("db"):
+            pass
+
+
+@override_settings(DASHBOARD_SERVER_TIMING=True, DASHBOARD_METRICS_TOKEN="scraper-token")
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="reader", email="reader@example.invalid", roles=["reader"])
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST="localhost")
+
+    def test_header_breaks_the_request_down(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard:trades"))
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="SQL \(\d+ queries\)"')
+        self.assertIn('template;dur=', header)
+        self.assertRegex(header, r"total;dur=[\d.]+$")
+
+    def test_metrics_need_the_token_or_admin_access(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("dashboard:trades"))
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("dashboard:metrics")).status_code, 401)
+
+        response = self.client.get(reverse("dashboard:metrics"), headers={"authorization": "Bearer scraper-token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('dashboard_request_duration_seconds_count{view="dashboard:trades"}', response.content.decode())
+        self.assertIn('dashboard_responses_total{view="dashboard:trades",status="2xx"}', response.content.decode())
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("dashboard:metrics")).status_code, 403)
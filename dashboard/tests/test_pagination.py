@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        moment = timezone.make_aware(datetime(2025, 1, 2, 3, 4, 5, 678))
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_garbage_is_invalid(self):
+        for token in ("", "not-a-cursor", encode_cursor(timezone.now(), 1)[:-3]):
+            with self.subTest(token=token), self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="trader", email="trader@example.invalid", roles=["trader"])
+        start = timezone.make_aware(datetime(2025, 1, 1))
+        # Pairs of trades share a timestamp, so pages split ties by id
+        for n in range(7):
+            Trade.objects.create(
+                symbol=f"S{n}", trade_type="BUY", quantity=1, price=Decimal("1.00"),
+                created_by=cls.user, created_at=start + timedelta(minutes=n // 2),
+            )
+        cls.newest_first = list(Trade.objects.order_by("-created_at", "-id").values_list("symbol", flat=True))
+
+    def symbols(self, page):
+        return [trade.symbol for trade in page]
+
+    def test_walk_forward_and_back(self):
+        paginator = KeysetPaginator(Trade.objects.all(), 3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(after=pages[-1].next_cursor))
+        self.assertEqual([symbol for page in pages for symbol in self.symbols(page)], self.newest_first)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.get_page(before=pages[2].previous_cursor)
+        self.assertEqual(self.symbols(back), self.symbols(pages[1]))
+        self.assertTrue(back.has_next)
+        first = paginator.get_page(before=back.previous_cursor)
+        self.assertEqual(self.symbols(first), self.symbols(pages[0]))
+        self.assertFalse(first.has_previous)
+
+    def test_invalid_cursor_is_the_first_page(self):
+        paginator = KeysetPaginator(Trade.objects.all(), 3)
+        self.assertEqual(self.symbols(paginator.get_page(after="bogus")), self.newest_first[:3])
+
+    def test_count_is_capped(self):
+        page = KeysetPaginator(Trade.objects.all(), 3, count_limit=5).get_page()
+        self.assertEqual((page.approximate_count, page.count_is_capped), (5, True))
+        page = KeysetPaginator(Trade.objects.all(), 3).get_page()
+        self.assertEqual((page.approximate_count, page.count_is_capped), (7, False))
+
+    def test_trades_page_follows_the_cursors(self):
+        for n in range(14):
+            Trade.objects.create(symbol=f"T{n}", trade_type="SELL", quantity=1, price=Decimal("1.00"), created_by=self.user)
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.user)
+
+        first = client.get(reverse("dashboard:trades"))
+        self.assertEqual(len(first.context["page_obj"]), 20)
+        second = client.get(reverse("dashboard:trades"), {"after": first.context["page_obj"].next_cursor})
+        self.assertEqual(self.symbols(second.context["page_obj"]), self.newest_first[-1:])
+        self.assertFalse(second.context["page_obj"].has_next)
+        self.assertContains(second, f"?before={second.context['page_obj'].previous_cursor}")
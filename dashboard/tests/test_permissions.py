@@ -0,0 +1,63 @@
+from decimal import Decimal
+from itertools import combinations
+
+import rules
+from django.test import SimpleTestCase, TestCase
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.permissions import PermissionEngine
+from dashboard.policies import ALL_ROLES, TRADE_PERMISSIONS
+
+ROLE_SETS = [set(roles) for size in (0, 1, 2, len(ALL_ROLES)) for roles in combinations(sorted(ALL_ROLES), size)]
+
+
+class CompiledRulesTests(SimpleTestCase):
+    def test_compiled_rules_agree_with_the_predicates(self):
+        for roles in ROLE_SETS:
+            user = DjangoUser(pk=1, username="user", roles=sorted(roles))
+            engine = PermissionEngine(user)
+            for perm in TRADE_PERMISSIONS:
+                trades = [None] + [
+                    Trade(status=status, created_by_id=creator)
+                    for status, _ in Trade.STATUSES for creator in (1, 2)
+                ]
+                for trade in trades:
+                    with self.subTest(roles=roles, perm=perm, trade=trade and (trade.status, trade.created_by_id)):
+                        self.assertIs(engine.has_perm(perm, trade), bool(rules.has_perm(perm, user, trade)))
+
+    def test_answers_are_memoized_per_trade_state(self):
+        engine = PermissionEngine(DjangoUser(pk=1, username="user", roles=["trader"]))
+        first, second = Trade(status="PENDING", created_by_id=1), Trade(status="PENDING", created_by_id=1)
+        self.assertTrue(engine.has_perm("trade.delete_trade", first))
+        # Answered from the memo, without evaluating the rules again
+        engine._compiled = {}
+        self.assertTrue(engine.has_perm("trade.delete_trade", second))
+
+    def test_superusers_may_do_anything(self):
+        engine = PermissionEngine(DjangoUser(pk=1, username="root", roles=[], is_superuser=True))
+        self.assertTrue(engine.has_perm("trade.approve_trade", Trade(status="PENDING", created_by_id=2)))
+
+
+class FilterPermittedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.traders = [
+            DjangoUser.objects.create(username=f"trader{n}", email=f"trader{n}@example.invalid", roles=["trader"])
+            for n in range(2)
+        ]
+        for status, _ in Trade.STATUSES:
+            for trader in cls.traders:
+                Trade.objects.create(
+                    symbol="PERM", trade_type="BUY", quantity=1, price=Decimal("1.00"), status=status, created_by=trader
+                )
+
+    def test_sql_filter_matches_the_row_checks(self):
+        for roles in ROLE_SETS:
+            user = DjangoUser.objects.get(pk=self.traders[0].pk)
+            user.roles = sorted(roles)
+            engine = PermissionEngine(user)
+            for perm in TRADE_PERMISSIONS:
+                with self.subTest(roles=roles, perm=perm):
+                    expected = {trade.pk for trade in Trade.objects.all() if engine.has_perm(perm, trade)}
+                    permitted = set(engine.filter_permitted(perm, Trade.objects.all()).values_list("pk", flat=True))
+                    self.assertEqual(permitted, expected)
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.positions import Position, compute_positions, positions
+from dashboard.workflow import bulk_transition
+
+TRADES = [
+    # creator, symbol, side, quantity, price, approved
+    ("alice", "AAA", "BUY", 10, "10.00", True),
+    ("alice", "AAA", "BUY", 10, "12.00", True),
+    ("bob", "AAA", "SELL", 15, "13.10", True),
+    ("bob", "BBB", "SELL", 5, "0.33", True),
+    ("bob", "AAA", "BUY", 100, "1.00", False),
+]
+
+
+class PositionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = {
+            name: DjangoUser.objects.create(username=name, email=f"{name}@example.invalid", roles=["trader"])
+            for name in ("alice", "bob")
+        }
+        cls.admin = DjangoUser.objects.create(username="admin", email="admin@example.invalid", roles=["admin"])
+        approved = []
+        for creator, symbol, side, quantity, price, is_approved in TRADES:
+            trade = Trade.objects.create(
+                symbol=symbol, trade_type=side, quantity=quantity, price=Decimal(price), created_by=users[creator]
+            )
+            if is_approved:
+                approved.append(trade.pk)
+        bulk_transition(cls.admin, "confirm", approved)
+        bulk_transition(cls.admin, "approve", approved)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_symbol_figures(self):
+        aaa, bbb = positions("symbol")
+        self.assertEqual((aaa.key, aaa.trades, aaa.net_quantity), ("AAA", 3, 5))
+        self.assertEqual((aaa.buy_notional, aaa.sell_notional, aaa.net_notional), (
+            Decimal("220.00"), Decimal("196.50"), Decimal("23.50")
+        ))
+        self.assertEqual((aaa.buy_vwap, aaa.sell_vwap), (Decimal("11.0000"), Decimal("13.1000")))
+        # 15 matched at 13.10 - 11.00
+        self.assertEqual(aaa.realized_pnl, Decimal("31.50"))
+        self.assertEqual((bbb.net_quantity, bbb.buy_vwap, bbb.realized_pnl), (-5, None, Decimal("0")))
+
+    def test_both_paths_agree(self):
+        for by in ("symbol", "trader"):
+            with self.subTest(by=by):
+                self.assertEqual(compute_positions(by, batch_size=2), positions(by))
+                self.assertEqual(
+                    positions(by, Trade.objects.filter(symbol="AAA")),
+                    compute_positions(by, Trade.objects.filter(symbol="AAA")),
+                )
+        self.assertEqual([position.key for position in positions("trader")], ["alice", "bob"])
+
+    def test_position_equality(self):
+        self.assertEqual(Position("X", 1, 2), Position("X", 1, 2))
+        self.assertNotEqual(Position("X", 1, 2), Position("X", 1, 3))
+
+    def test_view(self):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.admin)
+        response = client.get(reverse("dashboard:positions"), {"by": "trader", "format": "json"})
+        self.assertEqual([row["key"] for row in response.json()["positions"]], ["alice", "bob"])
+        self.assertContains(client.get(reverse("dashboard:positions")), "AAA")
+        self.assertEqual(client.get(reverse("dashboard:positions"), {"by": "desk"}).status_code, 400)
+
+    def test_compute_positions_command(self):
+        output = StringIO()
+        call_command("compute_positions", stdout=output)
+        self.assertIn("2 positions by symbol match the live aggregation", output.getvalue())
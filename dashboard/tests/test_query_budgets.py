@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import resolve, reverse
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.querybudget import assert_max_queries
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="viewer", email="viewer@example.invalid", roles=["admin"])
+        cls.traders = [
+            DjangoUser.objects.create(username=f"trader{i}", email=f"trader{i}@example.invalid", roles=["trader"])
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client(HTTP_HOST="localhost")
+        self.client.force_login(self.user)
+
+    def create_trades(self, count):
+        return [
+            Trade.objects.create(
+                symbol="QB", trade_type="BUY", quantity=i + 1, price=Decimal("1.00"),
+                created_by=self.traders[i % len(self.traders)],
+            )
+            for i in range(count)
+        ]
+
+    def get_within_budget(self, url):
+        """Request `url` and fail if it issues more queries than its view's budget"""
+        budget = resolve(url.split("?")[0]).func.query_budget
+        with assert_max_queries(budget) as counter:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(counter)
+
+    def test_trades_list(self):
+        self.create_trades(30)
+        self.get_within_budget(reverse("dashboard:trades"))
+        self.get_within_budget(reverse("dashboard:trades") + "?status=PENDING")
+
+    def test_trades_list_queries_do_not_grow_with_the_page(self):
+        self.create_trades(1)
+        one = self.get_within_budget(reverse("dashboard:trades"))
+        self.create_trades(20)
+        cache.clear()
+        many = self.get_within_budget(reverse("dashboard:trades"))
+        self.assertEqual(one, many)
+
+    def test_cached_trades_list_skips_the_page(self):
+        self.create_trades(5)
+        url = reverse("dashboard:trades")
+        first = self.get_within_budget(url)
+        self.assertLess(self.get_within_budget(url), first)
+
+    def test_trade_detail(self):
+        trade = self.create_trades(1)[0]
+        trade.confirm(self.user)
+        self.get_within_budget(reverse("dashboard:trade_detail", args=[trade.pk]))
+
+    def test_assert_max_queries_reports_the_queries(self):
+        with self.assertRaisesMessage(AssertionError, "2 queries executed, budget is 1"):
+            with assert_max_queries(1):
+                Trade.objects.count()
+                DjangoUser.objects.count()
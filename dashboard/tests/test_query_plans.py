@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from dashboard.management.commands.check_query_plans import POST_VIEWS, PROBE_ROLES, VIEWS, Command
+from dashboard.models import Trade
+from dashboard.policies import ALL_ROLES
+from dashboard.urls import urlpatterns
+
+# Views whose queries the plan check leaves out
+NOT_PROBED = {
+    "metrics",  # counters only, no trade queries
+    "admin",  # no trade queries
+    "trade_create",  # inserts only
+    "trades_import",  # inserts only
+    "trades_feed",  # streams until the client goes away
+    "api_trade_transition",  # the update trade_confirm/trade_approve issue
+}
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return Command()._explain(sql, params, Trade._meta.db_table)
+
+
+class QueryPlanTests(TestCase):
+    def test_views_use_indexes(self):
+        call_command("check_query_plans", stdout=StringIO())
+
+    def test_status_list_reads_index_order(self):
+        _, full_scan, sorts = explain(Trade.objects.filter(status="PENDING").order_by("-created_at", "-id")[:20])
+        self.assertEqual((full_scan, sorts), (False, False))
+
+    def test_sort_without_index_is_reported(self):
+        queryset = Trade.objects.filter(status__in=["PENDING", "CONFIRMED"]).order_by("-created_at", "-id")[:20]
+        plan, full_scan, sorts = explain(queryset)
+        self.assertFalse(full_scan, plan)
+        self.assertTrue(sorts, plan)
+
+    def test_full_scan_is_reported(self):
+        plan, full_scan, _ = explain(Trade.objects.filter(notes="x").order_by())
+        self.assertTrue(full_scan, plan)
+
+    def test_every_view_is_probed(self):
+        probed = {name for name, *_ in VIEWS + POST_VIEWS}
+        names = {f"dashboard:{pattern.name}" for pattern in urlpatterns}
+        self.assertEqual(names - probed, {f"dashboard:{name}" for name in NOT_PROBED})
+
+    def test_every_role_is_probed(self):
+        self.assertEqual(set(PROBE_ROLES), {None, *ALL_ROLES})
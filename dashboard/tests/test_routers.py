@@ -0,0 +1,104 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from dashboard import routers
+from dashboard.models import DjangoUser, Trade, TradeStat
+from dashboard.routers import (
+    EXPLORE_EVERY, PIN_COOKIE, ReplicaPinningMiddleware, ReplicaRouter, ReplicaSelector, replica_reads,
+)
+
+REPLICAS = ["replica1", "replica2"]
+
+
+class SelectorTests(SimpleTestCase):
+    def test_round_robin(self):
+        selector = ReplicaSelector()
+        self.assertEqual([selector.select(REPLICAS, "round_robin") for _ in range(3)], REPLICAS + REPLICAS[:1])
+
+    def test_latency_prefers_the_fastest_and_keeps_exploring(self):
+        selector = ReplicaSelector()
+        selector.select(REPLICAS, "latency")  # an exploring turn
+        # Replicas without a measurement are tried first
+        self.assertEqual(selector.select(REPLICAS, "latency"), "replica1")
+        selector.observe("replica1", 0.010)
+        selector.observe("replica2", 0.002)
+        # The exploring turns take the replicas in turn
+        picks = [selector.select(REPLICAS, "latency") for _ in range(2 * EXPLORE_EVERY)]
+        self.assertEqual(picks.count("replica1"), 1)
+
+    def test_latency_is_a_moving_average(self):
+        selector = ReplicaSelector()
+        selector.observe("replica1", 1.0)
+        selector.observe("replica1", 2.0)
+        self.assertAlmostEqual(selector.latencies["replica1"], 1.0 + routers.LATENCY_WEIGHT)
+
+
+@override_settings(DASHBOARD_DB_REPLICAS=REPLICAS, DASHBOARD_REPLICA_SELECTION="round_robin")
+class RoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def serve(self, request, view):
+        """Run `view` behind the pinning middleware; returns the response and the routes it saw"""
+        routes = []
+
+        def get_response(request):
+            routes.append({model: self.router.db_for_read(model) for model in (Trade, TradeStat, DjangoUser)})
+            return view(request)
+
+        return ReplicaPinningMiddleware(get_response)(request), routes[0]
+
+    def test_read_views_use_a_replica_for_the_trade_models(self):
+        _, routes = self.serve(self.factory.get("/"), lambda request: HttpResponse())
+        self.assertEqual(set(routes.values()), {None})
+
+        reads = {}
+
+        @replica_reads
+        def view(request):
+            reads.update({model: self.router.db_for_read(model) for model in (Trade, TradeStat, DjangoUser)})
+            return HttpResponse()
+
+        response, _ = self.serve(self.factory.get("/"), view)
+        self.assertIn(reads[Trade], REPLICAS)
+        self.assertEqual(reads[TradeStat], reads[Trade])
+        # Users and sessions stay on the primary
+        self.assertIsNone(reads[DjangoUser])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        @replica_reads
+        def view(request):
+            self.router.db_for_write(Trade)
+            return HttpResponse()
+
+        response, _ = self.serve(self.factory.post("/"), view)
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], routers.pin_seconds())
+
+        reads = []
+
+        @replica_reads
+        def read(request):
+            reads.append(self.router.db_for_read(Trade))
+            return HttpResponse()
+
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.serve(request, read)
+        self.assertEqual(reads, [None])
+
+    def test_unsafe_methods_stay_on_the_primary(self):
+        reads = []
+
+        @replica_reads
+        def view(request):
+            reads.append(self.router.db_for_read(Trade))
+            return HttpResponse()
+
+        self.serve(self.factory.post("/"), view)
+        self.assertEqual(reads, [None])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica1", "dashboard"))
+        self.assertIsNone(self.router.allow_migrate("default", "dashboard"))
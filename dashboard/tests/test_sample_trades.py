@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from dashboard.models import DjangoUser, Trade
+
+FIELDS = (
+    "symbol", "trade_type", "quantity", "price", "status", "notes", "created_by__username",
+    "created_at", "confirmed_by__username", "confirmed_at", "approved_by__username", "approved_at",
+)
+
+
+class SampleTradesTests(TestCase):
+    def create(self, *args):
+        call_command("create_sample_trades", "--bulk", "--count", "60", "--batch-size", "25", *args, stdout=StringIO())
+
+    def test_seed_reproduces_the_dataset(self):
+        self.create("--seed", "7", "--users", "5")
+        self.create("--seed", "7", "--users", "5", "--workers", "2")
+
+        rows = list(Trade.objects.order_by("id").values_list(*FIELDS))
+        self.assertEqual(len(rows), 120)
+        self.assertEqual(rows[:60], rows[60:])
+        self.assertGreaterEqual(min(row[7] for row in rows).date().isoformat(), "2025-01-01")
+
+    def test_start_moves_the_spread(self):
+        self.create("--seed", "7", "--users", "5", "--days", "10", "--start", "2024-03-01")
+        days = {created_at.date().isoformat() for created_at in Trade.objects.values_list("created_at", flat=True)}
+        self.assertTrue(all("2024-03-01" <= day <= "2024-03-11" for day in days), days)
+
+    def test_only_the_requested_users_get_trades(self):
+        self.create("--seed", "1", "--users", "8")
+        self.create("--seed", "1", "--users", "3")
+
+        self.assertEqual(DjangoUser.objects.filter(username__startswith="sample_user_").count(), 8)
+        creators = set(Trade.objects.order_by("id")[60:].values_list("created_by__username", flat=True))
+        self.assertTrue(creators <= {"sample_user_000", "sample_user_001", "sample_user_002"}, creators)
@@ -0,0 +1,89 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from dashboard import search
+from dashboard.models import DjangoUser, Trade
+from dashboard.search import TradeSearch, match_expression, rebuild_index, search_trades
+
+
+def make_user(username):
+    return DjangoUser.objects.create(username=username, email=f"{username}@example.invalid", roles=["trader"])
+
+
+class HelperTests(TestCase):
+    def test_prefix_range(self):
+        query = str(Trade.objects.filter(search.prefix_range("symbol", "AB")).query)
+        self.assertIn('"dashboard_trade"."symbol" >= AB AND "dashboard_trade"."symbol" < AC', query)
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression("rebalance quarter-end"), '"rebalance" "quarter" "end"*')
+        self.assertIsNone(match_expression(" -- "))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user("alice")
+        cls.bob = make_user("Bobby")
+        rows = [
+            ("ABC", cls.alice, "Rebalancing the index book"),
+            ("ABD", cls.bob, "client order, rebalance later"),
+            ("XYZ", cls.alice, "hedge"),
+            ("AB", cls.bob, ""),
+        ]
+        cls.trades = [
+            Trade.objects.create(
+                symbol=symbol, trade_type="BUY", quantity=1, price=Decimal("1.00"), notes=notes, created_by=user
+            )
+            for symbol, user, notes in rows
+        ]
+
+    def find(self, **criteria):
+        return [trade.symbol for trade in search_trades(TradeSearch(**criteria))]
+
+    def test_prefixes_newest_first(self):
+        self.assertEqual(self.find(symbol="ab"), ["AB", "ABD", "ABC"])
+        self.assertEqual(self.find(user="BOB"), ["AB", "ABD"])
+        self.assertEqual(self.find(symbol="ab", user="alice", status="PENDING"), ["ABC"])
+        self.assertEqual(self.find(symbol="ab", status="CONFIRMED"), [])
+
+    def test_plan_follows_the_match_estimate(self):
+        for threshold, symbol_sql, user_sql in ((100, ">=", "IN (SELECT"), (0, "LIKE", "LIKE")):
+            with self.subTest(threshold=threshold), mock.patch.object(search, "SCAN_THRESHOLD", threshold):
+                query = str(TradeSearch(symbol="AB", user="bob").filter(Trade.objects.all()).query)
+                self.assertIn(f'"dashboard_trade"."symbol" {symbol_sql}', query)
+                self.assertIn(user_sql, query)
+                self.assertEqual(self.find(symbol="ab"), ["AB", "ABD", "ABC"])
+                self.assertEqual(self.find(user="BOB"), ["AB", "ABD"])
+
+    def test_notes_match_stems_and_prefixes(self):
+        self.assertTrue(search.fts_available())
+        self.assertEqual(set(self.find(text="rebalance")), {"ABC", "ABD"})
+        self.assertEqual(self.find(text="index rebal"), ["ABC"])
+        self.assertEqual(self.find(text="hedge", symbol="X"), ["XYZ"])
+
+    def test_unranked_matches_are_newest_first(self):
+        with mock.patch.object(search, "RANK_LIMIT", 1):
+            self.assertEqual(self.find(text="rebalance"), ["ABD", "ABC"])
+
+    def test_without_the_fts_table_words_are_matched_anywhere(self):
+        with mock.patch.object(search, "fts_available", return_value=False):
+            self.assertEqual(self.find(text="ebalanc"), ["ABD", "ABC"])
+            self.assertEqual(self.find(text="book rebalancing"), ["ABC"])
+
+    def test_index_follows_saves_and_deletes(self):
+        trade = self.trades[2]
+        trade.notes = "unwind"
+        trade.save()
+        self.assertEqual(self.find(text="hedge"), [])
+        self.assertEqual(self.find(text="unwind"), ["XYZ"])
+        trade.delete()
+        self.assertEqual(self.find(text="unwind"), [])
+
+    def test_rebuild_index(self):
+        Trade.objects.filter(pk=self.trades[2].pk).update(notes="unwind")
+        self.assertEqual(self.find(text="unwind"), [])
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(self.find(text="unwind"), ["XYZ"])
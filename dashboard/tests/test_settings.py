@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+SHOW_DATABASE = (
+    "import json, django; django.setup(); from django.conf import settings; from django.db import connection; "
+    "database = settings.DATABASES['default']; "
+    "pragmas = {} if connection.vendor != 'sqlite' else {name: connection.cursor().execute(f'PRAGMA {name}').fetchone()[0] "
+    "for name in ('journal_mode', 'synchronous', 'temp_store')}; "
+    "print(json.dumps({'debug': settings.DEBUG, 'conn_max_age': database['CONN_MAX_AGE'], "
+    "'health_checks': database['CONN_HEALTH_CHECKS'], 'options': database['OPTIONS'], 'pragmas': pragmas}))"
+)
+
+PRODUCTION = {"DJANGO_PROFILE": "production", "DJANGO_SECRET_KEY": "test", "DJANGO_CACHE_BACKEND": "file"}
+
+
+def run_settings(**environ):
+    return subprocess.run(
+        [sys.executable, "-c", SHOW_DATABASE],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings", **environ},
+        capture_output=True,
+        text=True,
+    )
+
+
+def load_database(**environ):
+    """DEBUG and the default database of a fresh process with `environ`"""
+    process = run_settings(**environ)
+    process.check_returncode()
+    return json.loads(process.stdout)
+
+
+class ProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "db.sqlite3")
+
+    def test_development_is_unchanged(self):
+        loaded = load_database(DJANGO_DB_NAME=self.database, DJANGO_DEBUG="1")
+        self.assertEqual((loaded["debug"], loaded["conn_max_age"], loaded["health_checks"]), (True, 0, False))
+        self.assertEqual(loaded["options"], {})
+        self.assertEqual(loaded["pragmas"]["journal_mode"], "delete")
+
+    def test_production_sqlite(self):
+        loaded = load_database(DJANGO_DB_NAME=self.database, **PRODUCTION)
+        self.assertEqual((loaded["debug"], loaded["conn_max_age"], loaded["health_checks"]), (False, 600, True))
+        self.assertEqual((loaded["options"]["timeout"], loaded["options"]["transaction_mode"]), (20, "IMMEDIATE"))
+        # 1 is NORMAL, 2 is MEMORY
+        self.assertEqual(loaded["pragmas"], {"journal_mode": "wal", "synchronous": 1, "temp_store": 2})
+
+    def test_production_needs_a_secret_key(self):
+        process = run_settings(**{**PRODUCTION, "DJANGO_SECRET_KEY": ""})
+        self.assertNotEqual(process.returncode, 0)
+        self.assertIn("DJANGO_SECRET_KEY must be set in production", process.stderr)
+
+    def test_production_refuses_the_local_cache(self):
+        for backend in ("", "locmem"):
+            with self.subTest(backend=backend):
+                process = run_settings(**{**PRODUCTION, "DJANGO_CACHE_BACKEND": backend})
+                self.assertNotEqual(process.returncode, 0)
+                self.assertIn("DJANGO_CACHE_BACKEND must be file or redis in production", process.stderr)
+
+    def test_unknown_profile_or_backend(self):
+        for environ, message in (
+            ({"DJANGO_PROFILE": "staging"}, "Unknown DJANGO_PROFILE 'staging'"),
+            ({"DJANGO_DB_BACKEND": "mysql"}, "Unknown DJANGO_DB_BACKEND 'mysql'"),
+        ):
+            with self.subTest(environ=environ):
+                self.assertIn(message, run_settings(**environ).stderr)
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+from importlib.util import find_spec
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+# Seconds core.wsgi / core.asgi may take to import and serve a first
+# request; about 0.3s on a laptop, with room for slow CI machines
+COLD_START_BUDGET = 2.0
+
+DEV_TOOLS = ("django_extensions", "django_browser_reload")
+
+SHOW_SETTINGS = (
+    "import json, django; django.setup(); from django.conf import settings; "
+    "print(json.dumps({'apps': settings.INSTALLED_APPS, 'middleware': settings.MIDDLEWARE}))"
+)
+
+
+def load_settings(**environ):
+    """INSTALLED_APPS and MIDDLEWARE of a fresh process with `environ`"""
+    process = subprocess.run(
+        [sys.executable, "-c", SHOW_SETTINGS],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings", **environ},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout)
+
+
+class StartupTests(SimpleTestCase):
+    def test_cold_start_within_budget(self):
+        output = StringIO()
+        call_command("profile_startup", runs=1, top=0, budget=COLD_START_BUDGET, stdout=output)
+        self.assertIn("within the", output.getvalue())
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, "Cold start over the"):
+            call_command("profile_startup", handler=["wsgi"], runs=1, top=0, budget=0.001, stdout=StringIO())
+
+    def test_production_leaves_dev_tools_out(self):
+        loaded = load_settings(DJANGO_PROFILE="production", DJANGO_SECRET_KEY="test", DJANGO_CACHE_BACKEND="file")
+        for tool in DEV_TOOLS:
+            self.assertNotIn(tool, loaded["apps"])
+        self.assertFalse([name for name in loaded["middleware"] if "browser_reload" in name])
+
+    def test_debug_loads_the_installed_dev_tools(self):
+        loaded = load_settings(DJANGO_DEBUG="1")
+        for tool in DEV_TOOLS:
+            self.assertEqual(tool in loaded["apps"], find_spec(tool) is not None, tool)
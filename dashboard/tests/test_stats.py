@@ -0,0 +1,62 @@
+import pickle
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.stats import compute_trade_stats, get_trade_stats, rebuild_trade_stats
+
+
+class TradeStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="trader", email="trader@example.invalid", roles=["trader"])
+
+    def create(self, symbol, quantity=10, price="2.50"):
+        return Trade.objects.create(
+            symbol=symbol, trade_type="BUY", quantity=quantity, price=Decimal(price), created_by=self.user
+        )
+
+    def assertSummaryMatchesTrades(self):
+        self.assertEqual(get_trade_stats(), compute_trade_stats())
+
+    def test_summary_follows_saves_and_deletes(self):
+        first, second = self.create("AAA"), self.create("BBB", 3, "1.10")
+        stats = get_trade_stats()
+        self.assertEqual((stats["total"], stats["notional"]), (2, Decimal("28.30")))
+
+        first = Trade.objects.get(pk=first.pk)
+        first.quantity, first.status = 20, "CONFIRMED"
+        first.save()
+        first.symbol = "CCC"
+        first.save(update_fields=["symbol"])
+        second.delete()
+        self.assertSummaryMatchesTrades()
+        self.assertEqual(get_trade_stats()["by_symbol"]["CCC"]["by_status"], {"CONFIRMED": 1})
+
+    def test_loaded_trades_are_saved_without_reading_the_row(self):
+        trade = Trade.objects.get(pk=self.create("AAA").pk)
+        trade.quantity = 5
+        with CaptureQueriesContext(connection) as queries:
+            trade.save()
+        self.assertFalse([q["sql"] for q in queries if q["sql"].startswith('SELECT "dashboard_trade"')])
+
+        # A transition moves what the instance knows along
+        self.assertTrue(trade.confirm(self.user))
+        trade.price = Decimal("4.00")
+        trade.save()
+        self.assertSummaryMatchesTrades()
+
+    def test_copies_that_may_be_stale_read_the_row(self):
+        trade = self.create("AAA")
+        cached = pickle.loads(pickle.dumps(Trade.objects.get(pk=trade.pk)))
+        Trade.objects.filter(pk=trade.pk).update(quantity=7)
+        rebuild_trade_stats()
+
+        cached.quantity = 9
+        with CaptureQueriesContext(connection) as queries:
+            cached.save()
+        self.assertTrue([q["sql"] for q in queries if q["sql"].startswith('SELECT "dashboard_trade"')])
+        self.assertSummaryMatchesTrades()
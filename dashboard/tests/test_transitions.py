@@ -0,0 +1,123 @@
+import threading
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.stats import compute_trade_stats, get_trade_stats
+
+
+def make_trade(user, status="PENDING"):
+    trade = Trade.objects.create(
+        symbol="RACE", trade_type="BUY", quantity=10, price=Decimal("2.50"), created_by=user
+    )
+    if status != "PENDING":
+        trade.status = status
+        trade.save()
+    return trade
+
+
+class TransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="checker", email="checker@example.invalid", roles=["admin"])
+
+    def test_transition_bumps_version(self):
+        trade = make_trade(self.user)
+        version = trade.version
+        self.assertTrue(trade.confirm(self.user))
+        trade.refresh_from_db()
+        self.assertEqual((trade.status, trade.version), ("CONFIRMED", version + 1))
+
+    def test_stale_instance_loses(self):
+        trade = make_trade(self.user, "CONFIRMED")
+        stale = Trade.objects.get(pk=trade.pk)
+        self.assertTrue(trade.approve(self.user))
+        self.assertFalse(stale.reject(self.user))
+        self.assertEqual(Trade.objects.get(pk=trade.pk).status, "APPROVED")
+        self.assertEqual(compute_trade_stats(), get_trade_stats())
+
+    def test_transition_from_wrong_status_loses(self):
+        trade = make_trade(self.user)
+        self.assertFalse(trade.approve(self.user))
+        self.assertEqual(Trade.objects.get(pk=trade.pk).status, "PENDING")
+
+
+class ConcurrentTransitionTests(TransactionTestCase):
+    """Competitors run on their own connections, so nothing is rolled back"""
+
+    def setUp(self):
+        self.user = DjangoUser.objects.create(username="racer", email="racer@example.invalid", roles=["admin"])
+
+    def race(self, trade, actions):
+        barrier = threading.Barrier(len(actions))
+        results = [None] * len(actions)
+
+        def compete(index, action):
+            try:
+                competitor = Trade.objects.get(pk=trade.pk)
+                barrier.wait()
+                results[index] = getattr(competitor, action)(self.user)
+            except Exception as exc:
+                results[index] = exc
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=compete, args=item) for item in enumerate(actions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_exactly_one_of_two_confirms_wins(self):
+        trade = make_trade(self.user)
+        version = trade.version
+        results = self.race(trade, ["confirm", "confirm"])
+        self.assertCountEqual(results, [True, False])
+        trade.refresh_from_db()
+        self.assertEqual((trade.status, trade.version), ("CONFIRMED", version + 1))
+
+    def test_approve_and_reject_race(self):
+        trade = make_trade(self.user, "CONFIRMED")
+        results = self.race(trade, ["approve", "reject"] * 4)
+        self.assertEqual(results.count(True), 1, results)
+        self.assertEqual(results.count(False), 7, results)
+        self.assertEqual(compute_trade_stats(), get_trade_stats())
+
+    def test_stress_transitions_command(self):
+        call_command("stress_transitions", workers=8, rounds=6, stdout=StringIO(), stderr=StringIO())
+
+
+class TransitionViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = DjangoUser.objects.create(username="viewer", email="viewer@example.invalid", roles=["admin"])
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST="localhost")
+        self.client.force_login(self.user)
+
+    def confirm_behind_the_cache(self, trade):
+        """Cache the pending trade, then confirm it without the cache knowing"""
+        self.client.get(reverse("dashboard:trade_detail", args=[trade.pk]))
+        Trade.objects.filter(pk=trade.pk).update(status="CONFIRMED", version=F("version") + 1)
+
+    def test_decides_on_the_stored_trade_not_a_cached_copy(self):
+        trade = make_trade(self.user)
+        self.confirm_behind_the_cache(trade)
+        self.client.post(reverse("dashboard:trade_confirm", args=[trade.pk]), {"action": "unconfirm"})
+        self.assertEqual(Trade.objects.get(pk=trade.pk).status, "PENDING")
+
+        self.confirm_behind_the_cache(trade)
+        self.client.post(reverse("dashboard:trade_approve", args=[trade.pk]), {"action": "approve"})
+        self.assertEqual(Trade.objects.get(pk=trade.pk).status, "APPROVED")
+
+    def test_missing_trade_is_not_found(self):
+        response = self.client.post(reverse("dashboard:trade_confirm", args=[999999]), {"action": "confirm"})
+        self.assertEqual(response.status_code, 404)
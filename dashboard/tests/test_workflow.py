@@ -0,0 +1,86 @@
+import json
+from decimal import Decimal
+
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from dashboard.models import DjangoUser, Trade
+from dashboard.stats import compute_trade_stats, get_trade_stats
+from dashboard.workflow import (
+    CONFLICT, FORBIDDEN, INVALID_STATUS, MAX_BULK_TRADES, NOT_FOUND, UPDATED, WorkflowError, bulk_transition,
+    parse_trade_ids,
+)
+
+
+class ParseTradeIdsTests(SimpleTestCase):
+    def test_ids_are_deduplicated_in_order(self):
+        self.assertEqual(parse_trade_ids(["3", 1, "3", 2]), [3, 1, 2])
+
+    def test_invalid_input(self):
+        for values, message in (
+            ([], "No trades selected"),
+            (["x"], "Invalid trade id: x"),
+            (range(MAX_BULK_TRADES + 1), f"At most {MAX_BULK_TRADES} trades"),
+        ):
+            with self.subTest(message=message), self.assertRaisesMessage(WorkflowError, message):
+                parse_trade_ids(values)
+
+
+class BulkTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.trader = DjangoUser.objects.create(username="trader", email="trader@example.invalid", roles=["trader"])
+        cls.confirmer = DjangoUser.objects.create(
+            username="confirmer", email="confirmer@example.invalid", roles=["confirms"]
+        )
+        cls.trades = [
+            Trade.objects.create(
+                symbol="BULK", trade_type="BUY", quantity=2, price=Decimal("3.00"), status=status, created_by=cls.trader
+            )
+            for status in ("PENDING", "PENDING", "CONFIRMED", "APPROVED")
+        ]
+
+    def test_outcome_per_trade(self):
+        ids = [trade.pk for trade in self.trades] + [999999]
+        result = bulk_transition(self.confirmer, "confirm", ids)
+        self.assertEqual(
+            list(result.outcomes.values()), [UPDATED, UPDATED, INVALID_STATUS, FORBIDDEN, NOT_FOUND]
+        )
+        self.assertEqual(result.updated, ids[:2])
+        self.assertEqual(
+            list(Trade.objects.filter(pk__in=ids[:2]).values_list("status", "confirmed_by")),
+            [("CONFIRMED", self.confirmer.pk)] * 2,
+        )
+        self.assertEqual(get_trade_stats(), compute_trade_stats())
+
+    def test_trades_moved_meanwhile_are_conflicts(self):
+        first, second = self.trades[:2]
+
+        class MovesTheSecondTrade:
+            """Permissions that let another user confirm `second` while the bulk action runs"""
+
+            def has_perm(self, perm, row):
+                Trade.objects.filter(pk=second.pk).update(status="CONFIRMED")
+                return True
+
+        result = bulk_transition(self.confirmer, "confirm", [first.pk, second.pk], MovesTheSecondTrade())
+        self.assertEqual(result.outcomes, {first.pk: UPDATED, second.pk: CONFLICT})
+
+    def test_unknown_action(self):
+        with self.assertRaisesMessage(WorkflowError, "Unknown action: delete"):
+            bulk_transition(self.confirmer, "delete", [self.trades[0].pk])
+
+    def test_view_reports_outcomes_as_json(self):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.confirmer)
+        response = client.post(
+            reverse("dashboard:trades_bulk"),
+            json.dumps({"action": "confirm", "trade_ids": [self.trades[0].pk, self.trades[2].pk]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["counts"], {UPDATED: 1, INVALID_STATUS: 1})
+
+        response = client.post(reverse("dashboard:trades_bulk"), "[1]", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = client.post(reverse("dashboard:trades_bulk"), {"action": "confirm"})
+        self.assertContains(response, "No trades selected", status_code=400)
@@ -1,17 +1,39 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'dashboard'
 
+if settings.DASHBOARD_ASYNC_VIEWS:
+    trades_list = views.trades_list_async
+    trades_stats = views.trades_stats_async
+    trade_detail = views.trade_detail_async
+else:
+    trades_list = views.trades_list
+    trades_stats = views.trades_stats
+    trade_detail = views.trade_detail
+
 urlpatterns = [
     path('', views.home, name='home'),
     path('profile/', views.profile, name='profile'),
     path('administration/', views.admin_panel, name='admin'),
+    path('metrics/', views.metrics, name='metrics'),
     
     # Trading URLs
-    path('trades/', views.trades_list, name='trades'),
+    path('trades/', trades_list, name='trades'),
+    path('trades/stats/', trades_stats, name='trades_stats'),
+    path('trades/feed/', views.trades_feed, name='trades_feed'),
     path('trades/create/', views.trade_create, name='trade_create'),
-    path('trades/<int:trade_id>/', views.trade_detail, name='trade_detail'),
+    path('trades/export/', views.trades_export, name='trades_export'),
+    path('trades/import/', views.trades_import, name='trades_import'),
+    path('trades/bulk/', views.trades_bulk, name='trades_bulk'),
+    path('trades/positions/', views.positions, name='positions'),
+    path('trades/<int:trade_id>/', trade_detail, name='trade_detail'),
     path('trades/<int:trade_id>/confirm/', views.trade_confirm, name='trade_confirm'),
     path('trades/<int:trade_id>/approve/', views.trade_approve, name='trade_approve'),
+
+    # JSON API
+    path('api/trades/', api.trades, name='api_trades'),
+    path('api/trades/<int:trade_id>/', api.trade, name='api_trade'),
+    path('api/trades/<int:trade_id>/<str:action>/', api.trade_transition, name='api_trade_transition'),
 ]
@@ -1,41 +1,64 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.core.paginator import Paginator
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
-import base64
-import json
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 from .models.trade import Trade
+from .cache import (
+    aget_cached_trade,
+    atrades_generation,
+    cached_trade_getter,
+    fragment_timeout,
+    get_cached_positions,
+    get_cached_trade,
+    role_cache_key,
+    trades_generation,
+)
+from .claims import decode_jwt, get_claims, get_id_token
+from . import feed
+from .exports import FORMATS, ExportError, export_queryset, iter_export, parse_bound
 from .forms import TradeForm
+from .imports import ImportFileError, guess_format, import_trades
+from .instrumentation import VIEW_METRICS
+from .pagination import KeysetPage, KeysetPaginator
+from .concurrency import run_concurrently
+from .permissions import aget_permissions, get_permissions
+from .positions import GROUPINGS
+from .querybudget import query_budget
+from .routers import replica_reads
+from .search import SEARCH_LIMIT, TradeSearch, search_trades
+from .stats import get_trade_stats
+from .workflow import TRANSITIONS, WorkflowError, bulk_transition, parse_trade_ids
 from .policies import *  # Import policies for django-rules
-from rules.contrib.views import permission_required, objectgetter
+from rules.contrib.views import permission_required
 
 @login_required
 def home(request):
     return render(request, "dashboard/home.html")
 
 
-def _decode_jwt(token: str):
-    if not token or "." not in token:
-        return {}
-    try:
-        parts = token.split(".")
-        if len(parts) != 3:
-            return {}
-        payload = parts[1] + "=" * (-len(parts[1]) % 4)
-        data = base64.urlsafe_b64decode(payload.encode("utf-8"))
-        return json.loads(data.decode("utf-8"))
-    except Exception:
-        return {}
-
-
 @login_required
 def profile(request):
-    id_token = request.session.get("oidc_id_token") or request.session.get(
-        "OIDC_ID_TOKEN"
-    )
+    id_token = get_id_token(request.session)
     access_token = request.session.get("oidc_access_token") or request.session.get(
         "OIDC_ACCESS_TOKEN"
     )
@@ -43,9 +66,10 @@ def profile(request):
         "OIDC_REFRESH_TOKEN"
     )
 
-    id_claims = _decode_jwt(id_token) if id_token else {}
+    claims = get_claims(request)
+    id_claims = claims.claims
     access_claims = (
-        _decode_jwt(access_token)
+        decode_jwt(access_token)
         if access_token and access_token.count(".") == 2
         else {}
     )
@@ -99,15 +123,8 @@ def profile(request):
         else:
             custom_claims_items.append(item)
 
-    # Extract roles (Okta custom claim name with slash)
-    roles = id_claims.get("django/roles") or id_claims.get("django_roles") or []
-    if isinstance(roles, str):
-        if "," in roles:
-            roles = [r.strip() for r in roles.split(",") if r.strip()]
-        else:
-            roles = [roles]
-    if not isinstance(roles, (list, tuple)):
-        roles = []
+    # Roles from the Okta custom claim name with slash
+    roles = claims.roles
 
     # Deterministic color mapping for roles
     role_palette = [
@@ -156,10 +173,7 @@ def admin_panel(request):
         raise PermissionDenied("You don't have permission to access the admin panel")
 
     # Get admin-specific data
-    id_token = request.session.get("oidc_id_token") or request.session.get(
-        "OIDC_ID_TOKEN"
-    )
-    id_claims = _decode_jwt(id_token) if id_token else {}
+    id_claims = get_claims(request).claims
 
     context = {
         "user_roles": request.user.roles,
@@ -174,59 +188,280 @@ def admin_panel(request):
     return render(request, "dashboard/admin.html", context)
 
 
-@login_required
-def trades_list(request):
+def _has_metrics_token(request):
+    token = settings.DASHBOARD_METRICS_TOKEN
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and constant_time_compare(credentials.strip(), token)
+
+
+# Refusals render the 403 page, which loads the session and claims
+@query_budget(4)
+def metrics(request):
     """
-    View for listing trades. Uses django-rules for permission checking.
+    Request timing histograms of this process in the Prometheus text
+    format, for scrapers holding DASHBOARD_METRICS_TOKEN and for admins.
     """
-    if not request.user.has_perm("trade.view_tradelist"):
-        raise PermissionDenied("You don't have permission to list trades")
+    if not _has_metrics_token(request):
+        if not request.user.is_authenticated:
+            response = HttpResponse("Authentication required", status=401, content_type="text/plain")
+            response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+            return response
+        if not request.user.has_perm("dashboard.admin_access"):
+            raise PermissionDenied("You don't have permission to read the metrics")
+    return HttpResponse(VIEW_METRICS.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 
-    # Get all trades
-    trades = Trade.objects.all()
+STATUS_FILTERS = [status for status, _ in Trade.STATUSES]
 
-    # Filter by status if requested
+TRADES_PAGE_SIZE = 20
+
+
+def _trades_list_params(request):
+    """Status filter, search and page cursors of a trades list request"""
     status_filter = request.GET.get("status")
-    if status_filter and status_filter in [
-        "PENDING",
-        "CONFIRMED",
-        "APPROVED",
-        "REJECTED",
-    ]:
+    if status_filter not in STATUS_FILTERS:
+        status_filter = None
+    search = TradeSearch.from_params(request.GET)
+    return status_filter, search, request.GET.get("after"), request.GET.get("before")
+
+
+def _trades_paginator(status_filter):
+    # Get all trades, with their creators joined in for the table
+    trades = Trade.objects.for_list()
+    if status_filter:
         trades = trades.filter(status=status_filter)
+    # Keyset pagination on (created_at, id) so deep pages cost the same as the first
+    return KeysetPaginator(trades, TRADES_PAGE_SIZE)
 
-    # Pagination
-    paginator = Paginator(trades, 20)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
 
-    # Determine user permissions using django-rules
-    can_create = request.user.has_perm("trade.add_trade")
-    can_confirm = any(
-        request.user.has_perm("trade.confirm_trade", trade)
-        for trade in page_obj.object_list
-    )
-    can_approve = any(
-        request.user.has_perm("trade.approve_trade", trade)
-        for trade in page_obj.object_list
-    )
+def _get_trades_page(status_filter, search, after, before):
+    """The best matches of a search, or a page of the list"""
+    if search:
+        trades = search_trades(search, Trade.objects.for_list(), SEARCH_LIMIT)
+        return KeysetPage(trades, None, None, len(trades), len(trades) >= SEARCH_LIMIT)
+    return _trades_paginator(status_filter).get_page(after=after, before=before)
+
+
+def _page_cache_key(search, after, before):
+    """What besides the status filter decides the rows of the table"""
+    if search:
+        return f"search:{search.cache_key()}"
+    return f"{after or ''}:{before or ''}"
+
+
+def _workflow_permissions(permissions):
+    """
+    The workflow actions the trades page offers, from the user's roles
+    alone: the bulk actions sit outside the cached table, and loading the
+    page's trades to decide would undo a fragment cache hit. Rows still
+    only get the actions their status allows.
+    """
+    # Without a trade, a compiled permission is granted when any of its
+    # rules is open to one of the user's roles; no database access
+    return {
+        "can_confirm": permissions.has_perm("trade.confirm_trade"),
+        "can_approve": permissions.has_perm("trade.approve_trade"),
+    }
+
+
+@replica_reads
+@login_required
+@query_budget(8)
+def trades_list(request):
+    """
+    View for listing trades. Uses django-rules for permission checking.
+    """
+    permissions = get_permissions(request)
+    if not permissions.has_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+
+    status_filter, search, after, before = _trades_list_params(request)
+
+    # Everything below is lazy so a template fragment cache hit skips the
+    # queries behind it
+    page_obj = SimpleLazyObject(lambda: _get_trades_page(status_filter, search, after, before))
 
     context = {
         "page_obj": page_obj,
-        "trades": page_obj.object_list,
+        "trades": SimpleLazyObject(lambda: page_obj.object_list),
         "user_roles": request.user.roles,
-        "can_create": can_create,
-        "can_confirm": can_confirm,
-        "can_approve": can_approve,
+        "can_create": permissions.has_perm("trade.add_trade"),
+        **_workflow_permissions(permissions),
         "status_filter": status_filter,
-        "total_trades": Trade.objects.count(),
-        "pending_trades": Trade.objects.filter(status="PENDING").count(),
-        "confirmed_trades": Trade.objects.filter(status="CONFIRMED").count(),
-        "approved_trades": Trade.objects.filter(status="APPROVED").count(),
+        "search": search,
+        "stats": SimpleLazyObject(get_trade_stats),
+        "cache_generation": trades_generation(),
+        "cache_roles": role_cache_key(request.user),
+        "cache_timeout": fragment_timeout(),
+        "page_cursor": _page_cache_key(search, after, before),
+        "page_size": TRADES_PAGE_SIZE,
     }
     return render(request, "dashboard/trades.html", context)
 
 
+@replica_reads
+@login_required
+@query_budget(8)
+async def trades_list_async(request):
+    """
+    trades_list for ASGI deployments. The page of trades and, when its
+    cached fragment is stale, the stats header are read concurrently.
+    """
+    permissions = await aget_permissions(request)
+    if not await permissions.ahas_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+
+    status_filter, search, after, before = _trades_list_params(request)
+    generation = await atrades_generation()
+
+    cache_roles = role_cache_key(permissions.user)
+    page_cursor = _page_cache_key(search, after, before)
+
+    # The page and the stats are only read for the fragments not cached
+    def get_page():
+        return _get_trades_page(status_filter, search, after, before)
+
+    table_key = make_template_fragment_key("trade_table", [generation, cache_roles, status_filter, page_cursor])
+    if await cache.ahas_key(table_key):
+        # Lazy should the fragment expire before the template reads it
+        page_obj, stats = SimpleLazyObject(get_page), None
+    elif await cache.ahas_key(make_template_fragment_key("trade_stats", [generation])):
+        page_obj, stats = await sync_to_async(get_page)(), None
+    else:
+        page_obj, stats = await run_concurrently(get_page, get_trade_stats)
+
+    context = {
+        "page_obj": page_obj,
+        "trades": SimpleLazyObject(lambda: page_obj.object_list),
+        "user_roles": permissions.user.roles,
+        "can_create": await permissions.ahas_perm("trade.add_trade"),
+        **_workflow_permissions(permissions),
+        "status_filter": status_filter,
+        "search": search,
+        "stats": stats or SimpleLazyObject(get_trade_stats),
+        "cache_generation": generation,
+        "cache_roles": cache_roles,
+        "cache_timeout": fragment_timeout(),
+        "page_cursor": page_cursor,
+        "page_size": TRADES_PAGE_SIZE,
+    }
+    return await sync_to_async(render)(request, "dashboard/trades.html", context)
+
+
+def _render_trade_stats(generation, stats):
+    """The stats header, shared with the trades page's cached fragment"""
+    key = make_template_fragment_key("trade_stats", [generation])
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string("dashboard/trade_stats.html", {"stats": stats()})
+        cache.set(key, html, fragment_timeout())
+    return HttpResponse(html)
+
+
+@replica_reads
+@login_required
+@query_budget(4)
+def trades_stats(request):
+    """The trades stats header on its own, for refreshing it in place"""
+    if not get_permissions(request).has_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+    return _render_trade_stats(trades_generation(), get_trade_stats)
+
+
+@replica_reads
+@login_required
+@query_budget(4)
+async def trades_stats_async(request):
+    """trades_stats for ASGI deployments"""
+    permissions = await aget_permissions(request)
+    if not await permissions.ahas_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+    generation = await atrades_generation()
+    return await sync_to_async(_render_trade_stats)(generation, get_trade_stats)
+
+
+@login_required
+@query_budget(2)
+def trades_feed(request):
+    """
+    Server-sent events announcing changes to the trades the user may see,
+    so the trades page can patch its table instead of being reloaded
+    """
+    permissions = get_permissions(request)
+    if not permissions.has_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+    # Under ASGI the stream waits in the event loop instead of holding a thread
+    if isinstance(request, ASGIRequest):
+        events = feed.astream(permissions)
+    else:
+        events = feed.stream(permissions)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep proxies (nginx) from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@replica_reads
+@login_required
+def trades_export(request):
+    """
+    Stream trades as CSV or JSON Lines. Supports the status, from, to
+    (dates or datetimes, `to` inclusive for dates) and user filters.
+    """
+    if not get_permissions(request).has_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"Unknown format: {fmt}")
+    try:
+        queryset = export_queryset(
+            user=request.user,
+            status=request.GET.get("status") or None,
+            since=parse_bound(request.GET.get("from")),
+            until=parse_bound(request.GET.get("to"), end=True),
+            created_by=request.GET.get("user") or None,
+        )
+    except ExportError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    # The rows are read after the view returned, on the database chosen now
+    queryset = queryset.using(queryset.db)
+    content_type, extension = FORMATS[fmt]
+    response = StreamingHttpResponse(iter_export(queryset, fmt), content_type=content_type)
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    response["Content-Disposition"] = f'attachment; filename="trades-{stamp}.{extension}"'
+    return response
+
+
+@replica_reads
+@login_required
+@query_budget(5)
+def positions(request):
+    """
+    Net positions, notional, VWAP and realized P&L of approved trades per
+    symbol or per trader (`by`), as a page or as JSON (`format=json`).
+    """
+    if not get_permissions(request).has_perm("trade.view_tradelist"):
+        raise PermissionDenied("You don't have permission to list trades")
+
+    by = request.GET.get("by", "symbol")
+    if by not in GROUPINGS:
+        return HttpResponseBadRequest(f"Unknown grouping: {by}")
+    rows = get_cached_positions(by)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({"by": by, "positions": [position.as_dict() for position in rows]})
+
+    context = {
+        "by": by,
+        "groupings": list(GROUPINGS),
+        "positions": rows,
+    }
+    return render(request, "dashboard/positions.html", context)
+
+
 @permission_required('trade.create_trade', raise_exception=True)
 def trade_create(request):
     """
@@ -254,31 +489,118 @@ def trade_create(request):
     return render(request, "dashboard/trade_form.html", context)
 
 
+@permission_required('trade.create_trade', raise_exception=True)
+def trades_import(request):
+    """
+    Import PENDING trades from an uploaded CSV or JSON Lines file. Valid
+    rows are imported, invalid ones are listed back with their errors.
+    """
+    result = None
+    error = None
+    dry_run = False
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        dry_run = bool(request.POST.get("dry_run"))
+        if upload is None:
+            error = "Choose a file to import"
+        else:
+            fmt = request.POST.get("format") or guess_format(upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            try:
+                result = import_trades(
+                    stream, fmt, request.user, dry_run=dry_run, max_errors=100
+                )
+            except ImportFileError as exc:
+                error = str(exc)
+
+    context = {
+        "result": result,
+        "error": error,
+        "dry_run": dry_run,
+    }
+    return render(request, "dashboard/trade_import.html", context)
+
+
+@login_required
+@require_POST
+def trades_bulk(request):
+    """
+    Confirm, unconfirm, approve or reject many trades at once. Takes
+    `action` and `trade_ids` as form fields or as a JSON object and
+    reports the outcome for every trade.
+    """
+    wants_json = request.content_type == "application/json"
+    try:
+        if wants_json:
+            try:
+                payload = json.loads(request.body)
+            except ValueError:
+                raise WorkflowError("Invalid JSON body")
+            if not isinstance(payload, dict) or not isinstance(payload.get("trade_ids"), list):
+                raise WorkflowError("Expected an object with action and trade_ids")
+            action = payload.get("action")
+            trade_ids = parse_trade_ids(payload["trade_ids"])
+        else:
+            action = request.POST.get("action")
+            trade_ids = parse_trade_ids(request.POST.getlist("trade_ids"))
+        result = bulk_transition(request.user, action, trade_ids, get_permissions(request))
+    except WorkflowError as exc:
+        if wants_json:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return render(request, "dashboard/trade_bulk.html", {"error": str(exc)}, status=400)
+
+    if wants_json or "application/json" in request.headers.get("Accept", ""):
+        return JsonResponse(
+            {
+                "action": result.action,
+                "counts": result.counts(),
+                "results": [
+                    {"id": trade_id, "outcome": outcome}
+                    for trade_id, outcome in result.outcomes.items()
+                ],
+            }
+        )
+
+    context = {
+        "result": result,
+        "target": TRANSITIONS[result.action].target,
+    }
+    return render(request, "dashboard/trade_bulk.html", context)
+
+
+def primary_trade_getter(request, trade_id):
+    """
+    The trade read from the primary database, for views that transition it.
+    The cached copy may be stale, so it is not used to decide a write.
+    """
+    trade = getattr(request, "_primary_trade", None)
+    if trade is None:
+        trade = get_object_or_404(Trade.objects.using("default").for_detail(), id=trade_id)
+        request._primary_trade = trade
+    return trade
 
 
-@permission_required('trade.confirm_trade', fn=objectgetter(Trade, 'trade_id'), raise_exception=True)
+@permission_required('trade.confirm_trade', fn=primary_trade_getter, raise_exception=True)
 def trade_confirm(request, trade_id):
     """
     Confirm a trade. Uses django-rules permission checking.
     """
-    trade = get_object_or_404(Trade, id=trade_id)
+    trade = primary_trade_getter(request, trade_id)
 
     if request.method == "POST":
         action = request.POST.get("action", "confirm")
 
         if action == "confirm" and trade.can_be_confirmed:
-            trade.status = "CONFIRMED"
-            trade.confirmed_by = request.user
-            trade.confirmed_at = timezone.now()
-            trade.save()
-            messages.success(request, f"Trade confirmed successfully: {trade}")
+            if trade.confirm(request.user):
+                messages.success(request, f"Trade confirmed successfully: {trade}")
+            else:
+                messages.error(request, f"Trade was changed by someone else: {trade}")
         elif action == "unconfirm" and trade.can_be_approved:
             # Move confirmed trade back to pending
-            trade.status = "PENDING"
-            trade.confirmed_by = None
-            trade.confirmed_at = None
-            trade.save()
-            messages.success(request, f"Trade moved back to pending: {trade}")
+            if trade.unconfirm(request.user):
+                messages.success(request, f"Trade moved back to pending: {trade}")
+            else:
+                messages.error(request, f"Trade was changed by someone else: {trade}")
         else:
             messages.error(
                 request, f"Cannot perform this action on trade in {trade.status} status"
@@ -294,28 +616,31 @@ def trade_confirm(request, trade_id):
     return render(request, "dashboard/trade_action.html", context)
 
 
-@permission_required('trade.approve_trade', fn=objectgetter(Trade, 'trade_id'), raise_exception=True)
+@permission_required('trade.approve_trade', fn=primary_trade_getter, raise_exception=True)
 def trade_approve(request, trade_id):
     """
     Approve a trade. Uses django-rules permission checking.
     """
-    trade = get_object_or_404(Trade, id=trade_id)
+    trade = primary_trade_getter(request, trade_id)
 
     if request.method == "POST":
         action = request.POST.get("action")
-        if action == "approve":
-            trade.status = "APPROVED"
-            trade.approved_by = request.user
-            trade.approved_at = timezone.now()
-            messages.success(request, f"Trade approved successfully: {trade}")
-        elif action == "reject":
-            trade.status = "REJECTED"
-            messages.warning(request, f"Trade rejected: {trade}")
-        else:
+        if action not in ("approve", "reject"):
             messages.error(request, "Invalid action")
-            return redirect("dashboard:trades")
-
-        trade.save()
+        elif not trade.can_be_approved:
+            messages.error(
+                request, f"Cannot perform this action on trade in {trade.status} status"
+            )
+        elif action == "approve":
+            if trade.approve(request.user):
+                messages.success(request, f"Trade approved successfully: {trade}")
+            else:
+                messages.error(request, f"Trade was changed by someone else: {trade}")
+        else:
+            if trade.reject(request.user):
+                messages.warning(request, f"Trade rejected: {trade}")
+            else:
+                messages.error(request, f"Trade was changed by someone else: {trade}")
         return redirect("dashboard:trades")
 
     context = {
@@ -325,17 +650,38 @@ def trade_approve(request, trade_id):
     return render(request, "dashboard/trade_action.html", context)
 
 
-@permission_required('trade.view_trade', fn=objectgetter(Trade, 'trade_id'), raise_exception=True)
+@replica_reads
+@permission_required('trade.view_trade', fn=cached_trade_getter, raise_exception=True)
+@query_budget(5)
 def trade_detail(request, trade_id):
     """
     View trade details. Uses django-rules permission checking.
     """
-    trade = get_object_or_404(Trade, id=trade_id)
+    trade = get_cached_trade(trade_id)
 
+    permissions = get_permissions(request)
     context = {
         "trade": trade,
-        "can_confirm": request.user.has_perm("trade.confirm_trade", trade),
-        "can_approve": request.user.has_perm("trade.approve_trade", trade),
-        "can_delete": request.user.has_perm("trade.delete_trade", trade),
+        "can_confirm": permissions.has_perm("trade.confirm_trade", trade),
+        "can_approve": permissions.has_perm("trade.approve_trade", trade),
+        "can_delete": permissions.has_perm("trade.delete_trade", trade),
     }
     return render(request, "dashboard/trade_detail.html", context)
+
+
+@replica_reads
+@query_budget(5)
+async def trade_detail_async(request, trade_id):
+    """trade_detail for ASGI deployments"""
+    trade = await aget_cached_trade(trade_id)
+
+    permissions = await aget_permissions(request)
+    if not await permissions.ahas_perm("trade.view_trade", trade):
+        raise PermissionDenied
+    context = {
+        "trade": trade,
+        "can_confirm": await permissions.ahas_perm("trade.confirm_trade", trade),
+        "can_approve": await permissions.ahas_perm("trade.approve_trade", trade),
+        "can_delete": await permissions.ahas_perm("trade.delete_trade", trade),
+    }
+    return await sync_to_async(render)(request, "dashboard/trade_detail.html", context)
@@ -0,0 +1,142 @@
+"""Trade workflow transitions applied to many trades at once"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import invalidate_trades
+from .models.trade import TRANSITIONS, Trade
+from .permissions import PermissionEngine
+from .events import ACTION_KINDS, make_event, record_events
+
+MAX_BULK_TRADES = 1000
+
+UPDATED = "updated"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+INVALID_STATUS = "invalid_status"
+CONFLICT = "conflict"
+
+
+class WorkflowError(ValueError):
+    pass
+
+
+# action -> permission required on each trade
+ACTION_PERMISSIONS = {
+    "confirm": "trade.confirm_trade",
+    "unconfirm": "trade.confirm_trade",
+    "approve": "trade.approve_trade",
+    "reject": "trade.approve_trade",
+}
+
+
+class _LostRace(Exception):
+    pass
+
+
+class TransitionResult:
+    def __init__(self, action, outcomes):
+        self.action = action
+        # trade id -> outcome, in request order
+        self.outcomes = outcomes
+
+    @property
+    def updated(self):
+        return [trade_id for trade_id, outcome in self.outcomes.items() if outcome == UPDATED]
+
+    def counts(self):
+        totals = {}
+        for outcome in self.outcomes.values():
+            totals[outcome] = totals.get(outcome, 0) + 1
+        return totals
+
+
+def parse_trade_ids(values):
+    """Trade ids from form/JSON input, deduplicated in order"""
+    trade_ids = []
+    for value in values:
+        try:
+            trade_id = int(value)
+        except (TypeError, ValueError):
+            raise WorkflowError(f"Invalid trade id: {value}")
+        if trade_id not in trade_ids:
+            trade_ids.append(trade_id)
+    if not trade_ids:
+        raise WorkflowError("No trades selected")
+    if len(trade_ids) > MAX_BULK_TRADES:
+        raise WorkflowError(f"At most {MAX_BULK_TRADES} trades can be processed at once")
+    return trade_ids
+
+
+def bulk_transition(user, action, trade_ids, permissions=None):
+    """
+    Apply `action` to every trade in `trade_ids` the user may act on and
+    return a TransitionResult with one outcome per requested id.
+    """
+    transition = TRANSITIONS.get(action)
+    if transition is None or action not in ACTION_PERMISSIONS:
+        raise WorkflowError(f"Unknown action: {action}")
+    perm = ACTION_PERMISSIONS[action]
+    permissions = permissions or PermissionEngine(user)
+
+    outcomes = {}
+    with transaction.atomic():
+        # Keyed by id, so skip the default ordering and its sort
+        rows = {
+            row.id: row
+            for row in Trade.objects.filter(id__in=trade_ids).order_by().values_list(
+                "id", "symbol", "trade_type", "status", "quantity", "price", "created_by_id",
+                named=True,
+            )
+        }
+        eligible = []
+        for trade_id in trade_ids:
+            row = rows.get(trade_id)
+            if row is None:
+                outcomes[trade_id] = NOT_FOUND
+            elif not permissions.has_perm(perm, row):
+                outcomes[trade_id] = FORBIDDEN
+            elif row.status != transition.source:
+                outcomes[trade_id] = INVALID_STATUS
+            else:
+                outcomes[trade_id] = None
+                eligible.append(row)
+
+        applied = []
+        now = timezone.now()
+        if eligible:
+            values = transition.values(user, now)
+            values["version"] = F("version") + 1
+            guarded = Trade.objects.filter(status=transition.source)
+            try:
+                with transaction.atomic():
+                    updated = guarded.filter(id__in=[row.id for row in eligible]).update(**values)
+                    if updated != len(eligible):
+                        raise _LostRace
+                applied = eligible
+            except _LostRace:
+                applied = [row for row in eligible if guarded.filter(id=row.id).update(**values)]
+
+        for row in eligible:
+            outcomes[row.id] = CONFLICT
+        for row in applied:
+            outcomes[row.id] = UPDATED
+
+        if applied:
+            # queryset.update() bypasses the signals maintaining the event
+            # log and caches
+            record_events([
+                make_event(
+                    row.id,
+                    ACTION_KINDS[action],
+                    user.pk,
+                    now,
+                    transition.source,
+                    transition.target,
+                    (row.symbol, row.trade_type, row.quantity, row.price, row.status),
+                )
+                for row in applied
+            ])
+            transaction.on_commit(invalidate_trades)
+
+    return TransitionResult(action, outcomes)